@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import logging
+import argparse
+
+from TriAnnot.TriAnnotSchedulingDaemon import *
+from TriAnnot.TriAnnotVersion import TRIANNOT_VERSION
+
+class TriAnnotDaemon (object):
+
+    def __init__(self):
+        # Get the default logger
+        self.logger = logging.getLogger("TriAnnot")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        self.programName = os.path.basename(sys.argv[0])
+        self.commandLineArguments = None
+        self.pipelineArguments = list()
+
+        self.availableSubCommands = {'start': self.startDaemon, 'submit': self.submitAnalysis, 'status': self.displayStatus, 'stop': self.stopDaemon}
+
+
+    def main(self):
+        # Command line management
+        self.getCommandLineArguments()
+
+        # Effective treatment
+        exit(self.availableSubCommands[self.commandLineArguments.subCommand]())
+
+
+    def getCommandLineArguments(self):
+        # Initializations
+        defaultStateDirectory = os.path.join(os.path.expanduser('~'), '.TriAnnot', 'daemon')
+
+        # Initialize the command line argument parser
+        argParser = argparse.ArgumentParser(description = "*** TriAnnotDaemon.py (for TriAnnot version %s) - Help Section ***\n\nThe scheduling daemon shares a maximum number of simultaneous sequence analysis between several TriAnnot analyses (weighted fair-share).\nEach analysis is still executed by its own TriAnnotPipeline.py process (with its own execution folder, configuration and SQLite database)." % (TRIANNOT_VERSION), formatter_class=argparse.RawTextHelpFormatter)
+        argParser.add_argument('--version', action='version', version="TriAnnot Scheduling Daemon for TriAnnot version %s" % (TRIANNOT_VERSION))
+        argParser.add_argument('--socket', dest = 'socketFileFullPath', metavar = 'SOCKET_FILE', default = os.path.join(defaultStateDirectory, 'TriAnnotDaemon.socket'), help = "Full path of the Unix socket of the daemon.\nDefault value is: %(default)s\n\n")
+
+        subParsers = argParser.add_subparsers(dest = 'subCommand', title = 'Sub-commands')
+
+        startParser = subParsers.add_parser('start', help = 'Start the scheduling daemon (in foreground)', formatter_class=argparse.RawTextHelpFormatter)
+        startParser.add_argument('--maxinstance', dest = 'totalParallelAnalysis', metavar = 'NUMBER_OF_INSTANCE', type = int, required = True, help = "Total number of sequence analysis that can be run simultaneously by all the registered analyses.\n\n")
+        startParser.add_argument('--state-dir', dest = 'stateDirectory', metavar = 'STATE_DIRECTORY', default = defaultStateDirectory, help = "Directory of the state database of the daemon (list of the managed analyses).\nDefault value is: %(default)s\n\n")
+        startParser.add_argument('--interval', dest = 'monitoringInterval', metavar = 'SECONDS', type = float, default = 30, help = "Number of seconds between two checks of the processes of the registered analyses.\nDefault value is: %(default)s\n\n")
+
+        submitParser = subParsers.add_parser('submit', help = 'Start a new analysis managed by the daemon', formatter_class=argparse.RawTextHelpFormatter)
+        submitParser.add_argument('-w', '--workdir', dest = 'execDirPath', metavar = 'EXECUTION_FOLDER', required = True, help = "Main execution folder of the new analysis.\n\n")
+        submitParser.add_argument('--weight', dest = 'analysisWeight', metavar = 'WEIGHT', type = float, default = 1.0, help = "Weight of the analysis in the fair-share.\nDefault value is: %(default)s\n\n")
+
+        subParsers.add_parser('status', help = 'Display the analyses managed by the daemon')
+        subParsers.add_parser('stop', help = 'Stop the daemon (the running analyses continue on their own)')
+
+        # Effective parsing of the command line
+        # Note: for the submit sub-command, the unknown arguments are the arguments of TriAnnotPipeline.py (ex: run -s sequence.fasta -t tasks.xml)
+        self.commandLineArguments, self.pipelineArguments = argParser.parse_known_args()
+
+        if self.commandLineArguments.subCommand != 'submit' and len(self.pipelineArguments) > 0:
+            argParser.error("unrecognized arguments: %s" % ' '.join(self.pipelineArguments))
+
+
+    ####################
+    ##  Sub-commands  ##
+    ####################
+    def startDaemon(self):
+        # Initializations
+        stateDirectory = os.path.realpath(os.path.expanduser(self.commandLineArguments.stateDirectory))
+
+        if not os.path.isdir(stateDirectory):
+            os.makedirs(stateDirectory)
+
+        schedulingDaemon = TriAnnotSchedulingDaemon(os.path.realpath(os.path.expanduser(self.commandLineArguments.socketFileFullPath)), os.path.join(stateDirectory, 'TriAnnotDaemon_state.sqlite3'), self.commandLineArguments.totalParallelAnalysis, self.commandLineArguments.monitoringInterval)
+
+        try:
+            schedulingDaemon.serve()
+        except KeyboardInterrupt:
+            self.logger.info('The scheduling daemon has been interrupted')
+        except RuntimeError as err:
+            self.logger.error(err)
+            return 1
+
+        return 0
+
+
+    def submitAnalysis(self):
+        response = TriAnnotDaemonClient(self.commandLineArguments.socketFileFullPath).submitAnalysis(self.commandLineArguments.execDirPath, self.commandLineArguments.analysisWeight, self.pipelineArguments)
+
+        if response is None:
+            self.logger.error("The analysis could not be submitted to the scheduling daemon listening on <%s>" % self.commandLineArguments.socketFileFullPath)
+            return 1
+
+        self.logger.info("The analysis has been started by the scheduling daemon (pid: %s)" % response['pid'])
+
+        return 0
+
+
+    def displayStatus(self):
+        response = TriAnnotDaemonClient(self.commandLineArguments.socketFileFullPath).getStatus()
+
+        if response is None:
+            self.logger.error("No scheduling daemon is listening on <%s>" % self.commandLineArguments.socketFileFullPath)
+            return 1
+
+        self.logger.info("Total number of simultaneous analysis: %d" % response['totalParallelAnalysis'])
+
+        for analysis in response['analyses']:
+            self.logger.info("%s - Status: %s - Weight: %s - Active/Pending instances: %s/%s - Allocated share: %s" % (analysis['workdir'], analysis['status'], analysis['weight'], analysis['nbActiveInstances'], analysis['nbPendingInstances'], analysis['allocatedParallelAnalysis']))
+
+        return 0
+
+
+    def stopDaemon(self):
+        if not TriAnnotDaemonClient(self.commandLineArguments.socketFileFullPath).stopDaemon():
+            self.logger.error("No scheduling daemon is listening on <%s>" % self.commandLineArguments.socketFileFullPath)
+            return 1
+
+        self.logger.info('The scheduling daemon will stop at the end of its current monitoring cycle')
+
+        return 0
+
+
+if __name__ == "__main__":
+    # Initialize default logger
+    logger = logging.getLogger("TriAnnot")
+    logger.setLevel(logging.INFO)
+
+    # Create a formatter for the console handlers
+    nameLevelMessageformatter = logging.Formatter("%(name)s - %(levelname)s - %(message)s")
+
+    # Create the default console/screen handler with a custom formatter
+    stdoutConsoleHandler = logging.StreamHandler(sys.stdout)
+    stdoutConsoleHandler.setFormatter(nameLevelMessageformatter)
+    logger.addHandler(stdoutConsoleHandler)
+
+    # Create main TriAnnotDaemon object
+    triAnnotDaemonObject = TriAnnotDaemon()
+    triAnnotDaemonObject.main()
+
+    # Close the logging system
+    logging.shutdown()
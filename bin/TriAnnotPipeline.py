@@ -23,6 +23,8 @@ import shutil
 import re
 import getpass
 import fcntl as locker
+from multiprocessing.pool import ThreadPool
+from multiprocessing import Pool, cpu_count
 
 
 ###############################
@@ -35,9 +37,24 @@ from TriAnnot.TriAnnotTaskFileChecker import *
 from TriAnnot.TriAnnotSqlite import *
 from TriAnnot.TriAnnotInstanceTableEntry import *
 from TriAnnot.TriAnnotSequenceGoals import *
+from TriAnnot.TriAnnotBgzfFile import *
+from TriAnnot.TriAnnotFastaScanner import *
+from TriAnnot.TriAnnotFastaIndex import *
+from TriAnnot.TriAnnotSequenceExtractor import *
+from TriAnnot.TriAnnotSequencePacker import *
+from TriAnnot.TriAnnotChunkBoundaryPlanner import *
 from TriAnnot.TriAnnotRunner import *
 from TriAnnot.TriAnnotInstance import *
 from TriAnnot.TriAnnotTask import *
+from TriAnnot.TriAnnotFileWatcher import *
+from TriAnnot.TriAnnotScheduler import *
+from TriAnnot.TriAnnotRuntimeModel import *
+from TriAnnot.TriAnnotMonitoringController import *
+from TriAnnot.TriAnnotLoadController import *
+from TriAnnot.TriAnnotStragglerDetector import *
+from TriAnnot.TriAnnotRetryPolicy import *
+from TriAnnot.TriAnnotSchedulingDaemon import *
+from TriAnnot.TriAnnotInstanceEventStatistics import *
 from TriAnnot.ColoredFormatter import *
 import TriAnnot.Utils
 
@@ -115,6 +132,7 @@ class TriAnnotPipeline (object):
 
         self.sqliteDatabaseFileName = 'TriAnnotPipeline_database.sqlite3'
         self.sqliteDatabaseFileFullPath = None
+        self.sqliteObject = None
         self.sequenceFileFullPath = None
         self.tasksFileFullPath = None
         self.sequenceType = None
@@ -122,6 +140,8 @@ class TriAnnotPipeline (object):
         self.instanceJobRunnerName = None
         self.maxParallelAnalysis = None
         self.taskJobRunnerName = None
+        self.schedulingPolicy = None
+        self.sequenceWeightsFileFullPath = None
 
         self.minimumSequenceLength = None
         self.maximumSequenceLength = None
@@ -144,6 +164,53 @@ class TriAnnotPipeline (object):
         # List of instances to execute
         self.instances = dict()
 
+        # Compiled regular expression used to detect the non-IUPAC characters of the sequence lines (line by line analysis)
+        self.sequenceValidationPattern = None
+
+        # Submission order of the PENDING instances
+        self.scheduler = None
+
+        # Dynamic maximum number of simultaneous analysis (based on the load of the cluster)
+        self.loadController = None
+
+        # Fair-share of the simultaneous analysis between the analyses registered with a scheduling daemon
+        self.daemonClient = None
+
+        # Speculative execution of the straggler instances (Key = instance identifier / Value = speculative attempt)
+        self.stragglerDetector = None
+        self.speculativeAttempts = dict()
+        self.speculatedInstanceIds = set()
+
+        # Automatic retry of the failed instances (with backoff) and background compression of their quarantined execution folder
+        self.retryPolicy = None
+
+        # Runtime model (prediction of the execution time and disk usage of each chunk)
+        self.runtimeModelsFileFullPath = None
+        self.runtimeModel = None
+        self.pastDatabaseFilesFullPaths = list()
+        self.estimatedRemainingTime = None
+
+        # Extraction of the chunk sequences from the (memory-mapped) fasta input file
+        self.sequenceExtractor = None
+
+        # Packing of the small sequences into multi-fasta instances
+        self.sequencePacker = None
+
+        # Placement of the chunk boundaries in the gaps (runs of N) of the sequences
+        self.chunkBoundaryPlanner = None
+
+        # Background preparation (directories and chunk fasta file) of the next PENDING instances
+        self.instancePreparationPool = None
+        self.instancePreparationDepth = 0
+        self.instancePreparationResults = dict()
+
+        # Instance files monitoring related attributes
+        self.monitoringController = None
+        self.eventsDetectedDuringLastWait = False
+        self.fileWatcher = None
+        self.instancesWithNewEvents = set()
+        self.lastFullStatusCheckTime = None
+
         # Lock file management
         self.lockFileFullPath = None
         self.lockFileHandler = None
@@ -168,7 +235,7 @@ class TriAnnotPipeline (object):
         self._generateTriAnnotUniqueId()
 
         # Preparation of the analysis
-        # This step depends on the sub-command (monitor/resume/retry/run) selected with the command line
+        # This step depends on the sub-command (monitor/stats/resume/retry/run) selected with the command line
         # Please have a look at this method to get more informations
         self.prepareAnalysis()
 
@@ -179,6 +246,8 @@ class TriAnnotPipeline (object):
         try:
             if self.selectedSubCommand == 'monitor':
                 self.displayInstancesStatus()
+            elif self.selectedSubCommand == 'stats':
+                self.displayInstanceEventStatistics()
             elif self.selectedSubCommand == 'reconstruct':
                 self.performResultFilesReconstruction()
             else:
@@ -189,14 +258,14 @@ class TriAnnotPipeline (object):
                 self.createTriAnnotFinishedFile()
 
         except KeyboardInterrupt:
-            if self.selectedSubCommand != 'monitor' and self.selectedSubCommand != 'reconstruct':
+            if self.selectedSubCommand not in ['monitor', 'stats', 'reconstruct']:
                 self.manageKeyboardInterrupt()
 
         except Exception as ex:
             # Abort everything in case of unexpected error
             if not self.pipelineAbortedAfterManagedError:
                 self.logger.debug("Error traceback message:\n%s" % traceback.format_exc())
-                if self.selectedSubCommand != 'monitor' and self.selectedSubCommand != 'reconstruct':
+                if self.selectedSubCommand not in ['monitor', 'stats', 'reconstruct']:
                     self.abortAllInstances("An unexpected error occured ! (Raised error: %s)" % ex.message)
                 else:
                     self.logger.error("An unexpected error occured ! (Raised error: %s)" % ex.message)
@@ -205,12 +274,23 @@ class TriAnnotPipeline (object):
             # Last update of the SQLite database (Mostly used for canceled instances)
             self.treatFinishedOrCanceledInstances()
 
+            # Write the status/progression changes that have not been written yet
+            if self.sqliteObject is not None:
+                self.sqliteObject.flushMonitoringUpdates(force = True)
+
             # End log
             self.displayEndMessage()
 
             # Reminder
             self.dislayReminder()
 
+            # Release the share of the analysis in the scheduling daemon
+            self.closeDaemonClient()
+
+            # Close the connection to the SQLite database
+            if self.sqliteObject is not None:
+                self.sqliteObject.close()
+
             # Remove lock file
             self.deleteLockFile()
 
@@ -223,15 +303,65 @@ class TriAnnotPipeline (object):
         # Check if some instances have already been executed (and maybe completed) by a previous TriAnnotPipeline execution
         self.checkForAlreadyCompletedInstances()
 
+        # Load the runtime model of the current step/task file (and learn from past analyses if requested)
+        self.initializeRuntimeModel()
+
+        # Determine the order in which the PENDING instances will be submitted
+        self.initializeScheduler()
+
+        # The maximum number of simultaneous analysis will follow the load of the cluster
+        self.loadController = TriAnnotLoadController(self.maxParallelAnalysis)
+        self.logger.debug("Maximum number of simultaneous analysis: %s" % self.loadController.getControllerDescription())
+
+        # Share the simultaneous analysis with the other analyses managed by the scheduling daemon (if any)
+        self.initializeDaemonClient()
+
         # Display initial status counters
         self.displayStatusCounters()
 
+        # Start watching the execution folders of the instances for new TriAnnot_progress/TriAnnot_finished files
+        self.initializeFileWatcher()
+
+        # The time between two monitoring cycles depends on the activity of the instances
+        self.monitoringController = TriAnnotMonitoringController(self.monitoringInterval)
+        self.logger.debug("Monitoring interval: %s" % self.monitoringController.getControllerDescription())
+
+        # The status/progression changes observed during the monitoring are written in the database by batches
+        if TriAnnotConfig.isConfigValueDefined('Global|monitoringUpdateFlushInterval'):
+            self.sqliteObject.monitoringUpdateFlushInterval = int(TriAnnotConfig.getConfigValue('Global|monitoringUpdateFlushInterval'))
+        self.logger.debug("The status changes observed during the monitoring will be written in the database every <%d> second(s)" % self.sqliteObject.monitoringUpdateFlushInterval)
+
+        # Start the threads that will prepare the next PENDING instances while the main loop is waiting
+        self.initializeInstancePreparationPool()
+
+        # Failed instances will be submitted again (depending on the class of their error)
+        self.initializeRetryPolicy()
+
+        # Instances that run much longer than similar chunks will be executed a second time in another directory
+        self.stragglerDetector = TriAnnotStragglerDetector()
+        self.logger.debug("Speculative execution of straggler instances: %s" % self.stragglerDetector.getDetectorDescription())
+
         while len(self.instances) > 0:
-            # Check and update the status of the various instances
-            self.checkAndUpdateInstanceStatus()
+            # Initializations
+            nbUnfinishedInstances = len(self.instances)
+            nbSubmittedInstances = 0
 
-            # Remove completed/canceled/error instances from the list of instances and update the Instances and System_Statistics tables
-            self.treatFinishedOrCanceledInstances()
+            # All the updates of the SQLite database made during the monitoring round are committed at once
+            with self.sqliteObject.unitOfWork():
+                # Check and update the status of the various instances
+                self.checkAndUpdateInstanceStatus()
+
+                # Keep the first finished execution of the instances that have a speculative attempt
+                self.checkSpeculativeAttempts()
+
+                # Remove completed/canceled/error instances from the list of instances and update the Instances and System_Statistics tables
+                self.treatFinishedOrCanceledInstances()
+
+                # Write the status/progression changes observed during the last monitoring rounds (if the flush interval has elapsed)
+                self.sqliteObject.flushMonitoringUpdates()
+
+            # Put back in the submission queue the failed instances whose backoff delay has expired
+            self.queueInstancesReadyForRetry()
 
             # We can continue if there is at least one instance to run or monitor
             if len(self.instances) > 0:
@@ -243,10 +373,33 @@ class TriAnnotPipeline (object):
 
                 # Run new instance(s)
                 if nbInstancesToLaunch > 0:
-                    self.runInstances(nbInstancesToLaunch)
+                    nbSubmittedInstances = self.runInstances(nbInstancesToLaunch)
+
+                # Launch a speculative attempt for the straggler instances
+                nbSubmittedInstances += self.launchSpeculativeAttempts()
+
+                # Prepare the next instances to submit in background
+                self.prefetchInstances()
 
-                # Sleep for a bit before next turn
-                time.sleep(float(self.monitoringInterval))
+                # Sleep until an instance updates its TriAnnot_progress/TriAnnot_finished file or until the end of the monitoring interval
+                self.waitForInstancesEvents(nbSubmittedInstances > 0 or len(self.instances) != nbUnfinishedInstances)
+
+        # Release the resources used by the file watcher and the preparation threads (and wait for the compression of the quarantined folders)
+        self.fileWatcher.close()
+        self.closeInstancePreparationPool()
+        self.retryPolicy.close()
+        self.closeSequenceExtractor()
+
+        # Learn the cost of the chunks of the current analysis
+        self.updateRuntimeModel()
+
+        self.logger.info("Monitoring statistics: %s" % self.monitoringController.getStatisticsAsString())
+
+        if self.retryPolicy.nbRetries > 0:
+            self.logger.info("<%d> automatic retries have been made during this execution" % self.retryPolicy.nbRetries)
+
+        if self.stragglerDetector.nbLaunchedAttempts > 0:
+            self.logger.info("Speculative execution statistics: %s" % self.stragglerDetector.getStatisticsAsString())
 
 
     ###################################################
@@ -402,7 +555,7 @@ class TriAnnotPipeline (object):
             self.manageParametersAndConfiguration()
 
             # Check if the user is allowed to launch this instance of TriAnnotPipeline.py or not
-            if self.selectedSubCommand != 'monitor':
+            if self.selectedSubCommand not in ['monitor', 'stats']:
                 self.createLockFileHandler()
                 self.isAlreadyLocked = not self.addLockOnFileHandler()
                 if self.isAlreadyLocked:
@@ -454,7 +607,7 @@ class TriAnnotPipeline (object):
                     self.prepareReconstructMode()
 
                 else:
-                    # In <monitor> mode there is no specific task to perform right now
+                    # In <monitor> and <stats> modes there is no specific task to perform right now
                     self.prepareMonitorMode()
 
             # Remove old TriAnnot_abort files if needed
@@ -545,7 +698,7 @@ class TriAnnotPipeline (object):
 
         # Create the SQLite database
         self.sqliteDatabaseFileFullPath = os.path.join(self.mainExecDirFullPath, self.sqliteDatabaseFileName)
-        self.sqliteObject = TriAnnotSqlite(self.sqliteDatabaseFileFullPath)
+        self.sqliteObject = TriAnnotSqlite(self.sqliteDatabaseFileFullPath, self.getSqliteJournalMode())
 
         # Write the full configuration for the current analysis in a global XML configuration file
         self.globalConfigurationFileFullPath = TriAnnotConfig.generateGlobalConfigurationFile(self.mainExecDirFullPath, TRIANNOT_VERSION)
@@ -558,11 +711,11 @@ class TriAnnotPipeline (object):
         # Save the main/important parameters in a table of the SQLite database
         self.sqliteObject.genericInsertOrReplaceFromDict(self.sqliteObject.parametersTableName, self.buildMainParametersDict())
 
-        # Analyse sequence file
-        self.analyseSequenceFile()
+        # Keep a fast checksum of the fasta input file: the chunk sequences are extracted from their offsets until the end of the analysis
+        self.prepareAndStoreGlobalFileData(self.sequenceFileFullPath, fastMode = True)
 
-        # Register all instances in a table of the SQLite database
-        self.sqliteObject.registerAllInstances(self.InstanceTableEntries)
+        # Analyse sequence file (and register all instances in a table of the SQLite database)
+        self.analyseSequenceFile()
 
         # Delete the greedy objects, class variables, etc.
         self.deleteMemoryEaters()
@@ -583,13 +736,13 @@ class TriAnnotPipeline (object):
             self.stillAliveJobMonitoringInterval = 60 + self.monitoringInterval
 
 
-    def prepareAndStoreGlobalFileData(self, globalFileFullPath):
+    def prepareAndStoreGlobalFileData(self, globalFileFullPath, fastMode = False):
         # Initializations
         globalFileData = dict()
 
         # Extract import parameters from the main object
         globalFileData['globalFileFullPath'] = globalFileFullPath
-        globalFileData['globalFileSecureHash'] = Utils.getFileChecksum(globalFileFullPath)
+        globalFileData['globalFileSecureHash'] = Utils.getFileChecksum(globalFileFullPath, fastMode)
 
         self.sqliteObject.genericInsertOrReplaceFromDict(self.sqliteObject.globalFilesTableName, globalFileData)
 
@@ -614,6 +767,9 @@ class TriAnnotPipeline (object):
         mainParameters['emailTo'] = self.emailTo
         mainParameters['shortIdentifier'] = self.shortIdentifier
         mainParameters['chunkOverlappingSize'] = self.chunkOverlappingSize
+        mainParameters['schedulingPolicy'] = self.schedulingPolicy
+        mainParameters['sequenceWeightsFileFullPath'] = self.sequenceWeightsFileFullPath
+        mainParameters['runtimeModelsFileFullPath'] = self.runtimeModelsFileFullPath
 
         return mainParameters
 
@@ -624,9 +780,6 @@ class TriAnnotPipeline (object):
         del TriAnnotTaskFileChecker.allTaskParametersObjects
         del TriAnnotTaskParameters.generatedSequencesTaskId
 
-        del self.InstanceTableEntries[:]
-        self.InstanceTableEntries = None
-
 
     def createMandatorySubFolders(self):
         # Generate the list of folders to create
@@ -705,6 +858,26 @@ class TriAnnotPipeline (object):
         self.convertCleanPatternToDict()
 
 
+    def getSqliteJournalMode(self):
+        # The journal mode depends on the file system of the main execution folder when it is not explicitly defined
+        if TriAnnotConfig.isConfigValueDefined('Global|sqliteJournalMode') and TriAnnotConfig.getConfigValue('Global|sqliteJournalMode') != '':
+            return TriAnnotConfig.getConfigValue('Global|sqliteJournalMode')
+
+        return TriAnnotSqlite.defaultJournalMode
+
+
+    def checkSequenceFileChecksum(self):
+        # Initializations
+        sequenceFileChecksum = self.sqliteObject.recoverGlobalFileChecksum(self.sequenceFileFullPath)
+
+        # The offsets of the chunks stored in the SQLite database are only valid for the fasta input file analyzed in run mode
+        if sequenceFileChecksum is not None and not Utils.isMatchingFileChecksum(self.sequenceFileFullPath, sequenceFileChecksum):
+            self.logger.error("It seems that the following fasta input file has been modified after its analysis in run mode: %s" % self.sequenceFileFullPath)
+            self.logger.error("To avoid the analysis of invalid chunk sequences TriAnnot execution (<%s> mode) will now be aborted !" % self.selectedSubCommand)
+            self.logger.error("Please restore the original version of this fasta file before executing %s again" % self.programName)
+            exit(1)
+
+
     def setSecondaryMonitoringIntervals(self):
         if self.monitoringInterval < 60:
             self.stillAliveJobMonitoringInterval = 60
@@ -716,7 +889,12 @@ class TriAnnotPipeline (object):
     ##  Monitor mode specific initialization methods  ##
 
     def prepareMonitorMode(self):
-        pass
+        # Only the parameters required to estimate the remaining time are restored in monitor mode
+        recoveredParameters = self.sqliteObject.recoverParametersFromDatabase()
+
+        for parameterName in ['globalTaskFileFullPath', 'maxParallelAnalysis', 'runtimeModelsFileFullPath']:
+            if recoveredParameters.has_key(parameterName):
+                setattr(self, parameterName, recoveredParameters[parameterName])
 
 
     ###################################################
@@ -725,6 +903,8 @@ class TriAnnotPipeline (object):
     def prepareResumeMode(self):
         # Restore the configuration (from the SQLite database and the global file) and update the attributes of the main object
         self.restoreConfiguration()
+        self.checkSequenceFileChecksum()
+        self.sqliteObject.changeJournalMode(self.getSqliteJournalMode())
 
         # Generate a list of TriAnnotInstance objects with the data of the Instance table
         self.instances = self.getInstanceObjectsFromDatabaseRequest()
@@ -733,6 +913,7 @@ class TriAnnotPipeline (object):
         for instance in self.instances.values():
             if instance.instanceMonitoringCommand is not None and not instance.isExecutionFinishedBasedOnStatus():
                 instance.runner = TriAnnotRunner(self.instanceJobRunnerName, 'TriAnnotUnit', instance)
+                instance.runner.jobid = instance.instanceJobIdentifier
                 instance.runner.monitoringCommand = instance.instanceMonitoringCommand
                 instance.runner.killCommand = instance.instanceKillCommand
 
@@ -743,41 +924,52 @@ class TriAnnotPipeline (object):
     def prepareRetryMode(self):
         # Restore the configuration (from the SQLite database and the global file) and update the attributes of the main object
         self.restoreConfiguration()
+        self.checkSequenceFileChecksum()
+        self.sqliteObject.changeJournalMode(self.getSqliteJournalMode())
 
         # Generate a list of TriAnnotInstance objects with the data of the Instance table
         instancesToReinitialize = self.getInstanceObjectsFromDatabaseRequest(desiredInstanceStatus = [TriAnnotStatus.ERROR, TriAnnotStatus.CANCELED])
 
+        # The existing instance directories are renamed and compressed in background
+        self.initializeRetryPolicy()
+
         # Clean instances in error state
         for instance in instancesToReinitialize.values():
             # Backup the existing instance directory (zip archive) and delete it
-            instanceBackupArchive = instance.instanceDirectoryFullPath + '_backup.zip'
+            instanceBackupArchive = None
 
-            if Utils.isExistingFile(instanceBackupArchive):
-                self.logger.warning("The backup archive for %s already exists. Have you investigate enough on the reported errors before relaunching %s ?" % (instance.getDescriptionString(), self.programName))
-                os.remove(instanceBackupArchive)
+            if instance.instanceDirectoryFullPath is not None and Utils.isExistingDirectory(instance.instanceDirectoryFullPath):
+                if Utils.isExistingFile(instance.instanceDirectoryFullPath + '_backup.zip'):
+                    self.logger.warning("The backup archive for %s already exists. Have you investigate enough on the reported errors before relaunching %s ?" % (instance.getDescriptionString(), self.programName))
 
-            Utils.createDirectoryBackup(instance.instanceDirectoryFullPath, instanceBackupArchive)
-            shutil.rmtree(instance.instanceDirectoryFullPath)
-
-            # Create a temporary TriAnnotInstanceTableEntry object
-            tmpInstanceTableEntryObject = TriAnnotInstanceTableEntry()
-
-            # Update a part of its attributes (non instance* attribute) by the value of the current instance
-            for attributeName in dir(instance):
-                if attributeName.startswith('sequence') or attributeName.startswith('chunk'):
-                    setattr(tmpInstanceTableEntryObject, attributeName, getattr(instance, attributeName))
-
-            # Convert the object to dict and update it with the instance id
-            modifiedEntry = tmpInstanceTableEntryObject.convertToDict()
-            modifiedEntry.update({'id': instance.id, 'instanceBackupArchive': instanceBackupArchive})
+                instanceBackupArchive = self.retryPolicy.quarantineDirectory(instance.instanceDirectoryFullPath, '_backup')
 
             # Make the replacement in the SQLiteDatabase
-            self.sqliteObject.genericInsertOrReplaceFromDict(self.sqliteObject.instancesTableName, modifiedEntry)
+            self.reinitializeInstanceInDatabase(instance, instanceBackupArchive)
 
         # Get the updated list of instance
         self.instances = self.getInstanceObjectsFromDatabaseRequest()
 
 
+    def reinitializeInstanceInDatabase(self, instance, instanceBackupArchive):
+        # Create a temporary TriAnnotInstanceTableEntry object
+        tmpInstanceTableEntryObject = TriAnnotInstanceTableEntry()
+
+        # Update a part of its attributes (non instance* attribute) by the value of the current instance
+        for attributeName in dir(instance):
+            if attributeName.startswith('sequence') or attributeName.startswith('chunk'):
+                setattr(tmpInstanceTableEntryObject, attributeName, getattr(instance, attributeName))
+
+        # Convert the object to dict and update it with the instance id
+        modifiedEntry = tmpInstanceTableEntryObject.convertToDict()
+        modifiedEntry.update({'id': instance.id, 'instanceBackupArchive': instanceBackupArchive})
+
+        # Make the replacement in the SQLiteDatabase
+        self.sqliteObject.genericInsertOrReplaceFromDict(self.sqliteObject.instancesTableName, modifiedEntry)
+
+        return modifiedEntry
+
+
     ########################################################
     ##  Reconstruct mode specific initialization methods  ##
 
@@ -808,7 +1000,7 @@ class TriAnnotPipeline (object):
         # Tell the main parser that there will be subparsers
         self.subparsers = self.mainArgumentParser.add_subparsers(
                 title='Possible sub-commands (ie. execution modes)',
-                description="%s can be executed in five different modes.\nList of existing execution modes:" % self.programName,
+                description="%s can be executed in six different modes.\nList of existing execution modes:" % self.programName,
                 dest = "subparserName"
         )
 
@@ -846,8 +1038,8 @@ class TriAnnotPipeline (object):
             argparseDescription += "*******************************************************\n\n"
 
             argparseDescription += commonWarning
-            argparseDescription += "Valid command line example: %s --workdir my_directory run|monitor|resume|retry [sub-command options]\n" % self.programName
-            argparseDescription += "Invalid command line example: %s run|monitor|resume|retry --workdir my_directory [sub-command options]\n" % self.programName
+            argparseDescription += "Valid command line example: %s --workdir my_directory run|monitor|stats|resume|retry [sub-command options]\n" % self.programName
+            argparseDescription += "Invalid command line example: %s run|monitor|stats|resume|retry --workdir my_directory [sub-command options]\n" % self.programName
 
         else:
             additionalStars = '*' * (len(parserName) + len(TRIANNOT_VERSION))
@@ -896,6 +1088,15 @@ class TriAnnotPipeline (object):
                 description = self.generateArgparseDescription('monitor')
         )
 
+        # Stats mode subparser
+        self.statsArgumentParser = self.subparsers.add_parser(
+                'stats',
+                add_help = False,
+                formatter_class=argparse.RawTextHelpFormatter,
+                help="Display the throughput, queue wait and concurrency statistics of an existing analysis.\n%s\nThe statistics are computed from the history of the instances (submission, start and end of each execution).\n%s\n<%s %s -h>\n\n" % (databaseModeCommonMessage, commonMessage, self.programName, 'stats'),
+                description = self.generateArgparseDescription('stats')
+        )
+
         # Resume mode subparser
         self.resumeArgumentParser = self.subparsers.add_parser(
                 'resume',
@@ -928,6 +1129,7 @@ class TriAnnotPipeline (object):
         # Call the appropriate addArguments method depending on the selected sub-command
         {
             'monitor': self.addArgumentsToMonitorSubParser,
+            'stats': self.addArgumentsToStatsSubParser,
             'resume': self.addArgumentsToResumeSubParser,
             'retry': self.addArgumentsToRetrySubParser,
             'reconstruct': self.addArgumentsToReconstructSubParser,
@@ -1045,6 +1247,36 @@ class TriAnnotPipeline (object):
         self.writeProgressionToFile = commandLineArguments.writeProgressionToFile
 
 
+    ########################
+    ### Stats sub-parser ###
+
+    def addArgumentsToStatsSubParser(self):
+        # Argument groups
+        statsParserBasicOptionGroup = self.statsArgumentParser.add_argument_group('Basic arguments')
+        statsParserOtherOptionGroup = self.statsArgumentParser.add_argument_group('Other arguments')
+
+        # Basic subparser arguments
+        statsParserBasicOptionGroup.add_argument('-h', '--help', action='help', help='show this specific help message and exit')
+        statsParserBasicOptionGroup.add_argument('-v', '--version', action='version', version="TriAnnot version %s" % (TRIANNOT_VERSION))
+
+        # Other arguments
+        statsParserOtherOptionGroup.add_argument('--interval', dest = 'statisticsIntervalLength',
+                metavar = 'MINUTES',
+                type = int,
+                help = "Length (in minutes) of the time intervals used to display the throughput and the number of\nsimultaneous executions over time.\n\n",
+                default = 60)
+
+        # Define auto-executable check method
+        self.statsArgumentParser.set_defaults(func=self.checkAndStoreStatsModeArguments)
+
+
+    def checkAndStoreStatsModeArguments(self, commandLineArguments):
+        if commandLineArguments.statisticsIntervalLength <= 0:
+            self.statsArgumentParser.error("The length of the time intervals (specified through the --interval argument/option) must be a positive number of minutes")
+
+        self.statisticsIntervalLength = commandLineArguments.statisticsIntervalLength * 60
+
+
     #########################
     ### Resume sub-parser ###
 
@@ -1240,7 +1472,7 @@ class TriAnnotPipeline (object):
                 '-s', '--sequence',
                 dest = 'sequenceFilePath',
                 metavar = 'FASTA_FILE',
-                help = "Sequence file in Fasta format that contains the sequence(s) to annotate.\n\n",
+                help = "Sequence file in Fasta format that contains the sequence(s) to annotate (plain text or compressed with bgzip).\n\n",
                 default = None,
                 required = True
         )
@@ -1297,6 +1529,23 @@ class TriAnnotPipeline (object):
                 default = TriAnnotConfig.TRIANNOT_CONF['Global']['maxParallelAnalysis']
         )
 
+        self.runParserRunnerOptionGroup.add_argument(
+                '--scheduling',
+                dest = 'schedulingPolicy',
+                metavar = 'SCHEDULING_POLICY',
+                help = "Order in which the sequences/chunks will be submitted.\nPossible values are:\n  - fifo -> Order of the input sequence file\n  - largestFirst -> Largest chunks first (reduces the time spent waiting for a few huge chunks at the end of the analysis)\n  - roundRobin -> One chunk of each sequence before the next chunk of any sequence\n  - weighted -> Largest weighted chunks first (the weight of each sequence must be defined with the --weights argument)\nDefault value is: %s.\n" % TriAnnotConfig.TRIANNOT_CONF['Global']['schedulingPolicy'],
+                choices = TriAnnotScheduler.availablePolicies,
+                default = TriAnnotConfig.TRIANNOT_CONF['Global']['schedulingPolicy']
+        )
+
+        self.runParserRunnerOptionGroup.add_argument(
+                '--weights',
+                dest = 'sequenceWeightsFilePath',
+                metavar = 'WEIGHTS_FILE',
+                help = "Tabular file with one sequence name and one weight by line (sequences that are not listed have a weight of 1).\nOnly used with the <weighted> scheduling policy.\n",
+                default = None
+        )
+
     def fillRunParserSequenceOptionGroup(self):
         maxLengthParameterName = '--maxlength'
         splitSeqParameterName = '--splitseq'
@@ -1372,6 +1621,15 @@ class TriAnnotPipeline (object):
                 default = None
         )
 
+        self.runParserMiscOptionGroup.add_argument(
+                '--learn-from',
+                dest = 'pastDatabaseFilesPaths',
+                metavar = 'SQLITE_DATABASE_FILE',
+                help = "SQLite database file of a past TriAnnotPipeline analysis executed with the same step/task file.\nThe execution time and disk usage of its completed instances will be used to improve the runtime model\n(predicted duration/disk usage of each chunk) of the current step/task file.\nThis option can be used more than once.\n\n",
+                action = 'append',
+                default = None
+        )
+
         #self.runParserMiscOptionGroup.add_argument(
                 #'--email',
                 #dest = 'emailTo',
@@ -1413,6 +1671,14 @@ class TriAnnotPipeline (object):
         self.maxParallelAnalysis = commandLineArguments.maxParallelAnalysis
         self.checkMaxParallelAnalysisValue()
 
+        self.schedulingPolicy = commandLineArguments.schedulingPolicy
+        if commandLineArguments.sequenceWeightsFilePath is not None:
+            self.sequenceWeightsFileFullPath = os.path.realpath(os.path.expanduser(commandLineArguments.sequenceWeightsFilePath))
+            if not Utils.isExistingFile(self.sequenceWeightsFileFullPath):
+                self.mainArgumentParser.error("The sequence weights file specified with the --weights argument/option does not exists or is unreadable: %s" % self.sequenceWeightsFileFullPath)
+        elif self.schedulingPolicy == 'weighted':
+            self.mainArgumentParser.error("The --weights argument/option is mandatory when the <weighted> scheduling policy is selected !")
+
         # Input sequence(s) management related arguments (--minlength, --maxlength, --masked, --splitseq, --overlap)
         if commandLineArguments.minimumSequenceLength is not None:
             if type(commandLineArguments.minimumSequenceLength) is not int:
@@ -1479,6 +1745,20 @@ class TriAnnotPipeline (object):
 
         #self.emailTo = commandLineArguments.emailTo
 
+        # Runtime model related arguments (--learn-from)
+        if TriAnnotConfig.isConfigValueDefined('Global|runtimeModelsFile') and not Utils.isEmptyValue(TriAnnotConfig.getConfigValue('Global|runtimeModelsFile')):
+            self.runtimeModelsFileFullPath = os.path.realpath(os.path.expanduser(TriAnnotConfig.getConfigValue('Global|runtimeModelsFile')))
+
+        if commandLineArguments.pastDatabaseFilesPaths is not None:
+            if self.runtimeModelsFileFullPath is None:
+                self.mainArgumentParser.error("The --learn-from argument/option can't be used when the <runtimeModelsFile> entry of the Global configuration section is empty !")
+
+            for pastDatabaseFilePath in commandLineArguments.pastDatabaseFilesPaths:
+                pastDatabaseFileFullPath = os.path.realpath(os.path.expanduser(pastDatabaseFilePath))
+                if not Utils.isExistingFile(pastDatabaseFileFullPath) or Utils.isEmptyFile(pastDatabaseFileFullPath):
+                    self.mainArgumentParser.error("The SQLite database file specified with the --learn-from argument/option does not exists, is unreadable or is empty: %s" % pastDatabaseFileFullPath)
+                self.pastDatabaseFilesFullPaths.append(pastDatabaseFileFullPath)
+
 
     def checkRunners(self):
         # Check if the runner selected as "instance runner" is allowed to run instances
@@ -1750,6 +2030,9 @@ class TriAnnotPipeline (object):
         statusCounters = self.sqliteObject.getStatusCounters()
         self.displayStatusCounters(statusCounters)
 
+        # Estimate and display the remaining time (when a runtime model is available)
+        pendingChunksSizes = self.displayEstimatedRemainingTime()
+
         # Get & display sequence's status
         for sequenceName, chunkStatus in self.sqliteObject.getSequencesStatus(returnStatusAsString = True).items():
             self.logger.info('')
@@ -1758,6 +2041,9 @@ class TriAnnotPipeline (object):
                 self.logger.info("   Chunk %s:" % chunkName)
                 for attributeName, attributeValue in chunkAttributes.items():
                     self.logger.info("      %s: %s" % (attributeName.capitalize(), attributeValue))
+                if pendingChunksSizes.has_key((sequenceName, chunkName)):
+                    self.logger.info("      Predicted duration: %s" % TriAnnotRuntimeModel.convertSecondsToElapsedTime(self.runtimeModel.predictDuration(pendingChunksSizes[(sequenceName, chunkName)])))
+                    self.logger.info("      Predicted disk usage: %s" % Utils.getHumanlyReadableDiskUsage(self.runtimeModel.predictDiskUsage(pendingChunksSizes[(sequenceName, chunkName)])))
 
         # Write the progression in a file if needed
         if self.writeProgressionToFile:
@@ -1773,6 +2059,41 @@ class TriAnnotPipeline (object):
             self.writeAnalysisProgression(statusCounters)
 
 
+    def displayEstimatedRemainingTime(self):
+        # Initializations
+        pendingChunksSizes = dict()
+        remainingDurations = list()
+
+        # The runtime model is completed with the instances of the current analysis that are already completed (without saving it)
+        self.runtimeModel = self.loadRuntimeModel()
+        if self.runtimeModel is None:
+            return pendingChunksSizes
+
+        self.runtimeModel.learnFromDatabase(self.sqliteObject, self.sqliteDatabaseFileFullPath)
+        if not self.runtimeModel.isUsable():
+            self.logger.info('The remaining time can not be estimated yet (no completed instance for the current step/task file)')
+            return pendingChunksSizes
+
+        # Remaining computing time of each unfinished instance
+        for instanceStatus in [TriAnnotStatus.PENDING, TriAnnotStatus.SUBMITED, TriAnnotStatus.RUNNING]:
+            for instanceData in self.sqliteObject.getInstancesSchedulingData(instanceStatus):
+                instanceProgression = instanceData['instanceProgression'] if instanceData['instanceProgression'] is not None else 0
+                remainingDurations.append(self.runtimeModel.predictDuration(instanceData['chunkSize']) * (1 - instanceProgression / 100.0))
+                if instanceStatus == TriAnnotStatus.PENDING:
+                    pendingChunksSizes[(instanceData['sequenceName'], instanceData['chunkName'])] = instanceData['chunkSize']
+
+        if len(remainingDurations) == 0:
+            return pendingChunksSizes
+
+        # Instances are executed in parallel but the analysis can't end before its longest instance
+        self.estimatedRemainingTime = max(sum(remainingDurations) / max(1.0, float(self.maxParallelAnalysis)), max(remainingDurations))
+
+        self.logger.info('')
+        self.logger.info("Estimated remaining time: %s (Expected end of the analysis: %s)" % (TriAnnotRuntimeModel.convertSecondsToElapsedTime(self.estimatedRemainingTime), time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time() + self.estimatedRemainingTime))))
+
+        return pendingChunksSizes
+
+
     def writeAnalysisProgression(self, statusCounters = None):
         # Initializations
         progressFileHandler = None
@@ -1807,6 +2128,21 @@ class TriAnnotPipeline (object):
                 statusNameElement = etree.SubElement(statusCountersElement, statusCodeOrName.lower())
                 statusNameElement.text = str(statusCounter)
 
+            # Current maximum number of simultaneous analysis
+            if self.loadController is not None:
+                maxParallelAnalysisElement = etree.SubElement(xmlRoot, 'max_parallel_analysis')
+                maxParallelAnalysisElement.text = str(self.loadController.currentMaxParallelAnalysis)
+
+            # Current monitoring interval (in seconds)
+            if self.monitoringController is not None and self.monitoringController.lastInterval is not None:
+                monitoringIntervalElement = etree.SubElement(xmlRoot, 'monitoring_interval')
+                monitoringIntervalElement.text = "%.1f" % self.monitoringController.lastInterval
+
+            # Estimated remaining time (in seconds)
+            if self.estimatedRemainingTime is not None:
+                estimatedRemainingTimeElement = etree.SubElement(xmlRoot, 'estimated_remaining_time')
+                estimatedRemainingTimeElement.text = str(int(self.estimatedRemainingTime))
+
             # Status and progression percentage of every instances
             statusElement = etree.SubElement(xmlRoot, 'sequences_status')
 
@@ -1824,6 +2160,56 @@ class TriAnnotPipeline (object):
             progressFileHandler.write(etree.tostring(xmlRoot, 'ISO-8859-1'))
 
 
+    #############################################
+    ##  Stats mode specific execution methods  ##
+    #############################################
+
+    def displayInstanceEventStatistics(self):
+        # Rebuild the execution attempts of the instances from their history
+        eventStatistics = TriAnnotInstanceEventStatistics(self.sqliteObject.getChunkSizes(), self.statisticsIntervalLength)
+        eventStatistics.loadEvents(self.sqliteObject.iterateInstanceEvents(TriAnnotInstanceEventStatistics.usefulEventTypes))
+
+        if len(eventStatistics.attempts) == 0:
+            self.logger.warning("There is no execution history in the SQLite database of this analysis (the events of the instances are only recorded by the recent versions of TriAnnot)")
+            return
+
+        self.logger.info("The statistics of the <%d> execution attempt(s) of the analysis will now be displayed" % len(eventStatistics.attempts))
+        self.logger.info('')
+
+        # Outcome of the attempts
+        self.logger.info("Repartition of the execution attempts: %s" % ' / '.join(["%s = %d" % (outcome, nbAttempts) for outcome, nbAttempts in eventStatistics.getOutcomeCounters().items()]))
+        self.logger.info('')
+
+        # Distributions of the queue waits (by runner when several runners have been used) and of the execution times
+        self.displayDurationDistribution('Queue wait (submission to start)', eventStatistics.getQueueWaits())
+        if len(eventStatistics.getRunnerNames()) > 1:
+            for runnerName in eventStatistics.getRunnerNames():
+                self.displayDurationDistribution("Queue wait on runner <%s>" % runnerName, eventStatistics.getQueueWaits(runnerName))
+        self.displayDurationDistribution('Execution time (start to completion)', eventStatistics.getRunTimes())
+
+        # Throughput and concurrency over time
+        throughput = eventStatistics.computeThroughput()
+        concurrency = eventStatistics.computeConcurrency()
+
+        self.logger.info('')
+        self.logger.info("Throughput and simultaneous executions by interval of %s:" % TriAnnotRuntimeModel.convertSecondsToElapsedTime(self.statisticsIntervalLength))
+        self.logger.info("%-19s  %10s  %14s  %13s  %12s  %12s  %11s" % ('Interval start', 'Completed', 'Analyzed bp', 'Running mean', 'Running max', 'Queued mean', 'Queued max'))
+
+        for intervalStartTime, intervalThroughput in throughput.items():
+            intervalConcurrency = concurrency[intervalStartTime]
+            self.logger.info("%-19s  %10d  %14d  %13.1f  %12d  %12.1f  %11d" % (time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(intervalStartTime)), intervalThroughput['nbCompletedInstances'], intervalThroughput['nbAnalyzedBases'], intervalConcurrency['meanRunning'], intervalConcurrency['maxRunning'], intervalConcurrency['meanQueued'], intervalConcurrency['maxQueued']))
+
+
+    def displayDurationDistribution(self, distributionName, durations):
+        distributionSummary = TriAnnotInstanceEventStatistics.getDistributionSummary(durations)
+
+        if distributionSummary is None:
+            self.logger.info("%s: no data" % distributionName)
+            return
+
+        self.logger.info("%s for <%d> attempt(s): %s" % (distributionName, len(durations), ' / '.join(["%s = %s" % (statisticName, TriAnnotRuntimeModel.convertSecondsToElapsedTime(statisticValue)) for statisticName, statisticValue in distributionSummary.items()])))
+
+
     ###################################################
     ##  Result files reconstruction related methods  ##
     ###################################################
@@ -1921,6 +2307,15 @@ class TriAnnotPipeline (object):
         # Recovers useful information about the chunks from the database
         self.chunksData = self.sqliteObject.getChunkData(sequenceName)
 
+        # Special case: the sequence is a pack of small sequences whose result files must be split by sequence
+        if (len(self.chunksData) == 1 and sequenceName.startswith(TriAnnotSequencePacker.packNamePrefix)):
+            packedSequences = self.sqliteObject.getPackedSequences(sequenceName)
+            if len(packedSequences) > 0:
+                os.rmdir(currentSequenceReconstructionFolderFullPath)
+                self.logger.info("  => Sequence <%s> is a pack of <%d> small sequences analyzed together and its GFF result files will therefore be split by sequence" % (sequenceName, len(packedSequences)))
+                self.splitPackedSequencesGffFiles(self.chunksData[0]['instanceDirectoryFullPath'], packedSequences)
+                return
+
         # Special case: the sequence has not been splitted and there is no GFF file merging to do
         # We just have to copy the original GFF files in the appropriate subfolder of the Reconstructed_result_files folder
         if (len(self.chunksData) == 1):
@@ -1929,7 +2324,14 @@ class TriAnnotPipeline (object):
             self.copyEntireResultFolder(self.chunksData[0]['instanceDirectoryFullPath'], currentSequenceReconstructionFolderFullPath, TriAnnotConfig.TRIANNOT_CONF['DIRNAME']['EMBL_files'], sequenceName)
             return
 
-        self.logger.info("  => Sequence <%s> has been splitted into <%d> overlapping chunks during its analysis (Overlap size: %s)" % (sequenceName, len(self.chunksData), self.chunkOverlappingSize))
+        # Determine the start and end position of each chunk on the complete sequence they have been extracted from
+        self.determineChunkStartEndPositionOnGlobalSequence()
+
+        nbGapBoundaries = len([chunk for chunk in self.chunksData[1:] if not chunk['isOverlappingPreviousChunk']])
+        if nbGapBoundaries == 0:
+            self.logger.info("  => Sequence <%s> has been splitted into <%d> overlapping chunks during its analysis (Overlap size: %s)" % (sequenceName, len(self.chunksData), self.chunkOverlappingSize))
+        else:
+            self.logger.info("  => Sequence <%s> has been splitted into <%d> chunks during its analysis (Overlap size: %s - <%d> chunk boundary(ies) placed in a gap without overlap)" % (sequenceName, len(self.chunksData), self.chunkOverlappingSize, nbGapBoundaries))
 
         # Creation of the GFF and EMBL folders in the reconstruction folder of the current sequence
         if not Utils.isExistingDirectory(reconstructedGffFolderFullPath): os.mkdir(reconstructedGffFolderFullPath)
@@ -1938,15 +2340,52 @@ class TriAnnotPipeline (object):
         # Build the list of GFF files that will be merged for each concerned step of the current sequence
         self.getListOfGffFilesToMerge()
 
-        # Determine the start and end position of each chunk on the complete sequence they have been extracted from
-        self.determineChunkStartEndPositionOnGlobalSequence()
-
         # Global result files reconstruction
         for taskId, listOfGffFiles in self.gffFileToMergeByTask.items():
             # Build a unique GFF/EMBL result file for the current task based on all the result files generated for this task during each chunk analysis
             self.buildGlobalResultFileForCurrentTask(taskId, listOfGffFiles, currentSequenceReconstructionFolderFullPath, sequenceName)
 
 
+    def splitPackedSequencesGffFiles(self, instanceDirectoryFullPath, packedSequences):
+        # Initializations
+        packGffFolderFullPath = os.path.join(instanceDirectoryFullPath, TriAnnotConfig.TRIANNOT_CONF['DIRNAME']['GFF_files'])
+        memberGffFolderFullPaths = dict()
+
+        # Creation of the reconstruction folder of each member of the pack
+        for packedSequence in packedSequences:
+            memberGffFolderFullPaths[packedSequence['chunkName']] = os.path.join(self.globalReconstructionFolderFullPath, packedSequence['sequenceName'], TriAnnotConfig.TRIANNOT_CONF['DIRNAME']['GFF_files'])
+            if not Utils.isExistingDirectory(memberGffFolderFullPaths[packedSequence['chunkName']]): os.makedirs(memberGffFolderFullPaths[packedSequence['chunkName']])
+
+        if not Utils.isExistingDirectory(packGffFolderFullPath):
+            return
+
+        # The features of each sequence of the pack are identified by the first column (seqid) of the GFF lines
+        # Note: the comment lines (headers) are kept in the GFF file of every sequence
+        for gffFileName in sorted(os.listdir(packGffFolderFullPath)):
+            gffFileFullPath = os.path.join(packGffFolderFullPath, gffFileName)
+            if not Utils.isExistingFile(gffFileFullPath):
+                continue
+
+            memberGffFileHandlers = dict()
+            try:
+                for memberName, memberGffFolderFullPath in memberGffFolderFullPaths.items():
+                    memberGffFileHandlers[memberName] = open(os.path.join(memberGffFolderFullPath, gffFileName), 'w')
+
+                with open(gffFileFullPath, 'r') as packGffFileHandler:
+                    for gffLine in packGffFileHandler:
+                        if gffLine.startswith('#'):
+                            for memberGffFileHandler in memberGffFileHandlers.values():
+                                memberGffFileHandler.write(gffLine)
+                        elif memberGffFileHandlers.has_key(gffLine.split('\t', 1)[0]):
+                            memberGffFileHandlers[gffLine.split('\t', 1)[0]].write(gffLine)
+            except IOError as gffSplitError:
+                self.logger.error("Cannot split the following GFF file of a pack of small sequences: %s (%s)" % (gffFileFullPath, gffSplitError.strerror))
+                raise gffSplitError
+            finally:
+                for memberGffFileHandler in memberGffFileHandlers.values():
+                    memberGffFileHandler.close()
+
+
     def copyEntireResultFolder(self, instanceDirectoryFullPath, reconstructionFolderFullPath, folderType, sequenceName):
         self.logger.debug("The content of the %s folder for Sequence <%s> will now be copied in the appropriate reconstruction folder" % (folderType, sequenceName))
 
@@ -2000,11 +2439,16 @@ class TriAnnotPipeline (object):
             if chunk['chunkNumber'] == 0 or chunk['chunkNumber'] == 1:
                 chunk['chunkStartPosition'] = 1
                 chunk['chunkEndPosition'] = chunk['chunkSize']
+                chunk['isOverlappingPreviousChunk'] = False
             else:
-                chunk['chunkStartPosition'] = (lastChunkEndPosition - self.chunkOverlappingSize) + 1
+                # Two chunks do not overlap when their boundary has been placed in a gap (ie. when the next chunk starts where the previous one ends)
+                chunk['isOverlappingPreviousChunk'] = chunk['chunkStartOffset'] < lastChunkEndOffset
+                chunkOverlappingSize = self.chunkOverlappingSize if chunk['isOverlappingPreviousChunk'] else 0
+                chunk['chunkStartPosition'] = (lastChunkEndPosition - chunkOverlappingSize) + 1
                 chunk['chunkEndPosition'] = chunk['chunkStartPosition'] + chunk['chunkSize'] - 1
 
             lastChunkEndPosition = chunk['chunkEndPosition']
+            lastChunkEndOffset = chunk['chunkEndOffset']
 
 
     def buildGlobalResultFileForCurrentTask(self, taskId, listOfGffFiles, currentSequenceReconstructionFolderFullPath, sequenceName):
@@ -2186,9 +2630,9 @@ class TriAnnotPipeline (object):
             for masterFeatureId in gffFileFeatures.keys():
                 masterFeatureObject = gffFileFeatures[masterFeatureId]['featureObject']
 
-                # Special case - We are on the last chunk - All features can be kept except the one that start at the first base of the chunk
+                # Special case - We are on the last chunk - All features can be kept except the one that start at the first base of the chunk (truncated duplicate of a feature of the overlapping previous chunk)
                 if lastChunk:
-                    if masterFeatureObject['start'] != self.chunksData[gffFileIndex]['chunkStartPosition']:
+                    if masterFeatureObject['start'] != self.chunksData[gffFileIndex]['chunkStartPosition'] or not self.chunksData[gffFileIndex]['isOverlappingPreviousChunk']:
                         self.storeFeatureGroup(gffFileFeatures[masterFeatureId], keptFeaturesList)
                         self.deleteTreatedFeatureGroup(gffFileFeatures, masterFeatureId)
                     continue
@@ -2197,15 +2641,15 @@ class TriAnnotPipeline (object):
                 if masterFeatureObject['start'] <= self.chunksData[gffFileIndex + 1]['chunkStartPosition']:
                     # Keep features that start before the start of the next chunk
                     if gffFileIndex > 0:
-                        # Special case: do not keep features that start exactly at the beginning of a chunk (except for the first chunk)
-                        if masterFeatureObject['start'] != self.chunksData[gffFileIndex]['chunkStartPosition']:
+                        # Special case: do not keep features that start exactly at the beginning of a chunk (except for the first chunk and for the chunks that do not overlap the previous one)
+                        if masterFeatureObject['start'] != self.chunksData[gffFileIndex]['chunkStartPosition'] or not self.chunksData[gffFileIndex]['isOverlappingPreviousChunk']:
                             self.storeFeatureGroup(gffFileFeatures[masterFeatureId], keptFeaturesList)
                     else:
                         self.storeFeatureGroup(gffFileFeatures[masterFeatureId], keptFeaturesList)
                     self.deleteTreatedFeatureGroup(gffFileFeatures, masterFeatureId)
                 else:
-                    # Keep features that start after the start of the next chunk and end before the end of the current chunk
-                    if masterFeatureObject['end'] == self.chunksData[gffFileIndex]['chunkEndPosition']:
+                    # Keep features that start after the start of the next chunk and end before the end of the current chunk (the features truncated by the end of the chunk are found again on the overlapping next chunk)
+                    if masterFeatureObject['end'] == self.chunksData[gffFileIndex]['chunkEndPosition'] and self.chunksData[gffFileIndex + 1]['isOverlappingPreviousChunk']:
                         self.deleteTreatedFeatureGroup(gffFileFeatures, masterFeatureId)
                     else:
                         betterFeatureFound = False
@@ -2282,190 +2726,501 @@ class TriAnnotPipeline (object):
 
     def analyseSequenceFile(self):
         # Initializations
-        currentOffset = 0
-        instanceTableEntryObject = None
-        self.InstanceTableEntries = list()
-        sequenceNames = list()
-        chunkMaxSize = self.maximumSequenceLength
-        chunkInterval = chunkMaxSize - self.chunkOverlappingSize
+        fastaIndex = None
+        sequenceNames = None
+        isChunkPlanLoaded = False
 
         # Log
         self.logger.info("The fasta input file will now be analyzed")
 
-        # Open the fasta input file
+        # The offsets of a BGZF compressed fasta file are offsets in its uncompressed content: the chunks are extracted with the help of the .gzi index of the file
         try:
-            sequenceFileHandler = open(self.sequenceFileFullPath, 'rU')
-        except IOError:
-            self.logger.error("Could not open the following fasta sequence file (specified through the -s/--sequence argument): %s" % self.sequenceFileFullPath)
+            if TriAnnotBgzfFile.isBgzfFile(self.sequenceFileFullPath):
+                self.logger.info("The fasta input file is compressed with bgzip (BGZF format)")
+                TriAnnotBgzfFile(self.sequenceFileFullPath, self.mainExecDirFullPath).loadIndex()
+        except IOError as ex:
+            self.logger.error("Could not read the following BGZF compressed fasta sequence file (specified through the -s/--sequence argument): %s (%s)" % (self.sequenceFileFullPath, ex))
             exit(1)
 
-        # Read the sequence file line by line and treat each sequence (Note: the with statement allow auto-closing of the file)
-        with sequenceFileHandler:
-            # Get a line from the file
-            currentLine = sequenceFileHandler.readline()
-
-            while currentLine:
-                # Treat comment lines
-                if currentLine.startswith("#"):
-                    currentOffset += len(currentLine)
+        # The sequences and chunks are registered in the SQLite database as soon as they are computed (by batches, in a single transaction)
+        self.sqliteObject.startInstancesRegistration()
+        self.initializeSequencePacker()
+        self.initializeChunkBoundaryPlanner()
 
-                # Treat title/description lines
-                elif currentLine.startswith(">"):
-                    # Treat previous sequence if it exists
-                    if instanceTableEntryObject is not None:
-                        # Split the sequence into chunks if needed and store either the sequence
-                        self.finalizeSequenceTreatment(instanceTableEntryObject, sequenceGoalsObject.chunkStartOffsets, sequenceGoalsObject.chunkEndOffsets)
+        # Reuse the chunk plan - OR - the fasta index (.fai) of a previous analysis of the same fasta file to avoid the scan of the whole file
+        # Note: the chunk plan does not describe the packs of small sequences so it is not used when the sequence packing is activated
+        if not TriAnnotConfig.isConfigValueDefined('Global|persistentSequenceIndex') or TriAnnotConfig.getConfigValue('Global|persistentSequenceIndex').lower() == 'yes':
+            try:
+                fastaIndex = TriAnnotFastaIndex(self.sequenceFileFullPath, self.mainExecDirFullPath)
+            except (IOError, OSError):
+                self.logger.error("Could not open the following fasta sequence file (specified through the -s/--sequence argument): %s" % self.sequenceFileFullPath)
+                exit(1)
 
-                    # Increase the offset by the size of the line in bytes
-                    currentOffset += len(currentLine)
+            if self.sequencePacker is None:
+                sequenceNames = self.loadChunkPlan(fastaIndex)
+                isChunkPlanLoaded = sequenceNames is not None
 
-                    # Manage sequence name
-                    cleanSequenceName = self.getCleanSequenceName(currentLine)
-                    if cleanSequenceName in sequenceNames:
-                        self.logger.error("Each sequence name of the selected (multi-)fasta file must be unique. The following sequence name is used more than once: %s" % cleanSequenceName)
-                        exit(1)
-                    else:
-                        sequenceNames.append(cleanSequenceName)
+            if sequenceNames is None and fastaIndex.loadIndex():
+                sequenceNames = self.computeChunksFromIndex(fastaIndex)
 
-                    # Create a new TriAnnotInstanceTableEntry object for the new sequence
-                    instanceTableEntryObject = TriAnnotInstanceTableEntry(cleanSequenceName, self.sequenceType, currentOffset)
+        # The offsets are computed from large blocks of the file, the line by line analysis is only used for the files whose offsets can't be computed that way
+        if sequenceNames is None:
+            sequenceNames = self.scanSequenceFileByBlocks(fastaIndex)
+        if sequenceNames is None:
+            # Forget the sequences and chunks registered before the interruption of the block analysis
+            self.sqliteObject.cancelInstancesRegistration()
+            self.sqliteObject.startInstancesRegistration()
+            self.initializeSequencePacker()
 
-                    # Initialization of a TriAnnotSequenceGoals object
-                    sequenceGoalsObject = TriAnnotSequenceGoals(chunkInterval, chunkMaxSize, currentOffset)
+            sequenceNames = self.scanSequenceFileLineByLine()
 
-                # Treat sequence lines
-                else:
-                    if instanceTableEntryObject is not None:
-                        currentOffset = self.treatSequenceLine(currentLine, currentOffset, instanceTableEntryObject, sequenceGoalsObject)
+        # Register the last (incomplete) pack of small sequences
+        if self.sequencePacker is not None:
+            self.registerSequencePack(self.sequencePacker.closePack())
 
-                # Read a new line
-                currentLine = sequenceFileHandler.readline()
+        self.sqliteObject.finishInstancesRegistration()
 
-            # Treatment of the last sequence of the fasta file
-            if len(sequenceNames) >= 1:
-                self.finalizeSequenceTreatment(instanceTableEntryObject, sequenceGoalsObject.chunkStartOffsets, sequenceGoalsObject.chunkEndOffsets)
+        # Keep the index and the chunk plan for the next analyses of the same fasta file
+        if fastaIndex is not None and len(sequenceNames) > 0:
+            fastaIndex.saveIndex()
+            if not isChunkPlanLoaded and self.sequencePacker is None:
+                fastaIndex.saveChunkPlan(self.getChunkingParameters(), self.sqliteObject.iterateChunkDefinitions(TriAnnotFastaIndex.chunkAttributeNames))
 
         # Check and display of the number of generated sequences
         if len(sequenceNames) > 0:
             self.logger.info("The offset positions of <%d> sequence(s) has/have been successfully collected in the fasta input file !" % len(sequenceNames))
-            self.logger.info("Those sequence(s) has/have been devided into a total of <%d> chunk(s) !" % len(self.InstanceTableEntries))
+            self.logger.info("Those sequence(s) has/have been devided into a total of <%d> chunk(s) !" % self.sqliteObject.nbRegisteredInstances)
+            if self.chunkBoundaryPlanner is not None and self.chunkBoundaryPlanner.nbGapBoundaries > 0:
+                self.logger.info("<%d> chunk boundary(ies) has/have been placed in a gap of at least <%d> N (without overlap) !" % (self.chunkBoundaryPlanner.nbGapBoundaries, self.chunkBoundaryPlanner.minimumGapLength))
+            if self.sequencePacker is not None and self.sequencePacker.nbPacks > 0:
+                self.logger.info("<%d> small sequence(s) has/have been packed into <%d> multi-fasta instance(s) !" % (self.sequencePacker.nbPackedSequences, self.sequencePacker.nbPacks))
         else:
             self.logger.error("No sequence has been extracted from the fasta input file! Execution canceled..")
             exit(1)
 
 
-    def treatSequenceLine(self, currentLine, currentOffset, instanceTableEntryObject, sequenceGoalsObject):
-        # Check for non-IUPAC characters on the line
-        self.checkSequenceCharacters(currentLine, instanceTableEntryObject.sequenceName)
+    def initializeSequencePacker(self):
+        # Initializations
+        maximumPackedSequenceLength = 0
+        maximumPackLength = self.maximumSequenceLength
+        self.sequencePacker = None
+
+        if TriAnnotConfig.isConfigValueDefined('Global|sequencePackingMaximumSequenceLength'):
+            maximumPackedSequenceLength = int(TriAnnotConfig.getConfigValue('Global|sequencePackingMaximumSequenceLength'))
+        if TriAnnotConfig.isConfigValueDefined('Global|sequencePackingMaximumPackLength') and int(TriAnnotConfig.getConfigValue('Global|sequencePackingMaximumPackLength')) > 0:
+            maximumPackLength = int(TriAnnotConfig.getConfigValue('Global|sequencePackingMaximumPackLength'))
+
+        # The packing of the small sequences is disabled by default
+        if maximumPackedSequenceLength > 0 and maximumPackLength > maximumPackedSequenceLength:
+            # A pack is analyzed as a multi-fasta sequence file: every task of the step/task file must support it
+            incompatibleTaskTypes = TriAnnotSequencePacker.getIncompatibleTaskTypes([taskParameterObject.taskType for taskParameterObject in TriAnnotTaskFileChecker.allTaskParametersObjects.values()])
+            if len(incompatibleTaskTypes) > 0:
+                self.logger.error("The packing of the small sequences can't be used with the following task type(s) because their program or parser module does not support multi-fasta sequence files: %s" % ', '.join(incompatibleTaskTypes))
+                self.logger.info("Please, set the sequencePackingMaximumSequenceLength parameter of the global configuration to 0 to disable the packing of the small sequences.")
+                exit(1)
 
-        # Get line sizes
-        nbBytes = len(currentLine)
-        nbChar = len(currentLine.strip())
+            self.sequencePacker = TriAnnotSequencePacker(maximumPackedSequenceLength, maximumPackLength)
 
-        # Do not leave the current sequence line if all of its bases have not been consumed
-        unconsumedBases = nbChar
-        while unconsumedBases > 0:
-            # Case 0: The sequence is a proteic sequence bigger than maxProteicSequenceLength, we do not split the sequence into chunks but abort the execution
-            if self.sequenceType == 'proteic' and (sequenceGoalsObject.alreadyCountedBases + unconsumedBases) > self.maximumSequenceLength:
-                self.logger.error("Sequence %s is bigger than the maxProteicSequenceLength (%d)! Execution canceled.." % (instanceTableEntryObject.sequenceName, self.maximumSequenceLength))
-                exit(1)
 
-            # Case 1: The goal is on the current line
-            if (sequenceGoalsObject.alreadyCountedBases + unconsumedBases) >= sequenceGoalsObject.nextGoal:
-                # Determine the number of base to the next goal
-                nbCharToGoal = sequenceGoalsObject.nextGoal - sequenceGoalsObject.alreadyCountedBases
+    def initializeChunkBoundaryPlanner(self):
+        # Initializations
+        minimumGapLength = 100
+        gapSearchDistance = 50000
+        self.chunkBoundaryPlanner = None
 
-                # Update offset
-                if unconsumedBases == nbCharToGoal:
-                    currentOffset += nbCharToGoal + (nbBytes - nbChar)
-                else:
-                    currentOffset += nbCharToGoal
+        # The chunk boundaries are placed at fixed positions by default
+        if not TriAnnotConfig.isConfigValueDefined('Global|gapAwareChunkBoundaries') or TriAnnotConfig.getConfigValue('Global|gapAwareChunkBoundaries').lower() != 'yes':
+            return
 
-                # Store current goal offset and define next goal
-                if sequenceGoalsObject.nextGoalIsAStart:
-                    sequenceGoalsObject.chunkStartOffsets.append(currentOffset)
-                    if sequenceGoalsObject.nextEndGoal == 0:
-                        sequenceGoalsObject.nextEndGoal = sequenceGoalsObject.chunkMaxSize
-                    else:
-                        sequenceGoalsObject.nextEndGoal += sequenceGoalsObject.chunkInterval
-                    sequenceGoalsObject.nextGoal = sequenceGoalsObject.nextEndGoal
-                    sequenceGoalsObject.nextGoalIsAStart = False
-                else:
-                    sequenceGoalsObject.chunkEndOffsets.append(currentOffset)
-                    sequenceGoalsObject.nextStartGoal += sequenceGoalsObject.chunkInterval
-                    sequenceGoalsObject.nextGoal = sequenceGoalsObject.nextStartGoal
-                    sequenceGoalsObject.nextGoalIsAStart = True
+        if TriAnnotConfig.isConfigValueDefined('Global|boundaryGapMinimumLength'):
+            minimumGapLength = int(TriAnnotConfig.getConfigValue('Global|boundaryGapMinimumLength'))
+        if TriAnnotConfig.isConfigValueDefined('Global|boundaryGapSearchDistance'):
+            gapSearchDistance = int(TriAnnotConfig.getConfigValue('Global|boundaryGapSearchDistance'))
 
-                # Update "counters"
-                sequenceGoalsObject.alreadyCountedBases += nbCharToGoal
-                unconsumedBases -= nbCharToGoal
+        # The bases located around the chunk boundaries are read from the fasta input file
+        if self.sequenceExtractor is None:
+            self.sequenceExtractor = TriAnnotSequenceExtractor(self.sequenceFileFullPath)
 
-            # Case 2: The goal is NOT on the current line
-            else:
-                currentOffset += unconsumedBases + (nbBytes - nbChar)
-                sequenceGoalsObject.alreadyCountedBases += unconsumedBases
-                unconsumedBases = 0
+        self.chunkBoundaryPlanner = TriAnnotChunkBoundaryPlanner(self.sequenceExtractor, self.maximumSequenceLength, self.chunkOverlappingSize, minimumGapLength, gapSearchDistance)
 
-        # Update analysis object
-        instanceTableEntryObject.sequenceEndOffset = currentOffset
-        instanceTableEntryObject.sequenceSize += nbChar
 
-        return currentOffset
+    def getChunkingParameters(self):
+        # Initializations
+        boundaryGapMinimumLength = 0
+        boundaryGapSearchDistance = 0
 
+        if self.chunkBoundaryPlanner is not None:
+            boundaryGapMinimumLength = self.chunkBoundaryPlanner.minimumGapLength
+            boundaryGapSearchDistance = self.chunkBoundaryPlanner.gapSearchDistance
 
-    def getCleanSequenceName(self, descriptionLine):
-        # Regex to get the raw sequence name and description
-        match = re.match(r"^>(?P<sequenceName>[\S]+)\s*(?P<description>.*)", descriptionLine)
-        if not match:
-            self.logger.error("The following sequence has an invalid description line: %s" % descriptionLine)
-            exit(1)
+        return {'sequence_type': self.sequenceType, 'maximum_sequence_length': self.maximumSequenceLength, 'chunk_overlapping_size': self.chunkOverlappingSize, 'sequence_splitting': self.activateSequenceSplitting, 'boundary_gap_minimum_length': boundaryGapMinimumLength, 'boundary_gap_search_distance': boundaryGapSearchDistance}
 
-        sequenceName = match.group('sequenceName')
 
-        # Remove unwanted db prefix
-        match = re.match(r"^(gi|lcl|bbs|bbm|gim|gb|emb|pir|sp|ref|dbj|prf|pdb|tp[ged]|tr|gpp|nat|gnl\|[^\|]+)\|(?P<id>[^\|\s]+)", sequenceName)
-        if match is not None:
-            sequenceName = match.group('id')
+    def loadChunkPlan(self, fastaIndex):
+        # Initializations
+        sequenceNames = set()
+        currentSequenceName = None
+        numberOfChunk = 0
 
-        # Remove unauthorized characters
-        sequenceName = re.sub(r"[^\w#\.\-,=]", '_', sequenceName)
-        sequenceName = re.sub(r"_+$", '', sequenceName)
+        chunkPlanFileFullPath = fastaIndex.findChunkPlan(self.getChunkingParameters())
+        if chunkPlanFileFullPath is None:
+            return None
 
-        if (sequenceName == ''):
-            sequenceName = 'unknownId'
+        # Rebuild the TriAnnotInstanceTableEntry objects of the chunks (the chunks of a sequence are consecutive in the chunk plan)
+        for chunkData in fastaIndex.iterateChunkPlan(chunkPlanFileFullPath, self.getChunkingParameters()):
+            chunkObject = TriAnnotInstanceTableEntry(chunkData['sequenceName'], self.sequenceType, chunkData['sequenceStartOffset'], chunkData['sequenceEndOffset'], chunkData['sequenceSize'])
+            for attributeName in ['chunkName', 'chunkNumber', 'chunkStartOffset', 'chunkEndOffset', 'chunkSize']:
+                setattr(chunkObject, attributeName, chunkData[attributeName])
 
-        # Cancel TriAnnotPipeline execution if the current sequence name is greater than 50 characters (cause it may cause errors in certain version of RepeatMasker)
-        if self.sequenceType == 'nucleic':
-            if len(sequenceName) > 50:
-                self.logger.error("A sequence identifier longer than 50 characters has been detected: %s" % sequenceName)
-                self.logger.debug("Corresponding line is: %s" % descriptionLine)
-                self.logger.error("The following fasta input file is not valid: %s" % self.sequenceFileFullPath)
-                exit(1)
+            self.sqliteObject.registerInstance(chunkObject)
 
-        return sequenceName
+            # Add a new row in the Sequences table for each sequence
+            if chunkObject.sequenceName != currentSequenceName:
+                if currentSequenceName is not None:
+                    self.sqliteObject.registerSequence(currentSequenceName, numberOfChunk)
+                sequenceNames.add(chunkObject.sequenceName)
+                currentSequenceName = chunkObject.sequenceName
+                numberOfChunk = 0
+            numberOfChunk += 1
 
+        if currentSequenceName is not None:
+            self.sqliteObject.registerSequence(currentSequenceName, numberOfChunk)
 
-    def checkSequenceCharacters(self, lineToCheck, currentSequenceName):
-        # Define the regular expression pattern depending on the sequence type
+        self.logger.info("The <%d> chunk(s) of the fasta input file have been loaded from the following chunk plan file: %s" % (self.sqliteObject.nbRegisteredInstances, chunkPlanFileFullPath))
+
+        return sequenceNames
+
+
+    def computeChunksFromIndex(self, fastaIndex):
+        # Initializations
+        sequenceNames = set()
+        chunkMaxSize = self.maximumSequenceLength
+        chunkInterval = chunkMaxSize - self.chunkOverlappingSize
+
+        # Only the chunk boundaries are computed: the layout of the lines of each sequence is described by the index
+        for indexedSequence in fastaIndex.indexedSequences:
+            cleanSequenceName = self.registerSequenceName('>' + indexedSequence[0], sequenceNames)
+            instanceTableEntryObject = TriAnnotInstanceTableEntry(cleanSequenceName, self.sequenceType, indexedSequence[2])
+            sequenceGoalsObject = TriAnnotSequenceGoals(chunkInterval, chunkMaxSize, indexedSequence[2], recordLineRuns = self.chunkBoundaryPlanner is not None)
+
+            for firstLineOffset, nbCharactersByLine, nbLines, nbBytesByLine in fastaIndex.getLineRuns(indexedSequence):
+                self.treatLineRun(instanceTableEntryObject, sequenceGoalsObject, firstLineOffset, nbCharactersByLine, nbLines, nbBytesByLine)
+
+            self.finalizeSequenceTreatment(instanceTableEntryObject, sequenceGoalsObject)
+
+        return sequenceNames
+
+
+    def scanSequenceFileByBlocks(self, fastaIndex = None):
+        # Initializations
+        instanceTableEntryObject = None
+        sequenceNames = set()
+        chunkMaxSize = self.maximumSequenceLength
+        chunkInterval = chunkMaxSize - self.chunkOverlappingSize
+        scanEvents = self.getSequenceFileScanEvents()
+
+        try:
+            for event in scanEvents:
+                # Treat title/description lines
+                if event[0] == 'header':
+                    eventType, lineOffset, descriptionLine = event
+
+                    # Treat previous sequence if it exists
+                    if instanceTableEntryObject is not None:
+                        self.finalizeSequenceTreatment(instanceTableEntryObject, sequenceGoalsObject)
+
+                    # Create a new TriAnnotInstanceTableEntry object and a new TriAnnotSequenceGoals object for the new sequence
+                    cleanSequenceName = self.registerSequenceName(descriptionLine, sequenceNames)
+                    instanceTableEntryObject = TriAnnotInstanceTableEntry(cleanSequenceName, self.sequenceType, lineOffset + len(descriptionLine))
+                    sequenceGoalsObject = TriAnnotSequenceGoals(chunkInterval, chunkMaxSize, lineOffset + len(descriptionLine), recordLineRuns = self.chunkBoundaryPlanner is not None)
+
+                    if fastaIndex is not None:
+                        fastaIndex.startSequence(descriptionLine, lineOffset + len(descriptionLine))
+
+                # Sequence lines located before the first description line (only detected here when the file is analyzed by shards)
+                elif instanceTableEntryObject is None and (event[0] == 'lines' or event[0] == 'invalid'):
+                    self.logger.debug("The fasta input file will be analyzed line by line because some lines are located before the first description line")
+                    return None
+
+                # Treat runs of sequence lines of the same length
+                elif event[0] == 'lines':
+                    self.treatLineRun(instanceTableEntryObject, sequenceGoalsObject, *event[1:])
+
+                    if fastaIndex is not None:
+                        fastaIndex.addLineRun(*event[1:])
+
+                # Comment lines can't be described by the index
+                elif event[0] == 'comment':
+                    if fastaIndex is not None:
+                        fastaIndex.addCommentLine()
+
+                # Sequence line with non-IUPAC characters
+                elif event[0] == 'invalid':
+                    self.checkSequenceCharacters(event[2], instanceTableEntryObject.sequenceName)
+
+                # The offsets of the file can't be computed from its blocks
+                elif event[0] == 'unsupported':
+                    self.logger.debug("The fasta input file will be analyzed line by line because %s" % event[2])
+                    return None
+
+        except IOError:
+            self.logger.error("Could not open the following fasta sequence file (specified through the -s/--sequence argument): %s" % self.sequenceFileFullPath)
+            exit(1)
+
+        finally:
+            # Stop the scan processes (if any) when the analysis ends early
+            scanEvents.close()
+
+        # Treatment of the last sequence of the fasta file
+        if len(sequenceNames) >= 1:
+            self.finalizeSequenceTreatment(instanceTableEntryObject, sequenceGoalsObject)
+
+        if fastaIndex is not None:
+            fastaIndex.completeIndex()
+
+        return sequenceNames
+
+
+    def getSequenceFileScanEvents(self):
+        # Initializations
+        nbScanProcesses = cpu_count()
+        minimumFileSize = 256 * 1024 * 1024
+
+        if TriAnnotConfig.isConfigValueDefined('Global|sequenceAnalysisProcesses'):
+            nbScanProcesses = int(TriAnnotConfig.getConfigValue('Global|sequenceAnalysisProcesses'))
+
+        if TriAnnotConfig.isConfigValueDefined('Global|parallelSequenceAnalysisMinimumSize'):
+            minimumFileSize = int(TriAnnotConfig.getConfigValue('Global|parallelSequenceAnalysisMinimumSize'))
+
+        fastaScanner = TriAnnotFastaScanner(self.sequenceFileFullPath, self.sequenceType)
+
+        # Small files are scanned by the current process
+        if nbScanProcesses <= 1 or TriAnnotBgzfFile.getSequenceFileSize(self.sequenceFileFullPath) < minimumFileSize:
+            for event in fastaScanner.scanFile():
+                yield event
+            return
+
+        # Large files are split in shards (more shards than processes to balance the load) that are scanned simultaneously
+        # Note: the events of the shards are treated in the order of the file so the offsets, the chunks and the duplicated names are the same as with a single process
+        shardOffsets = fastaScanner.getShardOffsets(nbScanProcesses * 4)
+        shardDescriptions = [(self.sequenceFileFullPath, self.sequenceType, shardOffset, nextShardOffset) for shardOffset, nextShardOffset in zip(shardOffsets, shardOffsets[1:] + [None])]
+
+        self.logger.info("The fasta input file will be analyzed by <%d> processes (Number of shards: %d)" % (nbScanProcesses, len(shardDescriptions)))
+
+        scanPool = Pool(min(nbScanProcesses, len(shardDescriptions)))
+
+        try:
+            for shardEvents in scanPool.imap(scanSequenceFileShard, shardDescriptions):
+                for event in shardEvents:
+                    yield event
+                    if event[0] == 'unsupported':
+                        return
+        finally:
+            scanPool.terminate()
+            scanPool.join()
+
+
+    def treatLineRun(self, instanceTableEntryObject, sequenceGoalsObject, firstLineOffset, nbCharactersByLine, nbLines, nbBytesByLine):
+        # Case 0: The sequence is a proteic sequence bigger than maxProteicSequenceLength, we do not split the sequence into chunks but abort the execution
+        if self.sequenceType == 'proteic' and (sequenceGoalsObject.alreadyCountedBases + nbCharactersByLine * nbLines) > self.maximumSequenceLength:
+            self.logger.error("Sequence %s is bigger than the maxProteicSequenceLength (%d)! Execution canceled.." % (instanceTableEntryObject.sequenceName, self.maximumSequenceLength))
+            exit(1)
+
+        sequenceGoalsObject.consumeLineRun(firstLineOffset, nbCharactersByLine, nbLines, nbBytesByLine)
+
+        # Update analysis object
+        instanceTableEntryObject.sequenceEndOffset = firstLineOffset + nbLines * nbBytesByLine
+        instanceTableEntryObject.sequenceSize += nbCharactersByLine * nbLines
+
+
+    def scanSequenceFileLineByLine(self):
+        # Initializations
+        currentOffset = 0
+        instanceTableEntryObject = None
+        sequenceNames = set()
+        chunkMaxSize = self.maximumSequenceLength
+        chunkInterval = chunkMaxSize - self.chunkOverlappingSize
+
+        # Open the fasta input file
+        try:
+            if TriAnnotBgzfFile.isBgzfFile(self.sequenceFileFullPath):
+                sequenceFileHandler = TriAnnotBgzfFile(self.sequenceFileFullPath).open()
+            else:
+                sequenceFileHandler = open(self.sequenceFileFullPath, 'rU')
+        except IOError:
+            self.logger.error("Could not open the following fasta sequence file (specified through the -s/--sequence argument): %s" % self.sequenceFileFullPath)
+            exit(1)
+
+        # Read the sequence file line by line and treat each sequence (Note: the with statement allow auto-closing of the file)
+        with sequenceFileHandler:
+            # Get a line from the file
+            currentLine = sequenceFileHandler.readline()
+
+            while currentLine:
+                # Treat comment lines
+                if currentLine.startswith("#"):
+                    currentOffset += len(currentLine)
+
+                # Treat title/description lines
+                elif currentLine.startswith(">"):
+                    # Treat previous sequence if it exists
+                    if instanceTableEntryObject is not None:
+                        # Split the sequence into chunks if needed and store either the sequence
+                        self.finalizeSequenceTreatment(instanceTableEntryObject, sequenceGoalsObject)
+
+                    # Increase the offset by the size of the line in bytes
+                    currentOffset += len(currentLine)
+
+                    # Manage sequence name
+                    cleanSequenceName = self.registerSequenceName(currentLine, sequenceNames)
+
+                    # Create a new TriAnnotInstanceTableEntry object for the new sequence
+                    instanceTableEntryObject = TriAnnotInstanceTableEntry(cleanSequenceName, self.sequenceType, currentOffset)
+
+                    # Initialization of a TriAnnotSequenceGoals object
+                    sequenceGoalsObject = TriAnnotSequenceGoals(chunkInterval, chunkMaxSize, currentOffset, recordLineRuns = self.chunkBoundaryPlanner is not None)
+
+                # Treat sequence lines
+                else:
+                    if instanceTableEntryObject is not None:
+                        currentOffset = self.treatSequenceLine(currentLine, currentOffset, instanceTableEntryObject, sequenceGoalsObject)
+
+                # Read a new line
+                currentLine = sequenceFileHandler.readline()
+
+            # Treatment of the last sequence of the fasta file
+            if len(sequenceNames) >= 1:
+                self.finalizeSequenceTreatment(instanceTableEntryObject, sequenceGoalsObject)
+
+        return sequenceNames
+
+
+    def treatSequenceLine(self, currentLine, currentOffset, instanceTableEntryObject, sequenceGoalsObject):
+        # Check for non-IUPAC characters on the line
+        self.checkSequenceCharacters(currentLine, instanceTableEntryObject.sequenceName)
+
+        # Get line sizes
+        nbBytes = len(currentLine)
+        nbChar = len(currentLine.strip())
+
+        sequenceGoalsObject.storeLineRun(currentOffset, nbChar, 1, nbBytes)
+
+        # Do not leave the current sequence line if all of its bases have not been consumed
+        unconsumedBases = nbChar
+        while unconsumedBases > 0:
+            # Case 0: The sequence is a proteic sequence bigger than maxProteicSequenceLength, we do not split the sequence into chunks but abort the execution
+            if self.sequenceType == 'proteic' and (sequenceGoalsObject.alreadyCountedBases + unconsumedBases) > self.maximumSequenceLength:
+                self.logger.error("Sequence %s is bigger than the maxProteicSequenceLength (%d)! Execution canceled.." % (instanceTableEntryObject.sequenceName, self.maximumSequenceLength))
+                exit(1)
+
+            # Case 1: The goal is on the current line
+            if (sequenceGoalsObject.alreadyCountedBases + unconsumedBases) >= sequenceGoalsObject.nextGoal:
+                # Determine the number of base to the next goal
+                nbCharToGoal = sequenceGoalsObject.nextGoal - sequenceGoalsObject.alreadyCountedBases
+
+                # Update offset
+                if unconsumedBases == nbCharToGoal:
+                    currentOffset += nbCharToGoal + (nbBytes - nbChar)
+                else:
+                    currentOffset += nbCharToGoal
+
+                # Store current goal offset and define next goal
+                sequenceGoalsObject.storeGoalOffset(currentOffset)
+
+                # Update "counters"
+                sequenceGoalsObject.alreadyCountedBases += nbCharToGoal
+                unconsumedBases -= nbCharToGoal
+
+            # Case 2: The goal is NOT on the current line
+            else:
+                currentOffset += unconsumedBases + (nbBytes - nbChar)
+                sequenceGoalsObject.alreadyCountedBases += unconsumedBases
+                unconsumedBases = 0
+
+        # Update analysis object
+        instanceTableEntryObject.sequenceEndOffset = currentOffset
+        instanceTableEntryObject.sequenceSize += nbChar
+
+        return currentOffset
+
+
+    def registerSequenceName(self, descriptionLine, sequenceNames):
+        cleanSequenceName = self.getCleanSequenceName(descriptionLine)
+
+        if cleanSequenceName in sequenceNames:
+            self.logger.error("Each sequence name of the selected (multi-)fasta file must be unique. The following sequence name is used more than once: %s" % cleanSequenceName)
+            exit(1)
+
+        sequenceNames.add(cleanSequenceName)
+
+        return cleanSequenceName
+
+
+    def getCleanSequenceName(self, descriptionLine):
+        # Regex to get the raw sequence name and description
+        match = re.match(r"^>(?P<sequenceName>[\S]+)\s*(?P<description>.*)", descriptionLine)
+        if not match:
+            self.logger.error("The following sequence has an invalid description line: %s" % descriptionLine)
+            exit(1)
+
+        sequenceName = match.group('sequenceName')
+
+        # Remove unwanted db prefix
+        match = re.match(r"^(gi|lcl|bbs|bbm|gim|gb|emb|pir|sp|ref|dbj|prf|pdb|tp[ged]|tr|gpp|nat|gnl\|[^\|]+)\|(?P<id>[^\|\s]+)", sequenceName)
+        if match is not None:
+            sequenceName = match.group('id')
+
+        # Remove unauthorized characters
+        sequenceName = re.sub(r"[^\w#\.\-,=]", '_', sequenceName)
+        sequenceName = re.sub(r"_+$", '', sequenceName)
+
+        if (sequenceName == ''):
+            sequenceName = 'unknownId'
+
+        # Cancel TriAnnotPipeline execution if the current sequence name is greater than 50 characters (cause it may cause errors in certain version of RepeatMasker)
         if self.sequenceType == 'nucleic':
-            validationPattern = re.compile(r"[^ACGTURYSWKMBDHVN]+", re.IGNORECASE)
-        else:
-            validationPattern = re.compile(r"[^ABCDEFGHIKLMNPQRSTVWXYZ\*]+", re.IGNORECASE)
+            if len(sequenceName) > 50:
+                self.logger.error("A sequence identifier longer than 50 characters has been detected: %s" % sequenceName)
+                self.logger.debug("Corresponding line is: %s" % descriptionLine)
+                self.logger.error("The following fasta input file is not valid: %s" % self.sequenceFileFullPath)
+                exit(1)
+
+        return sequenceName
+
+
+    def checkSequenceCharacters(self, lineToCheck, currentSequenceName):
+        # Define the regular expression pattern depending on the sequence type (only once)
+        if self.sequenceValidationPattern is None:
+            if self.sequenceType == 'nucleic':
+                self.sequenceValidationPattern = re.compile(r"[^ACGTURYSWKMBDHVN]+", re.IGNORECASE)
+            else:
+                self.sequenceValidationPattern = re.compile(r"[^ABCDEFGHIKLMNPQRSTVWXYZ\*]+", re.IGNORECASE)
 
         # Cancel TriAnnotPipeline execution if a match is found
-        if validationPattern.search(lineToCheck.strip()):
+        if self.sequenceValidationPattern.search(lineToCheck.strip()):
             self.logger.error("Sequence <%s> contains unauthorized characters (ie. characters that are not included in the %s IUPAC code) !" % (currentSequenceName, self.sequenceType))
             self.logger.debug("Invalid line: %s" % lineToCheck)
             self.logger.error("The following fasta input file is not valid: %s" % self.sequenceFileFullPath)
             exit(1)
 
 
-    def finalizeSequenceTreatment(self, instanceTableEntry, chunkStartOffsets, chunkEndOffsets):
+    def finalizeSequenceTreatment(self, instanceTableEntry, sequenceGoalsObject):
+        # Initializations
+        chunkStartOffsets = sequenceGoalsObject.chunkStartOffsets
+        chunkEndOffsets = sequenceGoalsObject.chunkEndOffsets
+        chunkSizes = None
+
         # Store the last end offset
         chunkEndOffsets.append(instanceTableEntry.sequenceEndOffset)
 
         # Store the builded sequence - OR - split it into chunks and store the chunks
         if self.activateSequenceSplitting == True and instanceTableEntry.sequenceSize > self.maximumSequenceLength:
+            # Move the chunk boundaries into the gaps of the sequence when possible
+            if self.chunkBoundaryPlanner is not None:
+                plannedChunks = self.chunkBoundaryPlanner.planChunks(instanceTableEntry, sequenceGoalsObject.lineRuns)
+                if plannedChunks is not None:
+                    chunkStartOffsets, chunkEndOffsets, chunkSizes = [list(plannedValues) for plannedValues in zip(*plannedChunks)]
+
             # Get the number of chunks to create
             nbChunkToCreate = len(chunkEndOffsets) if (len(chunkEndOffsets) < len(chunkStartOffsets)) else len(chunkStartOffsets)
             self.logger.debug("Number of chunk to create for sequence <%s>: %d" % (instanceTableEntry.sequenceName, nbChunkToCreate))
@@ -2481,13 +3236,15 @@ class TriAnnotPipeline (object):
                 chunkObject.chunkStartOffset = chunkStartOffsets[chunkIndex]
                 chunkObject.chunkEndOffset = chunkEndOffsets[chunkIndex]
 
-                if chunkIndex != nbChunkToCreate - 1:
+                if chunkSizes is not None:
+                    chunkObject.chunkSize = chunkSizes[chunkIndex]
+                elif chunkIndex != nbChunkToCreate - 1:
                     chunkObject.chunkSize = self.maximumSequenceLength
                 else:
                     chunkObject.chunkSize = instanceTableEntry.sequenceSize - ((self.maximumSequenceLength - self.chunkOverlappingSize) * (nbChunkToCreate - 1))
 
-                # Store the chunk in the list
-                self.InstanceTableEntries.append(chunkObject)
+                # Register the chunk in the database
+                self.sqliteObject.registerInstance(chunkObject)
         else:
             # Update chunk related attributes (A non splitted sequence is actually a standalone chunk (chunk 0))
             nbChunkToCreate = 1
@@ -2495,11 +3252,46 @@ class TriAnnotPipeline (object):
             instanceTableEntry.chunkEndOffset = instanceTableEntry.sequenceEndOffset
             instanceTableEntry.chunkSize = instanceTableEntry.sequenceSize
 
-            # Store the sequence in the list
-            self.InstanceTableEntries.append(instanceTableEntry)
+            # Small sequences are registered later, all together with the other members of their pack
+            if self.sequencePacker is not None and self.sequencePacker.isPackableSequence(instanceTableEntry):
+                closedPackMembers = self.sequencePacker.addSequence(instanceTableEntry)
+                if closedPackMembers is not None:
+                    self.registerSequencePack(closedPackMembers)
+                return
+
+            # Register the sequence in the database
+            self.sqliteObject.registerInstance(instanceTableEntry)
 
         # Add a new row in the Sequences table
-        self.sqliteObject.genericInsertOrReplaceFromDict(self.sqliteObject.sequencesTableName, {'sequenceName': instanceTableEntry.sequenceName, 'numberOfChunk': nbChunkToCreate})
+        self.sqliteObject.registerSequence(instanceTableEntry.sequenceName, nbChunkToCreate)
+
+
+    def registerSequencePack(self, packMembers):
+        # A pack of a single sequence is registered as a standalone sequence
+        if len(packMembers) == 0:
+            return
+        elif len(packMembers) == 1:
+            self.sqliteObject.registerInstance(packMembers[0])
+            self.sqliteObject.registerSequence(packMembers[0].sequenceName, 1)
+            return
+
+        # Initializations
+        packName = self.sequencePacker.getLastPackName()
+        packSize = sum([packMember.sequenceSize for packMember in packMembers])
+
+        # The pack is analyzed as a single non splitted sequence (ie. a standalone chunk) whose fasta file contains all the members of the pack
+        packObject = TriAnnotInstanceTableEntry(packName, self.sequenceType, packMembers[0].sequenceStartOffset, packMembers[-1].sequenceEndOffset, packSize)
+        packObject.chunkName = packName
+        packObject.chunkStartOffset = packObject.sequenceStartOffset
+        packObject.chunkEndOffset = packObject.sequenceEndOffset
+        packObject.chunkSize = packSize
+
+        self.sqliteObject.registerInstance(packObject)
+        self.sqliteObject.registerSequence(packName, 1)
+
+        # The members of the pack are needed to build its fasta file and to split its result files
+        for memberNumber, packMember in enumerate(packMembers):
+            self.sqliteObject.registerPackedSequence(packName, memberNumber + 1, packMember)
 
 
     ############################################
@@ -2530,20 +3322,101 @@ class TriAnnotPipeline (object):
                     self.manageUnmonitorableInstance(instance)
 
 
+    def initializeFileWatcher(self):
+        # Initializations
+        requestedWatcherType = 'auto'
+        if TriAnnotConfig.isConfigValueDefined('Global|instanceFileWatcher'):
+            requestedWatcherType = TriAnnotConfig.getConfigValue('Global|instanceFileWatcher')
+
+        # Create the file watcher (kernel notifications when available, polling otherwise)
+        watcherType = TriAnnotFileWatcher.getBestWatcherType(requestedWatcherType, self.mainExecDirFullPath)
+        try:
+            self.fileWatcher = TriAnnotFileWatcher(watcherType, ['TriAnnot_progress', 'TriAnnot_finished'])
+        except OSError as err:
+            self.logger.warning("The <%s> file watcher can't be used (%s) - Switching to the <Polling> file watcher" % (watcherType, err))
+            self.fileWatcher = TriAnnotFileWatcher('Polling', ['TriAnnot_progress', 'TriAnnot_finished'])
+
+        self.logger.info("Instance files will be monitored with the following file watcher: %s" % self.fileWatcher.getWatcherDescription())
+
+        # Watch the execution folder of the instances that have already been submitted (resume mode)
+        for instance in self.instances.values():
+            if instance.instanceDirectoryFullPath is not None and Utils.isExistingDirectory(instance.instanceDirectoryFullPath):
+                self.fileWatcher.addWatch(instance.id, instance.instanceDirectoryFullPath)
+
+
+    def waitForInstancesEvents(self, activityDetected = False):
+        # Compute the monitoring interval based on the recent activity and on the expected end of the running instances
+        effectiveMonitoringInterval = self.monitoringController.getNextInterval(activityDetected or self.eventsDetectedDuringLastWait, self.getExpectedRemainingTimes())
+
+        # Collect the identifier of the instances that have created or updated their TriAnnot_progress/TriAnnot_finished file
+        identifiersWithEvents = self.fileWatcher.waitForEvents(effectiveMonitoringInterval)
+        self.eventsDetectedDuringLastWait = len(identifiersWithEvents) > 0
+
+        if len(identifiersWithEvents) > 0:
+            self.logger.debug("New TriAnnot_progress/TriAnnot_finished file(s) detected for <%d> instance(s)" % len(identifiersWithEvents))
+            self.instancesWithNewEvents.update(identifiersWithEvents)
+
+
+    def getExpectedRemainingTimes(self):
+        # Initializations
+        expectedRemainingTimes = list()
+        currentTime = time.time()
+
+        for instance in self.instances.values():
+            if instance.instanceStatus not in [TriAnnotStatus.SUBMITED, TriAnnotStatus.RUNNING] or instance.startTime is None:
+                continue
+
+            # The runtime model is used when available, the average duration of the instances completed since the beginning of the current execution otherwise
+            if self.runtimeModel is not None and self.runtimeModel.isUsable():
+                expectedRemainingTime = self.runtimeModel.predictDuration(instance.chunkSize) - (currentTime - instance.startTime)
+            else:
+                expectedRemainingTime = self.monitoringController.getExpectedRemainingTime('TriAnnotUnit', currentTime - instance.startTime)
+
+            # The instances that already run longer than predicted do not shorten the monitoring interval
+            if expectedRemainingTime is not None and expectedRemainingTime > 0:
+                expectedRemainingTimes.append(expectedRemainingTime)
+
+        return expectedRemainingTimes
+
+
+    def isFullStatusCheckNeeded(self):
+        # The files of every submitted/running instance are regularly checked even if no event has been detected (safety net for lost events)
+        if self.lastFullStatusCheckTime is None or time.time() - self.lastFullStatusCheckTime > int(self.stillAliveJobMonitoringInterval):
+            self.lastFullStatusCheckTime = time.time()
+            return True
+
+        return False
+
+
     def checkAndUpdateInstanceStatus(self):
+        # Initializations
+        fullStatusCheckNeeded = self.isFullStatusCheckNeeded()
+        instancesToCheck = self.instancesWithNewEvents
+        self.instancesWithNewEvents = set()
+
         for instance in self.instances.values():
             self.logger.debug("Status for %s is: %s" % (instance.getDescriptionString(), TriAnnotStatus.getStatusName(instance.instanceStatus)))
 
+            # Instance files are only read when something has changed in the instance execution folder
+            needToCheckFiles = fullStatusCheckNeeded or instance.id in instancesToCheck
+
             if instance.instanceStatus == TriAnnotStatus.PENDING:
                 # Nothing to do for PENDING instances at the moment
                 continue
 
-            elif instance.instanceStatus == TriAnnotStatus.SUBMITED and Utils.isExistingDirectory(instance.instanceDirectoryFullPath) and instance.isTriAnnotProgressFileAvailable():
+            elif instance.instanceStatus == TriAnnotStatus.SUBMITED and needToCheckFiles and Utils.isExistingDirectory(instance.instanceDirectoryFullPath) and instance.isTriAnnotProgressFileAvailable():
                 instance.instanceStatus = TriAnnotStatus.RUNNING
                 instance.getInstanceProgression()
                 self.sqliteObject.updateInstanceTableDuringMonitoring(instance.id, instance.instanceStatus, 0)
 
+                # The TriAnnot_finished file might have been created by the same batch of events
+                self.instancesWithNewEvents.add(instance.id)
+
             elif instance.instanceStatus == TriAnnotStatus.RUNNING:
+                # Nothing has changed in the execution folder of the instance since the last check
+                if not needToCheckFiles:
+                    continue
+
                 # Get instance progression from the TriAnnot_progress file if the execution is not already finished
                 if not instance.isExecutionFinishedBasedOnFiles():
                     instance.getInstanceProgression()
@@ -2555,9 +3428,9 @@ class TriAnnotPipeline (object):
 
             elif (instance.instanceStatus == TriAnnotStatus.SUBMITED or instance.instanceStatus == TriAnnotStatus.RUNNING) and time.time() - instance.checkedIsAliveTime > int(self.stillAliveJobMonitoringInterval):
                 if not instance.isStillAlive():
-                    instance.setErrorStatus("%s is not alive anymore" % instance.getDescriptionString().capitalize())
+                    instance.setErrorStatus("%s is not alive anymore" % instance.getDescriptionString().capitalize(), 'lostJob')
                 elif instance._cptFailedCheckStillAlive >= int(instance.runner.maximumFailedMonitoring):
-                    instance.setErrorStatus("Failed too many times to check if %s is still alive" % instance.getDescriptionString())
+                    instance.setErrorStatus("Failed too many times to check if %s is still alive" % instance.getDescriptionString(), 'monitoring')
                 instance.checkedIsAliveTime = time.time()
 
             if instance.instanceStatus == TriAnnotStatus.ERROR:
@@ -2592,12 +3465,14 @@ class TriAnnotPipeline (object):
             unitMainExecDirFullPath = os.path.join(self.mainExecDirFullPath, instance.sequenceName)
 
             # Try to create the main directory of the current TriAnnot unit
+            # Note: the directory might be created at the same time by a preparation thread working on another chunk of the same sequence
             if not Utils.isExistingDirectory(unitMainExecDirFullPath):
                 try:
                     os.mkdir(unitMainExecDirFullPath)
                 except OSError:
-                    self.logger.error("%s can't create the following main instance/unit directory for %s: %s" % (self.programName, instance.getDescriptionString(), unitMainExecDirFullPath))
-                    exit(1)
+                    if not Utils.isExistingDirectory(unitMainExecDirFullPath):
+                        self.logger.error("%s can't create the following main instance/unit directory for %s: %s" % (self.programName, instance.getDescriptionString(), unitMainExecDirFullPath))
+                        exit(1)
 
             # When the chunk number is equal to 0 (ie. not splitted sequence) there is no other subdirectories to create
             # We just have to update the instance object in this case
@@ -2618,25 +3493,28 @@ class TriAnnotPipeline (object):
                 instance.instanceDirectoryFullPath = chunkDirectoryFullPath
 
 
+    def prepareInstance(self, instance):
+        # Prepare directories
+        self.createInstanceDirectories(instance)
+
+        # Generate the fasta sequence file for the chunk (or the full sequence to analyze if there was no split)
+        self.generateSequenceFileFromOffsets(instance)
+
+
     def generateSequenceFileFromOffsets(self, instance):
         # Initializations
         instance.instanceFastaFileFullPath = os.path.join(instance.instanceDirectoryFullPath, instance.chunkName + '.fasta')
 
-        # Try to create an input file handler for the main fasta sequence file
+        # The main fasta sequence file is opened (and memory-mapped) once for all the instances
+        if self.sequenceExtractor is None:
+            self.sequenceExtractor = TriAnnotSequenceExtractor(self.sequenceFileFullPath)
+
         try:
-            mainSequenceFileHandler = open(self.sequenceFileFullPath, 'r')
-        except IOError:
+            self.sequenceExtractor.open()
+        except EnvironmentError:
             self.logger.error("%s can't open the main fasta sequence file for %s: %s" % (self.programName, instance.getDescriptionString(), self.sequenceFileFullPath))
             raise
 
-        # Get the portion of the file between the start offset and the end offset stored in the instance object
-        with mainSequenceFileHandler:
-            # Go to the start offset position
-            mainSequenceFileHandler.seek(instance.chunkStartOffset)
-
-            # Collect all the characters to the end offset (and removes end of line characters)
-            chunkSequenceAsString = "".join(mainSequenceFileHandler.read(instance.chunkEndOffset - instance.chunkStartOffset).splitlines())
-
         # Try to create an ouput file handler for the chunk fasta sequence file
         try:
             chunkSequenceFileHandler = open(instance.instanceFastaFileFullPath, 'w')
@@ -2644,24 +3522,102 @@ class TriAnnotPipeline (object):
             self.logger.error("%s can't create the chunk fasta sequence file for %s: %s" % (self.programName, instance.getDescriptionString(), instance.instanceFastaFileFullPath))
             raise
 
-        # Write the sequence to the file
+        # A pack of small sequences is written as a multi-fasta file (one entry by member of the pack)
+        sequencesToWrite = [{'chunkName': instance.chunkName, 'sequenceStartOffset': instance.chunkStartOffset, 'sequenceEndOffset': instance.chunkEndOffset}]
+        if instance.chunkNumber == 0 and instance.sequenceName.startswith(TriAnnotSequencePacker.packNamePrefix):
+            sequencesToWrite = self.sqliteObject.getPackedSequences(instance.sequenceName) or sequencesToWrite
+
+        # Write the sequence(s) to the file
         with chunkSequenceFileHandler:
-            chunkSequenceFileHandler.write('>' + instance.chunkName + '\n')
+            for sequenceToWrite in sequencesToWrite:
+                chunkSequenceFileHandler.write('>' + sequenceToWrite['chunkName'] + '\n')
+
+                # Copy the portion of the main fasta file between the start offset and the end offset stored in the instance object (80 characters par line)
+                # Note: the original sequence masking (lower case masking) is ignored or kept depending on the configuration
+                self.sequenceExtractor.writeSequence(chunkSequenceFileHandler, sequenceToWrite['sequenceStartOffset'], sequenceToWrite['sequenceEndOffset'], self.ignoreOriginalSequenceMasking)
 
-            # Ignore or keep original sequence masking (lower case masking)
-            if self.ignoreOriginalSequenceMasking:
-                chunkSequenceAsString = chunkSequenceAsString.upper()
 
-            # Split the sequence and print 80 characters par line
-            # Note: we can't write the sequence in one line here because it causes crashes with the BioPerl Bio::DB:fasta library (max line length is 65536 char per line and chunks might be longer)
-            for substring in Utils.subStringGenerator(chunkSequenceAsString, 80):
-                chunkSequenceFileHandler.write(substring + '\n')
+    def closeSequenceExtractor(self):
+        if self.sequenceExtractor is not None:
+            self.sequenceExtractor.close()
+            self.sequenceExtractor = None
 
 
     ############################################
     ##  Instances submission related methods  ##
     ############################################
 
+    def initializeInstancePreparationPool(self):
+        # Initializations
+        nbPreparationThreads = 2
+        if TriAnnotConfig.isConfigValueDefined('Global|instancePreparationThreads'):
+            nbPreparationThreads = int(TriAnnotConfig.getConfigValue('Global|instancePreparationThreads'))
+
+        if TriAnnotConfig.isConfigValueDefined('Global|instancePreparationDepth'):
+            self.instancePreparationDepth = int(TriAnnotConfig.getConfigValue('Global|instancePreparationDepth'))
+        else:
+            self.instancePreparationDepth = int(self.maxParallelAnalysis)
+
+        # Background preparation is disabled when no thread or no instance is requested (instances are then prepared right before their submission)
+        if nbPreparationThreads <= 0 or self.instancePreparationDepth <= 0:
+            self.logger.debug('Background preparation of the PENDING instances is disabled')
+            return
+
+        self.instancePreparationPool = ThreadPool(nbPreparationThreads)
+        self.logger.debug("Up to <%d> PENDING instances will be prepared in advance by <%d> thread(s)" % (self.instancePreparationDepth, nbPreparationThreads))
+
+
+    def closeInstancePreparationPool(self):
+        if self.instancePreparationPool is not None:
+            self.instancePreparationPool.close()
+            self.instancePreparationPool.join()
+            self.instancePreparationPool = None
+
+        self.instancePreparationResults.clear()
+
+
+    def prefetchInstances(self):
+        if self.instancePreparationPool is None:
+            return
+
+        # Forget the instances that will never be submitted (canceled or aborted in the meantime)
+        for instanceId in self.instancePreparationResults.keys():
+            if not self.instances.has_key(instanceId) or self.instances[instanceId].instanceStatus != TriAnnotStatus.PENDING:
+                self.instancePreparationResults.pop(instanceId)
+
+        # Prepare the instances that will be submitted next according to the scheduling policy
+        for instanceId in self.scheduler.getNextInstanceIdentifiers(self.instancePreparationDepth):
+            if self.instancePreparationResults.has_key(instanceId):
+                continue
+
+            instance = self.instances.get(instanceId)
+            if instance is None or instance.instanceStatus != TriAnnotStatus.PENDING:
+                continue
+
+            self.instancePreparationResults[instanceId] = self.instancePreparationPool.apply_async(self.prepareInstanceInBackground, (instance,))
+
+
+    def prepareInstanceInBackground(self, instance):
+        # Errors are not managed here: the preparation will be done again (and fail with the usual messages) by the main thread
+        try:
+            self.prepareInstance(instance)
+        except (Exception, SystemExit):
+            return False
+
+        return True
+
+
+    def waitForInstancePreparation(self, instance):
+        # Initializations
+        preparationResult = self.instancePreparationResults.get(instance.id)
+
+        # Wait for the end of the background preparation if needed
+        if preparationResult is not None and preparationResult.get():
+            return
+
+        self.prepareInstance(instance)
+
+
     def getNbInstancesToLaunch(self):
         # Initializations
         nbInstancesToLaunch = 0
@@ -2676,10 +3632,20 @@ class TriAnnotPipeline (object):
         if statusCounters[TriAnnotStatus.PENDING] > 0:
             self.logger.debug("There is still <%d> sequence(s) to analyze" % statusCounters[TriAnnotStatus.PENDING])
 
+            # Get the maximum number of simultaneous analysis (adjusted according to the number of pending jobs in the queue of the instance runner)
+            maxParallelAnalysis = self.loadController.getMaxParallelAnalysis(self.getInstanceRunnerProbe(), statusCounters[TriAnnotStatus.RUNNING])
+
+            # The scheduling daemon may grant a smaller share to leave room for the other analyses
+            if self.daemonClient is not None:
+                allocatedParallelAnalysis = self.daemonClient.requestParallelAnalysisShare(self.mainExecDirFullPath, statusCounters[TriAnnotStatus.SUBMITED] + statusCounters[TriAnnotStatus.RUNNING], statusCounters[TriAnnotStatus.PENDING])
+                if allocatedParallelAnalysis is not None:
+                    self.logger.debug("Share allocated by the scheduling daemon: <%d> simultaneous analysis" % allocatedParallelAnalysis)
+                    maxParallelAnalysis = min(maxParallelAnalysis, allocatedParallelAnalysis)
+
             # Can we submit new instances ?
-            if statusCounters[TriAnnotStatus.RUNNING] < self.maxParallelAnalysis:
+            if statusCounters[TriAnnotStatus.RUNNING] < maxParallelAnalysis:
                 # Determine the number of instance that can be run during this round
-                nbInstancesToLaunch = self.maxParallelAnalysis - statusCounters[TriAnnotStatus.RUNNING]
+                nbInstancesToLaunch = maxParallelAnalysis - statusCounters[TriAnnotStatus.RUNNING]
                 if statusCounters[TriAnnotStatus.PENDING] < nbInstancesToLaunch:
                     nbInstancesToLaunch = statusCounters[TriAnnotStatus.PENDING]
 
@@ -2688,43 +3654,317 @@ class TriAnnotPipeline (object):
         return nbInstancesToLaunch
 
 
+    def initializeDaemonClient(self):
+        # Initializations
+        daemonSocketFullPath = os.environ.get('TRIANNOT_DAEMON_SOCKET')
+        analysisWeight = os.environ.get('TRIANNOT_ANALYSIS_WEIGHT')
+
+        if daemonSocketFullPath is None and TriAnnotConfig.isConfigValueDefined('Global|schedulingDaemonSocket'):
+            daemonSocketFullPath = TriAnnotConfig.getConfigValue('Global|schedulingDaemonSocket')
+
+        if analysisWeight is None and TriAnnotConfig.isConfigValueDefined('Global|analysisWeight'):
+            analysisWeight = TriAnnotConfig.getConfigValue('Global|analysisWeight')
+
+        if daemonSocketFullPath is None or daemonSocketFullPath in ['', 'None']:
+            return
+
+        # The analysis runs on its own if the daemon can't be reached
+        # Note: the share can never exceed the highest maximum number of simultaneous analysis of the load controller
+        daemonClient = TriAnnotDaemonClient(daemonSocketFullPath)
+        highestMaxParallelAnalysis = self.loadController.maximumParallelAnalysis if self.loadController.dynamicParallelAnalysis else self.loadController.initialMaxParallelAnalysis
+
+        if not daemonClient.registerAnalysis(self.mainExecDirFullPath, float(analysisWeight or 1), highestMaxParallelAnalysis):
+            self.logger.warning("The scheduling daemon could not be reached through the following socket: %s (The analysis will not share its simultaneous analysis with other analyses)" % daemonSocketFullPath)
+            return
+
+        self.daemonClient = daemonClient
+        self.logger.info("The analysis has been registered with the scheduling daemon listening on <%s> (Weight: %s)" % (daemonSocketFullPath, analysisWeight or 1))
+
+
+    def closeDaemonClient(self):
+        if self.daemonClient is None:
+            return
+
+        self.daemonClient.unregisterAnalysis(self.mainExecDirFullPath, 'failed' if self.pipelineAbortedAfterManagedError else 'finished')
+        self.daemonClient = None
+
+
+    def getInstanceRunnerProbe(self):
+        # Any runner object of a submitted instance can be used to question the queue of the instance runner
+        for instance in self.instances.values():
+            if instance.runner is not None and instance.runner.jobid is not None:
+                return instance.runner
+
+        return None
+
+
+    def initializeRuntimeModel(self):
+        # The runtime model is disabled when no runtime models file is defined in the configuration
+        self.runtimeModel = self.loadRuntimeModel()
+        if self.runtimeModel is None:
+            return
+
+        # Learn from the past analyses selected through the --learn-from argument (run mode only)
+        if len(self.pastDatabaseFilesFullPaths) > 0:
+            for pastDatabaseFileFullPath in self.pastDatabaseFilesFullPaths:
+                pastSqliteObject = TriAnnotSqlite(pastDatabaseFileFullPath)
+                pastGlobalTaskFileFullPath = pastSqliteObject.recoverParametersFromDatabase()['globalTaskFileFullPath']
+
+                if pastSqliteObject.recoverGlobalFileChecksum(pastGlobalTaskFileFullPath) != self.runtimeModel.taskFileChecksum:
+                    self.logger.warning("The following past analysis has been executed with a different step/task file and will be ignored: %s" % pastDatabaseFileFullPath)
+                    pastSqliteObject.close()
+                    continue
+
+                if not self.runtimeModel.learnFromDatabase(pastSqliteObject, pastDatabaseFileFullPath):
+                    self.logger.warning("The following past analysis does not contain any completed instance: %s" % pastDatabaseFileFullPath)
+
+                pastSqliteObject.close()
+
+            self.runtimeModel.saveModels()
+
+        # Display predictions
+        if not self.runtimeModel.isUsable():
+            self.logger.info('There is no runtime model for the current step/task file yet (it will be built at the end of the analysis)')
+            return
+
+        predictedTotalDuration = 0.0
+        predictedTotalDiskUsage = 0.0
+        for instanceData in self.sqliteObject.getInstancesSchedulingData(TriAnnotStatus.PENDING):
+            predictedTotalDuration += self.runtimeModel.predictDuration(instanceData['chunkSize'])
+            predictedTotalDiskUsage += self.runtimeModel.predictDiskUsage(instanceData['chunkSize'])
+
+        self.logger.info("Based on <%d> previously analysed chunk(s), the PENDING instances should need %s of computing time and %s of disk space" % (self.runtimeModel.getNumberOfSamples(), TriAnnotRuntimeModel.convertSecondsToElapsedTime(predictedTotalDuration), Utils.getHumanlyReadableDiskUsage(predictedTotalDiskUsage)))
+
+        # Warn the user when the available disk space is probably too low
+        mainExecDirFileSystemStatistics = os.statvfs(self.mainExecDirFullPath)
+        availableDiskSpace = mainExecDirFileSystemStatistics.f_bavail * mainExecDirFileSystemStatistics.f_frsize
+        if predictedTotalDiskUsage > availableDiskSpace:
+            self.logger.warning("The available disk space in the main execution directory (%s) is probably not sufficient to analyze all PENDING instances !" % Utils.getHumanlyReadableDiskUsage(availableDiskSpace))
+
+
+    def loadRuntimeModel(self):
+        if self.runtimeModelsFileFullPath is None or self.globalTaskFileFullPath is None:
+            return None
+
+        # A runtime model is defined for each step/task file
+        runtimeModel = TriAnnotRuntimeModel(self.runtimeModelsFileFullPath, self.sqliteObject.recoverGlobalFileChecksum(self.globalTaskFileFullPath), self.taskFileDescription)
+        runtimeModel.loadModels()
+
+        return runtimeModel
+
+
+    def updateRuntimeModel(self):
+        if self.runtimeModel is None:
+            return
+
+        # Statistics of the current analysis are replaced at each execution (resume/retry modes)
+        if self.runtimeModel.learnFromDatabase(self.sqliteObject, self.sqliteDatabaseFileFullPath):
+            self.runtimeModel.saveModels()
+
+
+    def initializeScheduler(self):
+        # Initializations
+        sequenceWeights = None
+
+        # The scheduling policy might not be stored in the SQLite database of older analysis
+        if self.schedulingPolicy is None:
+            self.schedulingPolicy = 'fifo'
+
+        if self.sequenceWeightsFileFullPath is not None:
+            sequenceWeights = TriAnnotScheduler.loadSequenceWeightsFile(self.sequenceWeightsFileFullPath)
+
+        # Build the submission queue from the Instances table
+        self.scheduler = TriAnnotScheduler(self.schedulingPolicy, sequenceWeights)
+        self.scheduler.buildQueue(self.sqliteObject.getInstancesSchedulingData(TriAnnotStatus.PENDING))
+
+        self.logger.info("<%d> instance(s) will be submitted with the <%s> scheduling policy" % (self.scheduler.getQueueLength(), self.schedulingPolicy))
+
+
     def runInstances(self, nbInstancesToLaunch):
         # Initializations
         nbSubmittedInstances = 0
+        postponedInstanceIds = list()
+        arrayJobInstances = list()
 
-        for instance in self.instances.values():
-            if nbSubmittedInstances == nbInstancesToLaunch:
-                self.logger.debug("<%d> instances have been successfully submitted during this turn" % nbSubmittedInstances)
+        while nbSubmittedInstances + len(arrayJobInstances) < nbInstancesToLaunch:
+            # Get the PENDING instance with the highest priority
+            instanceId = self.scheduler.popNextInstanceIdentifier()
+            if instanceId is None:
                 break
+
+            # The instance might have been canceled or aborted since the creation of the queue
+            instance = self.instances.get(instanceId)
+            if instance is None or instance.instanceStatus != TriAnnotStatus.PENDING:
+                continue
+
+            # Prepare directories and the fasta sequence file (unless it has already been done in background)
+            self.waitForInstancePreparation(instance)
+
+            # Watch the execution folder of the instance before its submission to never miss its first TriAnnot_progress file
+            self.fileWatcher.addWatch(instance.id, instance.instanceDirectoryFullPath)
+
+            # Can we submit a new instance ? is some computing power available ?
+            if instance.initializeJobRunner('TriAnnotUnit'):
+                # Instances are grouped and submitted as an array job when the runner supports it
+                if instance.runner.isArrayJobSubmissionEnabled():
+                    arrayJobInstances.append(instance)
+
+                    # Submit the array job as soon as it reaches its maximum size
+                    if len(arrayJobInstances) >= instance.runner.maximumArrayJobSize:
+                        nbSubmittedInstances += self.runInstancesAsArrayJob(arrayJobInstances, postponedInstanceIds)
+                        arrayJobInstances = list()
+
+                # Effective submission of the execution job for the current instance
+                elif self.runinstanceJob(instance) == 0:
+                    self.markInstanceAsSubmitted(instance)
+
+                    # Increase the counter of successfully submitted instances
+                    nbSubmittedInstances += 1
+
+                # Failed submissions will be retried during the next turn (unless the maximum number of failed submission has been reached)
+                elif instance.instanceStatus == TriAnnotStatus.PENDING:
+                    postponedInstanceIds.append(instance.id)
             else:
-                if instance.instanceStatus == TriAnnotStatus.PENDING:
-                    # Prepare directories
-                    self.createInstanceDirectories(instance)
-
-                    # Generate the fasta sequence file for the chunk (or the full sequence to analyze if there was no split)
-                    self.generateSequenceFileFromOffsets(instance)
-
-                    # Can we submit a new instance ? is some computing power available ?
-                    if instance.initializeJobRunner('TriAnnotUnit'):
-                        # Effective submission of the execution job for the current instance
-                        if self.runinstanceJob(instance) == 0:
-                            instance.instanceStatus = TriAnnotStatus.SUBMITED
-                            instance.instanceJobIdentifier = instance.runner.jobid
-                            instance.setStartTime(time.time())
-
-                            # Update of the database at instance submission
-                            self.sqliteObject.updateInstanceTableAtSubmission(instance.id, instance.instanceStatus, instance.instanceSubmissionDate, instance.instanceFastaFileFullPath, instance.instanceDirectoryFullPath, instance.instanceJobIdentifier, instance.runner.monitoringCommand, instance.runner.killCommand)
-
-                            # Increase the counter of successfully submitted instances
-                            nbSubmittedInstances += 1
+                # If a critical problem occurs during the runner initialization we need to cancel the current instance at least or all instances at most
+                if instance.needToAbortPipeline:
+                    if not instance.runnerConfigurationIsOk:
+                        self.abortAllInstances(instance.abortPipelineReason)
+                        break
                     else:
-                        # If a critical problem occurs during the runner initialization we need to cancel the current instance at least or all instances at most
-                        if instance.needToAbortPipeline:
-                            if not instance.runnerConfigurationIsOk:
-                                self.abortAllInstances(instance.abortPipelineReason)
-                                break
-                            else:
-                                self.abortInstance(instance)
+                        self.abortInstance(instance)
+                else:
+                    # There is no computing power available at the moment so there is no need to try with the next instances
+                    postponedInstanceIds.append(instance.id)
+                    break
+
+        # Submission of the remaining grouped instances
+        nbSubmittedInstances += self.runInstancesAsArrayJob(arrayJobInstances, postponedInstanceIds)
+
+        # Postponed instances keep their priority for the next turn
+        for instanceId in postponedInstanceIds:
+            self.scheduler.pushBackInstanceIdentifier(instanceId)
+
+        self.logger.debug("<%d> instances have been successfully submitted during this turn" % nbSubmittedInstances)
+
+        return nbSubmittedInstances
+
+
+    def markInstanceAsSubmitted(self, instance):
+        instance.instanceStatus = TriAnnotStatus.SUBMITED
+        instance.instanceJobIdentifier = instance.runner.jobid
+        instance.setStartTime(time.time())
+
+        # The preparation result is not needed anymore
+        self.instancePreparationResults.pop(instance.id, None)
+
+        # Update of the database at instance submission (the submission is also appended to the history of the instance)
+        self.sqliteObject.recordInstanceEvent(instance.id, 'submission', instance.instanceStatus, runnerName = instance.runner.runnerType, jobIdentifier = instance.instanceJobIdentifier)
+        self.sqliteObject.updateInstanceTableAtSubmission(instance.id, instance.instanceStatus, instance.instanceSubmissionDate, instance.instanceFastaFileFullPath, instance.instanceDirectoryFullPath, instance.instanceJobIdentifier, instance.runner.monitoringCommand, instance.runner.killCommand, instance.instanceArrayTaskIndex)
+
+
+    def runInstancesAsArrayJob(self, arrayJobInstances, postponedInstanceIds):
+        # Some instances might have been aborted after their selection
+        arrayJobInstances = [instance for instance in arrayJobInstances if instance.instanceStatus == TriAnnotStatus.PENDING]
+
+        if len(arrayJobInstances) == 0:
+            return 0
+
+        # A single instance does not need an array job
+        if len(arrayJobInstances) == 1:
+            if self.runinstanceJob(arrayJobInstances[0]) == 0:
+                self.markInstanceAsSubmitted(arrayJobInstances[0])
+                return 1
+            elif arrayJobInstances[0].instanceStatus == TriAnnotStatus.PENDING:
+                postponedInstanceIds.append(arrayJobInstances[0].id)
+            return 0
+
+        # Submission of the array job (the runner of the first instance is used to submit the whole array job)
+        if self.runArrayJob(arrayJobInstances) == 0:
+            arrayJobIdentifier = arrayJobInstances[0].runner.jobid
+
+            for arrayTaskIndex, instance in enumerate(arrayJobInstances, 1):
+                # Each instance is monitored and killed through the identifier of its own array task
+                instance.runner.setArrayTaskJobIdentifier(arrayJobIdentifier, arrayTaskIndex)
+                instance.instanceSubmissionDate = arrayJobInstances[0].instanceSubmissionDate
+                instance.instanceArrayTaskIndex = arrayTaskIndex
+                instance._cptFailedCheckStillAlive = 0
+                instance._cptNotAlive = 0
+
+                self.markInstanceAsSubmitted(instance)
+
+            return len(arrayJobInstances)
+
+        # Failed submissions will be retried during the next turn (unless the maximum number of failed submission has been reached)
+        for instance in arrayJobInstances:
+            instance.failedSubmitCount = instance.failedSubmitCount + 1
+            if instance.failedSubmitCount >= int(instance.runner.maximumFailedSubmission):
+                instance.setErrorStatus("The maximum number of failed submission has been reached for %s !" % (instance.getDescriptionString()), 'submission')
+            else:
+                postponedInstanceIds.append(instance.id)
+
+        return 0
+
+
+    def runArrayJob(self, arrayJobInstances):
+        # Initializations
+        launchersDirectoryFullPath = os.path.join(self.mainExecDirFullPath, TriAnnotConfig.TRIANNOT_CONF['DIRNAME']['launcher_files'])
+        arrayRunner = arrayJobInstances[0].runner
+
+        # Jump in the directory which stores all job files
+        os.chdir(launchersDirectoryFullPath)
+
+        # Define job name and file names (the array job is named after its first instance)
+        jobName = self.shortIdentifier + "_" + arrayJobInstances[0].chunkName + "_array_analysis"
+        manifestFileFullPath = os.path.join(launchersDirectoryFullPath, "%s.manifest" % jobName)
+        arrayWrapperFileFullPath = os.path.join(launchersDirectoryFullPath, "%s.%s.sh" % (jobName, arrayRunner.runnerType))
+
+        # Create the shell wrapper of each instance (line N of the manifest file is the wrapper executed by array task N)
+        for instance in arrayJobInstances:
+            instance.wrapperFileFullPath = os.path.join(launchersDirectoryFullPath, "%s_%s_analysis.%s.sh" % (self.shortIdentifier, instance.chunkName, arrayRunner.runnerType))
+            self.buildTriAnnotUnitCommandLine(instance)
+            self.createShellWrapper(instance)
+
+        self.createArrayJobFiles(manifestFileFullPath, arrayWrapperFileFullPath, arrayRunner.arrayTaskIdentifierVariable, [instance.wrapperFileFullPath for instance in arrayJobInstances])
+
+        # Submit job
+        submissionDate = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.logger.info("Submitting a new %s array job for <%d> instances (from %s) - Runner: %s {%s}" % (arrayRunner.jobType, len(arrayJobInstances), arrayJobInstances[0].getDescriptionString(), arrayRunner.getRunnerDescription(), submissionDate))
+        submissionStatus = arrayRunner.submitJob(jobName, arrayWrapperFileFullPath, len(arrayJobInstances))
+
+        # Jump back in the main execution directory
+        os.chdir(self.mainExecDirFullPath)
+
+        # Check submission return value
+        if submissionStatus != 0:
+            self.logger.debug("Submission of the array job failed for <%d> instances (from %s)" % (len(arrayJobInstances), arrayJobInstances[0].getDescriptionString()))
+        else:
+            arrayJobInstances[0].instanceSubmissionDate = submissionDate
+            self.logger.debug("Submission of the array job successful for <%d> instances (array jobid is: %s)" % (len(arrayJobInstances), arrayRunner.jobid))
+
+        return submissionStatus
+
+
+    def createArrayJobFiles(self, manifestFileFullPath, arrayWrapperFileFullPath, arrayTaskIdentifierVariable, wrapperFileFullPaths):
+        # Write the manifest file
+        try:
+            with open(manifestFileFullPath, 'w') as manifestFileHandler:
+                manifestFileHandler.write("\n".join(wrapperFileFullPaths) + "\n")
+        except IOError:
+            self.logger.error("%s can't create the following array job manifest file: %s" % (self.programName, manifestFileFullPath))
+            raise
+
+        # Write the wrapper of the array job (each array task executes the wrapper of its own instance)
+        try:
+            with open(arrayWrapperFileFullPath, 'w') as bashFileHandler:
+                bashFileHandler.write("#!/usr/bin/env bash\n\n")
+                bashFileHandler.write("instanceWrapperFile=$(sed -n \"${%s}p\" %s)\n" % (arrayTaskIdentifierVariable, manifestFileFullPath))
+                bashFileHandler.write("exec \"$instanceWrapperFile\"\n")
+        except IOError:
+            self.logger.error("%s can't create the following array job launcher file: %s" % (self.programName, arrayWrapperFileFullPath))
+            raise
+
+        # Update wrapper file rights
+        os.system("chmod 750 %s" % arrayWrapperFileFullPath)
 
 
     def runinstanceJob(self, instance):
@@ -2733,6 +3973,8 @@ class TriAnnotPipeline (object):
 
         # Define job name and shell launcher full path
         jobName = self.shortIdentifier + "_" + instance.chunkName + "_analysis"
+        if instance.speculativeAttempt:
+            jobName += "_speculative"
         instance.wrapperFileFullPath = os.path.join(self.mainExecDirFullPath, TriAnnotConfig.TRIANNOT_CONF['DIRNAME']['launcher_files'], "%s.%s.sh" % (jobName, instance.runner.runnerType))
 
         # Build TAP Program/Parser launcher command line and create shell wrapper
@@ -2752,7 +3994,7 @@ class TriAnnotPipeline (object):
             instance.failedSubmitCount = instance.failedSubmitCount + 1
             self.logger.debug("Submission failed for %s (%s failure)" % (instance.getDescriptionString(), instance.failedSubmitCount))
             if instance.failedSubmitCount >= int(instance.runner.maximumFailedSubmission):
-                instance.setErrorStatus("The maximum number of failed submission has been reached for %s !" % (instance.getDescriptionString()))
+                instance.setErrorStatus("The maximum number of failed submission has been reached for %s !" % (instance.getDescriptionString()), 'submission')
             return submissionStatus
         else:
             instance._cptFailedCheckStillAlive = 0
@@ -2817,6 +4059,146 @@ class TriAnnotPipeline (object):
         os.system("chmod 750 %s" % instance.wrapperFileFullPath)
 
 
+    #############################################
+    ##  Speculative execution related methods  ##
+    #############################################
+
+    def launchSpeculativeAttempts(self):
+        # Initializations
+        nbLaunchedAttempts = 0
+        currentTime = time.time()
+
+        if self.stragglerDetector is None or not self.stragglerDetector.isEnabled():
+            return 0
+
+        # Speculative attempts are only launched in the tail of the analysis (ie. when every PENDING instance has been submitted)
+        if self.scheduler.getQueueLength() > 0:
+            return 0
+
+        # Speculative attempts must not exceed the maximum number of simultaneous analysis
+        nbActiveExecutions = len([instance for instance in self.instances.values() if instance.instanceStatus in [TriAnnotStatus.SUBMITED, TriAnnotStatus.RUNNING]]) + len(self.speculativeAttempts)
+
+        # The oldest instances are checked first
+        for instance in sorted(self.instances.values(), key = lambda instance: instance.startTime):
+            if len(self.speculativeAttempts) >= self.stragglerDetector.maximumSpeculativeInstances or nbActiveExecutions >= self.loadController.currentMaxParallelAnalysis:
+                break
+
+            # Only one speculative attempt by instance
+            if instance.instanceStatus != TriAnnotStatus.RUNNING or instance.startTime is None or instance.id in self.speculatedInstanceIds:
+                continue
+
+            if not self.stragglerDetector.isStraggler(instance.chunkSize, currentTime - instance.startTime, instance.instanceProgression, self.runtimeModel):
+                continue
+
+            self.logger.info("%s looks like a straggler (Elapsed time: %s - Progression: %s%%) and will be executed a second time" % (instance.getDescriptionString().capitalize(), TriAnnotRuntimeModel.convertSecondsToElapsedTime(currentTime - instance.startTime), instance.instanceProgression))
+
+            if not self.runSpeculativeAttempt(instance):
+                # There is no computing power available at the moment
+                break
+
+            nbLaunchedAttempts += 1
+            nbActiveExecutions += 1
+
+        return nbLaunchedAttempts
+
+
+    def runSpeculativeAttempt(self, instance):
+        # Initializations
+        attemptDirectoryFullPath = os.path.join(self.mainExecDirFullPath, 'Speculative_attempts', instance.chunkName)
+
+        # Each speculative attempt starts from an empty directory
+        if Utils.isExistingDirectory(attemptDirectoryFullPath):
+            shutil.rmtree(attemptDirectoryFullPath)
+        os.makedirs(attemptDirectoryFullPath)
+
+        speculativeAttempt = instance.createSpeculativeAttempt(attemptDirectoryFullPath)
+        self.generateSequenceFileFromOffsets(speculativeAttempt)
+
+        if not speculativeAttempt.initializeJobRunner('TriAnnotUnit') or self.runinstanceJob(speculativeAttempt) != 0:
+            return False
+
+        speculativeAttempt.instanceStatus = TriAnnotStatus.SUBMITED
+        speculativeAttempt.instanceJobIdentifier = speculativeAttempt.runner.jobid
+        speculativeAttempt.setStartTime(time.time())
+
+        # The speculative attempt is a new execution attempt in the history of the instance
+        self.sqliteObject.recordInstanceEvent(instance.id, 'submission', speculativeAttempt.instanceStatus, runnerName = speculativeAttempt.runner.runnerType, jobIdentifier = speculativeAttempt.instanceJobIdentifier)
+
+        self.speculativeAttempts[instance.id] = speculativeAttempt
+        self.speculatedInstanceIds.add(instance.id)
+        self.stragglerDetector.nbLaunchedAttempts += 1
+
+        return True
+
+
+    def checkSpeculativeAttempts(self):
+        for instanceId, speculativeAttempt in self.speculativeAttempts.items():
+            instance = self.instances[instanceId]
+
+            # Update the status of the speculative attempt
+            if speculativeAttempt.instanceStatus == TriAnnotStatus.SUBMITED and speculativeAttempt.isTriAnnotProgressFileAvailable():
+                speculativeAttempt.instanceStatus = TriAnnotStatus.RUNNING
+                self.recordSpeculativeExecutionEvent(speculativeAttempt, 'start', speculativeAttempt.instanceStatus)
+
+            if speculativeAttempt.instanceStatus in [TriAnnotStatus.SUBMITED, TriAnnotStatus.RUNNING] and not speculativeAttempt.isExecutionFinishedBasedOnFiles():
+                if time.time() - speculativeAttempt.checkedIsAliveTime > int(self.stillAliveJobMonitoringInterval):
+                    if not speculativeAttempt.isStillAlive():
+                        speculativeAttempt.setErrorStatus("%s is not alive anymore" % speculativeAttempt.getDescriptionString().capitalize(), 'lostJob')
+                    speculativeAttempt.checkedIsAliveTime = time.time()
+
+            # The speculative attempt has finished first: the original instance is stopped
+            if speculativeAttempt.instanceStatus == TriAnnotStatus.COMPLETED and instance.instanceStatus != TriAnnotStatus.COMPLETED:
+                self.logger.info("The %s has finished before the original instance which will now be killed" % speculativeAttempt.getDescriptionString())
+                if not instance.isExecutionFinishedBasedOnStatus():
+                    self.stopSpeculationLoser(instance)
+                self.replaceInstanceBySpeculativeAttempt(instance, speculativeAttempt)
+                self.stragglerDetector.nbWinningAttempts += 1
+
+            # The speculative attempt has failed: the original instance continues alone
+            elif speculativeAttempt.isExecutionFinishedBasedOnStatus():
+                self.logger.warning("The %s has failed - The original instance will continue alone" % speculativeAttempt.getDescriptionString())
+                speculativeAttempt.postExecutionTreatments()
+                self.recordSpeculativeExecutionEvent(speculativeAttempt, 'completion', speculativeAttempt.instanceStatus)
+                self.speculativeAttempts.pop(instanceId)
+
+            # The original instance has finished first (or has been canceled): the speculative attempt is stopped
+            elif instance.instanceStatus in [TriAnnotStatus.COMPLETED, TriAnnotStatus.CANCELED]:
+                self.logger.info("%s has finished before its speculative attempt which will now be killed" % instance.getDescriptionString().capitalize())
+                self.stopSpeculationLoser(speculativeAttempt)
+                self.speculativeAttempts.pop(instanceId)
+
+            # The original instance has failed: the speculative attempt becomes the only execution of the instance
+            elif instance.instanceStatus == TriAnnotStatus.ERROR:
+                self.logger.info("%s has failed but its speculative attempt is still running and will replace it" % instance.getDescriptionString().capitalize())
+                instance.postExecutionTreatments()
+                self.recordSpeculativeExecutionEvent(instance, 'completion', instance.instanceStatus)
+                self.replaceInstanceBySpeculativeAttempt(instance, speculativeAttempt)
+
+
+    def stopSpeculationLoser(self, instanceOrAttempt):
+        # The tasks of the slowest execution are always killed
+        instanceOrAttempt.abort(True)
+        instanceOrAttempt.postExecutionTreatments()
+        self.recordSpeculativeExecutionEvent(instanceOrAttempt, 'abort', TriAnnotStatus.CANCELED)
+
+
+    def recordSpeculativeExecutionEvent(self, instanceOrAttempt, eventType, instanceStatus):
+        # The two executions of a speculated instance are distinguished by their job identifier in the history of the instance
+        self.sqliteObject.recordInstanceEvent(instanceOrAttempt.id, eventType, instanceStatus, instanceOrAttempt.instanceProgression, instanceOrAttempt.runner.runnerType if instanceOrAttempt.runner is not None else None, instanceOrAttempt.instanceJobIdentifier)
+
+
+    def replaceInstanceBySpeculativeAttempt(self, instance, speculativeAttempt):
+        self.speculativeAttempts.pop(instance.id)
+        self.instances[instance.id] = speculativeAttempt
+
+        # The execution folder of the speculative attempt becomes the execution folder of the instance (used for the reconstruction of the result files)
+        self.sqliteObject.updateInstanceTableAtSubmission(speculativeAttempt.id, speculativeAttempt.instanceStatus, speculativeAttempt.instanceSubmissionDate, speculativeAttempt.instanceFastaFileFullPath, speculativeAttempt.instanceDirectoryFullPath, speculativeAttempt.instanceJobIdentifier, speculativeAttempt.runner.monitoringCommand, speculativeAttempt.runner.killCommand)
+
+        if self.fileWatcher is not None:
+            self.fileWatcher.removeWatch(instance.id)
+            self.fileWatcher.addWatch(speculativeAttempt.id, speculativeAttempt.instanceDirectoryFullPath)
+
+
     ######################################################
     ##  Completed instances management related methods  ##
     ######################################################
@@ -2824,11 +4206,20 @@ class TriAnnotPipeline (object):
     def treatFinishedOrCanceledInstances(self):
         for instance in self.instances.values():
             if instance.isExecutionFinishedBasedOnStatus():
+                # Failed instances might be submitted again without any human intervention
+                if instance.instanceStatus == TriAnnotStatus.ERROR and self.scheduleInstanceRetry(instance):
+                    continue
+
                 self.logger.info("%s is finished - Exit status is: %s" % (instance.getDescriptionString().capitalize(), TriAnnotStatus.getStatusName(instance.instanceStatus)))
 
                 # Post execution treatments
                 instance.postExecutionTreatments()
 
+                # Keep track of the duration of the successful executions (used to adapt the monitoring interval and to detect stragglers)
+                if self.monitoringController is not None and instance.instanceStatus == TriAnnotStatus.COMPLETED and instance.startTime is not None:
+                    self.monitoringController.recordJobDuration('TriAnnotUnit', time.time() - instance.startTime)
+                    self.stragglerDetector.recordCompletedInstance(instance.chunkSize, time.time() - instance.startTime)
+
                 # Update tables in the SQLite database
                 self.setInstanceAsFinishedInDatabase(instance)
 
@@ -2836,13 +4227,79 @@ class TriAnnotPipeline (object):
                     self.updateSystemStatistics(instance)
 
                 # Delete the compressed backup archive if the new execution attempt of the instance has been successful
-                if Utils.isExistingFile(instance.instanceBackupArchive) and instance.instanceStatus == TriAnnotStatus.COMPLETED:
-                    os.remove(instance.instanceBackupArchive)
+                if instance.instanceBackupArchive is not None and instance.instanceStatus == TriAnnotStatus.COMPLETED:
+                    if self.retryPolicy is not None:
+                        self.retryPolicy.waitForCompression(instance.instanceBackupArchive)
+                    if Utils.isExistingFile(instance.instanceBackupArchive):
+                        os.remove(instance.instanceBackupArchive)
+
+                # Stop watching the execution folder of the instance
+                if self.fileWatcher is not None:
+                    self.fileWatcher.removeWatch(instance.id)
 
                 # Remove the current instance from the list of instances to submit/monitor
                 self.instances.pop(instance.id)
 
 
+    def initializeRetryPolicy(self):
+        if self.retryPolicy is not None:
+            return
+
+        self.retryPolicy = TriAnnotRetryPolicy()
+        self.logger.debug("Automatic retry of failed instances: %s" % self.retryPolicy.getPolicyDescription())
+
+
+    def scheduleInstanceRetry(self, instance):
+        # Initializations
+        errorClass = instance.errorClass if instance.errorClass is not None else 'unknown'
+        instanceBackupArchive = None
+
+        # Check if the retry policy allows a new attempt for this class of error
+        retryDelay = self.retryPolicy.registerRetry(instance.id, errorClass) if self.retryPolicy is not None else None
+        if retryDelay is None:
+            return False
+
+        nbRetries = self.retryPolicy.getNumberOfRetries(instance.id)
+        self.logger.warning("%s has failed (Error class: %s) and will be submitted again in %d second(s) (Automatic retry number %d)" % (instance.getDescriptionString().capitalize(), errorClass, retryDelay, nbRetries))
+
+        # An instance that could not be monitored might still be running and must be stopped
+        if errorClass == 'monitoring':
+            instance.abort(True)
+
+        instance.postExecutionTreatments()
+
+        # Stop watching the execution folder of the failed attempt
+        if self.fileWatcher is not None:
+            self.fileWatcher.removeWatch(instance.id)
+
+        # The execution folder of the failed attempt is renamed right now and compressed in background
+        if instance.instanceDirectoryFullPath is not None and Utils.isExistingDirectory(instance.instanceDirectoryFullPath):
+            instanceBackupArchive = self.retryPolicy.quarantineDirectory(instance.instanceDirectoryFullPath, "_failed_attempt_%d" % nbRetries)
+
+        # Make the instance PENDING again (in the database and in the list of instances)
+        self.sqliteObject.recordInstanceEvent(instance.id, 'retry', instance.instanceStatus)
+        modifiedEntry = self.reinitializeInstanceInDatabase(instance, instanceBackupArchive)
+
+        jobRunnerName = self.instanceJobRunnerName
+        if self.retryPolicy.needFallbackRunner(errorClass):
+            jobRunnerName = TriAnnotConfig.getConfigValue('Global|FallbackJobRunner')
+            self.logger.info("The next attempt of %s will be submitted with the fallback runner: %s" % (instance.getDescriptionString(), jobRunnerName))
+
+        self.instances[instance.id] = TriAnnotInstance(modifiedEntry, jobRunnerName)
+
+        return True
+
+
+    def queueInstancesReadyForRetry(self):
+        if self.retryPolicy is None:
+            return
+
+        for instanceId in self.retryPolicy.popInstancesReadyForRetry():
+            instance = self.instances.get(instanceId)
+            if instance is not None and instance.instanceStatus == TriAnnotStatus.PENDING:
+                self.scheduler.addInstanceIdentifier({'id': instance.id, 'sequenceName': instance.sequenceName, 'chunkSize': instance.chunkSize})
+
+
     def setInstanceAsFinishedInDatabase(self, instance):
         # Three possible cases here:
         # Case 1: the instance is finished (either successfully (COMPLETED) or unsuccessfully (ERROR)) and the TriAnnot_finished file is available in both sub cases
@@ -2871,7 +4328,7 @@ class TriAnnotPipeline (object):
             instance.instanceDirectorySize = estimatedDirectorySize
 
         # Effective update of the SQLite table
-        self.sqliteObject.updateInstanceTableAtCompletion(instance.id, instance.instanceStartDate, instance.instanceEndDate, instance.instanceStatus, instance.instanceProgression, instance.instanceExecutionTime, instance.instanceDirectorySize)
+        self.sqliteObject.updateInstanceTableAtCompletion(instance.id, instance.instanceStartDate, instance.instanceEndDate, instance.instanceStatus, instance.instanceProgression, instance.instanceExecutionTime, instance.instanceDirectorySize, instance.instanceJobIdentifier)
 
 
     def updateSystemStatistics(self, instance):
@@ -3033,6 +4490,11 @@ class TriAnnotPipeline (object):
         for instance in self.instances.values():
             self.abortInstance(instance)
 
+        # Speculative attempts are simply stopped (they are not registered in the database)
+        for speculativeAttempt in self.speculativeAttempts.values():
+            speculativeAttempt.abort(self.killOnAbort)
+        self.speculativeAttempts = dict()
+
         self.pipelineAbortedAfterManagedError = True
 
 
@@ -3193,6 +4655,10 @@ class TriAnnotPipeline (object):
             commandLineElement = etree.SubElement(xmlRoot, 'command_line')
             commandLineElement.text = self.commandLine
 
+            # Monitoring statistics (number of monitoring cycles and effective monitoring intervals)
+            if self.monitoringController is not None:
+                etree.SubElement(xmlRoot, 'monitoring_statistics', self.monitoringController.getStatisticsAsStrings())
+
             # System statistics related sub-elements
             finalSystemStatistics = self.sqliteObject.getSystemStatistics()
 
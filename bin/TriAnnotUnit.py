@@ -31,6 +31,7 @@ from TriAnnot.TriAnnotConfigurationChecker import *
 from TriAnnot.TriAnnotTaskFileChecker import *
 from TriAnnot.TriAnnotTask import *
 from TriAnnot.TriAnnotStatus import *
+from TriAnnot.TriAnnotMonitoringController import *
 from TriAnnot.ColoredFormatter import *
 import TriAnnot.Utils
 
@@ -104,6 +105,7 @@ class TriAnnotUnit (object):
         # Job monitoring related attributes
         self.monitoringInterval = None
         self.stillAliveJobMonitoringInterval = None
+        self.monitoringController = None
         self._previousProgress = ''
 
         # Task related attributes
@@ -845,7 +847,12 @@ class TriAnnotUnit (object):
         self.totalTasksCount = len(self.tasks)
         self.checkAlreadyCompletedTasks()
 
+        # The time between two monitoring cycles depends on the activity of the tasks
+        self.monitoringController = TriAnnotMonitoringController(self.monitoringInterval)
+        self.logger.debug("Monitoring interval: %s" % self.monitoringController.getControllerDescription())
+
         while len(self.tasks) > 0:
+            tasksStatusBeforeCycle = self.getTasksStatus()
             self.checkAndUpdateTasksStatus()
             self._execParsingOnExecFinishedTasks()
             self._treatCompletedAndCanceledTasks()
@@ -854,7 +861,42 @@ class TriAnnotUnit (object):
                 self.generateOrUpdateProgressFile()
             if len(self.tasks) > 0:
                 self.checkUserAbort()
-                time.sleep(float(self.monitoringInterval))
+                time.sleep(self.monitoringController.getNextInterval(self.getTasksStatus() != tasksStatusBeforeCycle, self.getExpectedRemainingTimes()))
+
+        self.logger.debug("Monitoring statistics: %s" % self.monitoringController.getStatisticsAsString())
+
+
+    def getTasksStatus(self):
+        return dict([(task.id, task.status) for task in self.tasks.values()])
+
+
+    def getExpectedRemainingTimes(self):
+        # Initializations
+        expectedRemainingTimes = list()
+        currentTime = time.time()
+
+        # The expected duration of a job is the average duration of the finished jobs of the same tool and type (execution or parsing)
+        for task in self.tasks.values():
+            if task.startTime is None or task.status not in [TriAnnotStatus.SUBMITED_EXEC, TriAnnotStatus.RUNNING_EXEC, TriAnnotStatus.SUBMITED_PARSING, TriAnnotStatus.RUNNING_PARSING]:
+                continue
+
+            expectedRemainingTime = self.monitoringController.getExpectedRemainingTime(self.getTaskJobCategory(task), currentTime - task.startTime)
+            if expectedRemainingTime is not None:
+                expectedRemainingTimes.append(expectedRemainingTime)
+
+        return expectedRemainingTimes
+
+
+    def recordTaskJobDuration(self, task):
+        if self.monitoringController is not None and task.startTime is not None:
+            self.monitoringController.recordJobDuration(self.getTaskJobCategory(task), time.time() - task.startTime)
+
+
+    def getTaskJobCategory(self, task):
+        if task.status in [TriAnnotStatus.SUBMITED_PARSING, TriAnnotStatus.RUNNING_PARSING]:
+            return (task.type, 'parsing')
+        else:
+            return (task.type, 'execution')
 
 
     def _execPendingTasksWithoutUnsatisfiedDependence(self):
@@ -1020,9 +1062,11 @@ class TriAnnotUnit (object):
             elif task.status == TriAnnotStatus.SUBMITED_PARSING  and os.path.isdir(task.getParsingDir()):
                 task.status = TriAnnotStatus.RUNNING_PARSING
             elif task.status == TriAnnotStatus.RUNNING_EXEC and task.isExecAbstractFileAvalaible() and task.isExecSuccessfullFromAbstractFile():
+                self.recordTaskJobDuration(task)
                 self._postExecutionTreatments(task)
                 task.status = TriAnnotStatus.FINISHED_EXEC
             elif task.status == TriAnnotStatus.RUNNING_PARSING and task.isParsingAbstractFileAvalaible() and task.isParsingSuccessfullFromAbstractFile():
+                self.recordTaskJobDuration(task)
                 self._postParsingTreatments(task)
                 task.status = TriAnnotStatus.COMPLETED
             elif (task.status == TriAnnotStatus.SUBMITED_EXEC or task.status == TriAnnotStatus.RUNNING_EXEC or  task.status == TriAnnotStatus.SUBMITED_PARSING or task.status == TriAnnotStatus.RUNNING_PARSING) and time.time() - task.checkedIsAliveTime > int(self.stillAliveJobMonitoringInterval):
@@ -1068,8 +1112,9 @@ class TriAnnotUnit (object):
             self.logger.debug("%s/%s tasks completed - %s" % (completedTasksCount, self.totalTasksCount, now))
 
             # Try to create a file handler for the TriAnnot_progress file
+            # Note: the file is written under a temporary name and then renamed so that TriAnnotPipeline can never read a partially written file
             try:
-                progressFileHandler = open(self.progressFileFullPath, 'w')
+                progressFileHandler = open(self.progressFileFullPath + '.tmp', 'w')
             except IOError:
                 self.logger.error("%s could not create (or update) the following XML progress file: %s" % (self.programName, self.progressFileFullPath))
                 raise
@@ -1095,12 +1140,19 @@ class TriAnnotUnit (object):
                 reportDateElement = etree.SubElement(xmlRoot, 'report_date')
                 reportDateElement.text = now
 
+                if self.monitoringController is not None and self.monitoringController.lastInterval is not None:
+                    monitoringIntervalElement = etree.SubElement(xmlRoot, 'monitoring_interval')
+                    monitoringIntervalElement.text = "%.1f" % self.monitoringController.lastInterval
+
                 # Indent the XML content
                 TriAnnotConfig.indent(xmlRoot)
 
                 # Write the generated XML content
                 progressFileHandler.write(etree.tostring(xmlRoot, 'ISO-8859-1'))
 
+            # Atomic replacement of the previous version of the progress file
+            os.rename(self.progressFileFullPath + '.tmp', self.progressFileFullPath)
+
 
     ############################################
     ##  Tasks post-execution related methods  ##
@@ -1363,8 +1415,9 @@ class TriAnnotUnit (object):
         finishedFileFullPath = os.path.join(self.mainExecDirFullPath, 'TriAnnot_finished')
 
         # Try to create a file handler for the TriAnnot_finished file
+        # Note: the file is written under a temporary name and then renamed so that TriAnnotPipeline can never read a partially written file
         try:
-            finishedFileHandler = open(finishedFileFullPath, 'w')
+            finishedFileHandler = open(finishedFileFullPath + '.tmp', 'w')
         except IOError:
             self.logger.error("%s could not create the following XML file: %s" % (self.programName, finishedFileFullPath))
             raise
@@ -1391,6 +1444,10 @@ class TriAnnotUnit (object):
             commandLineElement = etree.SubElement(xmlRoot, 'command_line')
             commandLineElement.text = self.commandLine
 
+            # Monitoring statistics (number of monitoring cycles and effective monitoring intervals)
+            if self.monitoringController is not None:
+                etree.SubElement(xmlRoot, 'monitoring_statistics', self.monitoringController.getStatisticsAsStrings())
+
             # Automatic creation of sub elements to write all the analysis times (Real/CPU time for Execution/Parsing/all tasks)
             if self.analysisTimes is not None:
                 if self.analysisStatus == TriAnnotStatus.ERROR:
@@ -1410,6 +1467,9 @@ class TriAnnotUnit (object):
             # Write the generated XML content
             finishedFileHandler.write(etree.tostring(xmlRoot, 'ISO-8859-1'))
 
+        # Make the TriAnnot_finished file visible
+        os.rename(finishedFileFullPath + '.tmp', finishedFileFullPath)
+
 
 ###################
 ##   Main code   ##
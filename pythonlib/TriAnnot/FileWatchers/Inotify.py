@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+
+import os
+import time
+import errno
+import select
+import struct
+import ctypes, ctypes.util
+
+from TriAnnot.TriAnnotFileWatcher import *
+
+class Inotify (TriAnnotFileWatcher):
+
+    # Static class variables
+    libc = None
+
+    # Inotify constants (see /usr/include/linux/inotify.h)
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    IN_CLOEXEC = 0x00080000
+
+    eventHeaderFormat = 'iIII'
+    eventHeaderSize = struct.calcsize(eventHeaderFormat)
+
+    def __init__(self):
+        # Log
+        self.logger.debug("Creating a new %s object (Specialized file watcher)" % (self.__class__.__name__))
+
+        # Attributes
+        self.className = self.__class__.__name__
+
+        # Short delay used to group the events of several instances that finish at the same time
+        self.eventCoalescingDelay = 0.5
+
+        # Watch descriptors management (Key = watch descriptor / Value = list of identifiers)
+        self.identifiersByWatchDescriptor = dict()
+        self.watchDescriptorByIdentifier = dict()
+
+        # Create the inotify instance
+        Inotify.loadLibc()
+        self.fileDescriptor = Inotify.libc.inotify_init1(os.O_NONBLOCK | Inotify.IN_CLOEXEC)
+        if self.fileDescriptor < 0:
+            errorNumber = ctypes.get_errno()
+            raise OSError(errorNumber, "Failed to initialize inotify: %s" % os.strerror(errorNumber))
+
+
+    def getWatcherDescription(self):
+        return "%s (kernel notifications)" % self.watcherType
+
+
+    def addWatch(self, identifier, directoryFullPath):
+        # Nothing to do if the directory is already watched for this identifier
+        if self.watchedDirectories.get(identifier) == directoryFullPath:
+            return True
+
+        # Effective watch creation (Note: inotify returns the same watch descriptor for a directory which is already watched)
+        watchDescriptor = Inotify.libc.inotify_add_watch(self.fileDescriptor, directoryFullPath, Inotify.IN_CLOSE_WRITE | Inotify.IN_MOVED_TO | Inotify.IN_ONLYDIR)
+        if watchDescriptor < 0:
+            errorNumber = ctypes.get_errno()
+            self.logger.warning("Failed to watch the following directory for identifier <%s>: %s (%s)" % (identifier, directoryFullPath, os.strerror(errorNumber)))
+            return False
+
+        self.watchedDirectories[identifier] = directoryFullPath
+        self.watchDescriptorByIdentifier[identifier] = watchDescriptor
+        self.identifiersByWatchDescriptor.setdefault(watchDescriptor, list()).append(identifier)
+
+        return True
+
+
+    def removeWatch(self, identifier):
+        if not self.watchDescriptorByIdentifier.has_key(identifier):
+            return
+
+        # Initializations
+        watchDescriptor = self.watchDescriptorByIdentifier.pop(identifier)
+        self.watchedDirectories.pop(identifier, None)
+
+        # The watch itself is only removed when the directory is not watched for any other identifier
+        identifiers = self.identifiersByWatchDescriptor.get(watchDescriptor, list())
+        if identifier in identifiers:
+            identifiers.remove(identifier)
+
+        if len(identifiers) == 0:
+            self.identifiersByWatchDescriptor.pop(watchDescriptor, None)
+            # The watch might have been automatically removed by the kernel (ie. deleted directory) so the return value is ignored
+            Inotify.libc.inotify_rm_watch(self.fileDescriptor, watchDescriptor)
+
+
+    def waitForEvents(self, timeout):
+        # Initializations
+        identifiersWithEvents = set()
+        deadline = time.time() + float(timeout)
+
+        while True:
+            remainingTime = deadline - time.time()
+            if remainingTime <= 0:
+                break
+
+            try:
+                readableFileDescriptors = select.select([self.fileDescriptor], [], [], remainingTime)[0]
+            except select.error, err:
+                if err[0] == errno.EINTR:
+                    continue
+                raise
+
+            if len(readableFileDescriptors) == 0:
+                break
+
+            identifiersWithEvents.update(self.readEvents())
+
+            # Wait a little bit to collect the events of the other instances before waking up the caller
+            if len(identifiersWithEvents) > 0:
+                time.sleep(self.eventCoalescingDelay)
+                identifiersWithEvents.update(self.readEvents())
+                break
+
+        return identifiersWithEvents
+
+
+    def readEvents(self):
+        # Initializations
+        identifiersWithEvents = set()
+        eventsBuffer = ''
+
+        # Read all pending events (the file descriptor is non blocking)
+        while True:
+            try:
+                readData = os.read(self.fileDescriptor, 65536)
+            except OSError, err:
+                if err.errno == errno.EAGAIN or err.errno == errno.EINTR:
+                    break
+                raise
+
+            if not readData:
+                break
+            eventsBuffer += readData
+
+        # Decode events
+        offset = 0
+        while offset + Inotify.eventHeaderSize <= len(eventsBuffer):
+            watchDescriptor, eventMask, cookie, nameLength = struct.unpack_from(Inotify.eventHeaderFormat, eventsBuffer, offset)
+            fileName = eventsBuffer[offset + Inotify.eventHeaderSize:offset + Inotify.eventHeaderSize + nameLength].rstrip('\0')
+            offset += Inotify.eventHeaderSize + nameLength
+
+            # Some events have been lost: every watched directory must be considered as modified
+            if eventMask & Inotify.IN_Q_OVERFLOW:
+                self.logger.debug("The inotify event queue has overflowed - All watched directories will be checked")
+                identifiersWithEvents.update(self.watchedDirectories.keys())
+
+            # The watched directory has been deleted (or unmounted)
+            elif eventMask & Inotify.IN_IGNORED:
+                for identifier in self.identifiersByWatchDescriptor.pop(watchDescriptor, list()):
+                    self.watchDescriptorByIdentifier.pop(identifier, None)
+                    self.watchedDirectories.pop(identifier, None)
+                    identifiersWithEvents.add(identifier)
+
+            elif fileName in self.watchedFileNames:
+                identifiersWithEvents.update(self.identifiersByWatchDescriptor.get(watchDescriptor, list()))
+
+        return identifiersWithEvents
+
+
+    def close(self):
+        if self.fileDescriptor is not None and self.fileDescriptor >= 0:
+            os.close(self.fileDescriptor)
+            self.fileDescriptor = None
+
+
+    @staticmethod
+    def loadLibc():
+        if Inotify.libc is None:
+            Inotify.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno = True)
+
+
+    @staticmethod
+    def isAvailable():
+        try:
+            Inotify.loadLibc()
+        except OSError:
+            return False
+
+        return hasattr(Inotify.libc, 'inotify_init1')
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+import os
+import time
+
+from TriAnnot.TriAnnotFileWatcher import *
+
+class Polling (TriAnnotFileWatcher):
+
+    def __init__(self):
+        # Log
+        self.logger.debug("Creating a new %s object (Specialized file watcher)" % (self.__class__.__name__))
+
+        # Attributes
+        self.className = self.__class__.__name__
+
+        if TriAnnotConfig.isConfigValueDefined('Global|fileWatcherPollingInterval'):
+            self.pollingInterval = float(TriAnnotConfig.getConfigValue('Global|fileWatcherPollingInterval'))
+        else:
+            self.pollingInterval = 5.0
+
+        # Last known modification time of each watched directory and of the watched files inside them
+        self.directoryModificationTimes = dict()
+        self.fileModificationTimes = dict()
+
+
+    def getWatcherDescription(self):
+        return "%s (every %s seconds)" % (self.watcherType, self.pollingInterval)
+
+
+    def addWatch(self, identifier, directoryFullPath):
+        # Nothing to do if the directory is already watched for this identifier
+        if self.watchedDirectories.get(identifier) == directoryFullPath:
+            return True
+
+        self.watchedDirectories[identifier] = directoryFullPath
+        self.directoryModificationTimes[identifier] = self.getModificationTime(directoryFullPath)
+        self.fileModificationTimes[identifier] = self.getWatchedFilesModificationTimes(directoryFullPath)
+
+        return True
+
+
+    def removeWatch(self, identifier):
+        self.watchedDirectories.pop(identifier, None)
+        self.directoryModificationTimes.pop(identifier, None)
+        self.fileModificationTimes.pop(identifier, None)
+
+
+    def waitForEvents(self, timeout):
+        # Initializations
+        deadline = time.time() + float(timeout)
+
+        while True:
+            identifiersWithEvents = self.checkWatchedDirectories()
+
+            remainingTime = deadline - time.time()
+            if len(identifiersWithEvents) > 0 or remainingTime <= 0:
+                return identifiersWithEvents
+
+            time.sleep(min(self.pollingInterval, remainingTime))
+
+
+    def checkWatchedDirectories(self):
+        # Initializations
+        identifiersWithEvents = set()
+
+        for identifier, directoryFullPath in self.watchedDirectories.items():
+            # A single stat by directory: the creation or the renaming of a file updates the modification time of its parent directory
+            directoryModificationTime = self.getModificationTime(directoryFullPath)
+            if directoryModificationTime == self.directoryModificationTimes[identifier]:
+                continue
+            self.directoryModificationTimes[identifier] = directoryModificationTime
+
+            # Something has changed in the directory - Check if the watched files are involved
+            filesModificationTimes = self.getWatchedFilesModificationTimes(directoryFullPath)
+            if filesModificationTimes != self.fileModificationTimes[identifier]:
+                self.fileModificationTimes[identifier] = filesModificationTimes
+                identifiersWithEvents.add(identifier)
+
+        return identifiersWithEvents
+
+
+    def getWatchedFilesModificationTimes(self, directoryFullPath):
+        return [self.getModificationTime(os.path.join(directoryFullPath, fileName)) for fileName in self.watchedFileNames]
+
+
+    def getModificationTime(self, fileOrDirectoryFullPath):
+        try:
+            fileStatus = os.stat(fileOrDirectoryFullPath)
+        except OSError:
+            return None
+
+        return (fileStatus.st_mtime, fileStatus.st_ino, fileStatus.st_size)
+
+
+    def close(self):
+        self.watchedDirectories.clear()
+        self.directoryModificationTimes.clear()
+        self.fileModificationTimes.clear()
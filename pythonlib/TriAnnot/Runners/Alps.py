@@ -66,6 +66,8 @@ class ALPS (TriAnnotRunner):
         self.checkCommandPatternForUnsupportedKeywords(self.aprunCommandPattern, "ALPS/aprun")
         self.checkCommandPatternForUnsupportedKeywords(self.monitoringCommandPattern, "monitoring")
         self.checkCommandPatternForUnsupportedKeywords(self.killCommandPattern, "kill")
+        if self.bulkMonitoringCommandPattern is not None:
+            self.checkCommandPatternForUnsupportedKeywords(self.bulkMonitoringCommandPattern, "bulk monitoring")
 
         if len(self.configurationErrors) > 0:
             for error in self.configurationErrors:
@@ -163,6 +165,10 @@ class ALPS (TriAnnotRunner):
     def isStillAlive(self):
         monitoringResult = []
 
+        # Most of the time the answer can be found in the job status snapshot shared by all jobs (single scheduler request)
+        if self.isStillAliveAccordingToSnapshot():
+            return True
+
         try:
             monitoringResult = subprocess.Popen(shlex.split(self.monitoringCommand),  stdout=subprocess.PIPE, stderr=subprocess.STDOUT).communicate()[0].split("\n")
             if len(monitoringResult) >= 2 and str(self.jobid) not in monitoringResult[1]:
@@ -182,6 +188,12 @@ class ALPS (TriAnnotRunner):
             return True
 
 
+    def getQueueLoad(self):
+        # Expected columns of the bulk monitoring command: job identifier, job state (%T) and reason (%r)
+        # Pending reasons such as QOSMaxJobsPerUserLimit or AssocGrpCpuLimit mean that more jobs will not run sooner
+        return self.summarizeJobStatusSnapshot(1, ['PENDING'], 2, r'Limit')
+
+
     def triggerEventsAfterJobSubmission(self):
         pass
 
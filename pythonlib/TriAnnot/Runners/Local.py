@@ -3,6 +3,7 @@
 import os
 import logging
 from TriAnnot.TriAnnotRunner import *
+from TriAnnot.TriAnnotSlotPool import *
 
 class Local (TriAnnotRunner):
 
@@ -10,6 +11,9 @@ class Local (TriAnnotRunner):
     numberOfActiveThreads = 0;
     configurationChecked = False
 
+    # Node-wide pool of CPU slots shared by all the TriAnnot processes running on the current machine (None when disabled)
+    slotPool = None
+
     def __init__(self):
         # Log
         self.logger.debug("Creating a new %s object (Specialized runner)" % (self.__class__.__name__))
@@ -22,6 +26,14 @@ class Local (TriAnnotRunner):
         self.monitoringCommandPattern = TriAnnotConfig.TRIANNOT_CONF['Runners'][self.runnerType]['monitoringCommandPattern'];
         self.killCommandPattern = TriAnnotConfig.TRIANNOT_CONF['Runners'][self.runnerType]['killCommandPattern'];
 
+        # Optional directory of the node-wide CPU slot pool
+        self.slotDirectory = None
+        if TriAnnotConfig.isConfigValueDefined("Runners|%s|slotDirectory" % self.runnerType) and TriAnnotConfig.TRIANNOT_CONF['Runners'][self.runnerType]['slotDirectory'] != '':
+            self.slotDirectory = os.path.expanduser(TriAnnotConfig.TRIANNOT_CONF['Runners'][self.runnerType]['slotDirectory'])
+
+        # Slots owned by the job of the current runner
+        self.acquiredSlots = []
+
 
     def getRunnerDescription(self):
         runnerDescription = self.runnerType
@@ -42,6 +54,14 @@ class Local (TriAnnotRunner):
         # Check all keywords in command patterns
         self.checkCommandPatternForUnsupportedKeywords(self.monitoringCommandPattern, "monitoring")
         self.checkCommandPatternForUnsupportedKeywords(self.killCommandPattern, "kill")
+        if self.bulkMonitoringCommandPattern is not None:
+            self.checkCommandPatternForUnsupportedKeywords(self.bulkMonitoringCommandPattern, "bulk monitoring")
+
+        # Initialize the node-wide CPU slot pool
+        if self.slotDirectory is not None:
+            Local.slotPool = TriAnnotSlotPool(self.slotDirectory, self.totalNumberOfThread)
+            if not Local.slotPool.createSlotDirectory():
+                self.configurationErrors.append("The directory of the CPU slot pool of the %s runner can't be created: %s" % (self.runnerType, self.slotDirectory))
 
         if len(self.configurationErrors) > 0:
             for error in self.configurationErrors:
@@ -55,6 +75,18 @@ class Local (TriAnnotRunner):
 
 
     def isComputingPowerAvailable(self):
+        # The slots are reserved right now so that no other process of the node can take them before the submission
+        # Note: TriAnnotUnit instances are not counted in the pool since they mostly wait for their tasks
+        if Local.slotPool is not None and self.jobType != 'TriAnnotUnit':
+            self.acquiredSlots = Local.slotPool.acquireSlots(self.jobObject.getNumberOfThreadsBasedOnStatus())
+            if self.acquiredSlots is not None:
+                self.logger.debug("<%d> CPU slot(s) of the node have been reserved for %s" % (len(self.acquiredSlots), self.jobObject.getDescriptionString()))
+                return True
+            else:
+                self.acquiredSlots = []
+                self.logger.debug("All the CPU slots of the node are already used. New job submission will be postponed !")
+                return False
+
         if int(self.numberOfActiveThreads) < int(self.totalNumberOfThread):
             return True
         else:
@@ -71,7 +103,11 @@ class Local (TriAnnotRunner):
         jobstderr = open(jobName + '.e0', "w")
 
         try:
-            process = subprocess.Popen([wrapperFileFullPath], stdout=jobstdout, stderr=jobstderr, close_fds=True)
+            if len(self.acquiredSlots) > 0:
+                # The job inherits the locks of its CPU slots: they stay reserved until the end of the job even if the current process dies before it
+                process = subprocess.Popen([wrapperFileFullPath], stdout=jobstdout, stderr=jobstderr, close_fds=False, preexec_fn=TriAnnotSlotPool.getSlotInheritanceFunction(self.acquiredSlots))
+            else:
+                process = subprocess.Popen([wrapperFileFullPath], stdout=jobstdout, stderr=jobstderr, close_fds=True)
         except Exception, ex:
             self.logger.debug(traceback.format_exc())
             raise(ex)
@@ -94,6 +130,10 @@ class Local (TriAnnotRunner):
     def isStillAlive(self):
         monitoringResult = []
 
+        # Most of the time the answer can be found in the job status snapshot shared by all jobs (single scheduler request)
+        if self.isStillAliveAccordingToSnapshot():
+            return True
+
         try:
             monitoringResult = subprocess.Popen(shlex.split(self.monitoringCommand),  stdout=subprocess.PIPE, stderr=subprocess.STDOUT).communicate()[0].split("\n")
         except:
@@ -120,6 +160,11 @@ class Local (TriAnnotRunner):
         Local.decrementActiveThreadCounter(self.jobObject.getNumberOfThreadsBasedOnStatus())
         self.jobid = None
 
+        # Give back the CPU slots of the job to the other processes of the node
+        if Local.slotPool is not None and len(self.acquiredSlots) > 0:
+            Local.slotPool.releaseSlots(self.acquiredSlots)
+            self.acquiredSlots = []
+
 
     @staticmethod
     def decrementActiveThreadCounter(decValue):
@@ -30,6 +30,8 @@ class SLURM (TriAnnotRunner):
 
         self.allowSubmissionFromComputeNodes = TriAnnotConfig.TRIANNOT_CONF['Runners'][self.runnerType]['allowSubmissionFromComputeNodes'];
 
+        self.arrayTaskIdentifierVariable = 'SLURM_ARRAY_TASK_ID'
+
 
     def getRunnerDescription(self):
         runnerDescription = self.runnerType
@@ -59,6 +61,8 @@ class SLURM (TriAnnotRunner):
         self.checkCommandPatternForUnsupportedKeywords(self.submitCommandPattern, "submission")
         self.checkCommandPatternForUnsupportedKeywords(self.monitoringCommandPattern, "monitoring")
         self.checkCommandPatternForUnsupportedKeywords(self.killCommandPattern, "kill")
+        if self.bulkMonitoringCommandPattern is not None:
+            self.checkCommandPatternForUnsupportedKeywords(self.bulkMonitoringCommandPattern, "bulk monitoring")
 
         if len(self.configurationErrors) > 0:
             for error in self.configurationErrors:
@@ -82,7 +86,7 @@ class SLURM (TriAnnotRunner):
             return True
 
 
-    def submitJob(self, jobName, wrapperFileFullPath):
+    def submitJob(self, jobName, wrapperFileFullPath, nbArrayTasks = None):
         # Command line building
         # Replace keywords by values in the basic submit commands
         self.submitCommand = self.replaceKeywordsInCommandPattern(self.submitCommandPattern, "submission")
@@ -101,9 +105,16 @@ class SLURM (TriAnnotRunner):
         # Specific ressources
         # sbatch --gres option is not managed in TriAnnot at the moment
 
-        # Stdout and stderr
-        self.submitCommand += " -o " + jobName + '.SLURM_%j.out'
-        self.submitCommand += " -e " + jobName + '.SLURM_%j.err'
+        # Array job (%A is the array job identifier and %a the index of the array task)
+        if nbArrayTasks is not None:
+            self.submitCommand += " --array 1-%d" % (nbArrayTasks)
+
+            self.submitCommand += " -o " + jobName + '.SLURM_%A_%a.out'
+            self.submitCommand += " -e " + jobName + '.SLURM_%A_%a.err'
+        else:
+            # Stdout and stderr
+            self.submitCommand += " -o " + jobName + '.SLURM_%j.out'
+            self.submitCommand += " -e " + jobName + '.SLURM_%j.err'
 
         # Script to run
         self.submitCommand += " " + wrapperFileFullPath
@@ -134,13 +145,22 @@ class SLURM (TriAnnotRunner):
         return returnStatus
 
 
+    def getArrayTaskJobIdentifier(self, arrayJobIdentifier, arrayTaskIndex):
+        return "%s_%d" % (arrayJobIdentifier, arrayTaskIndex)
+
+
     def isStillAlive(self):
         monitoringResult = []
 
+        # Most of the time the answer can be found in the job status snapshot shared by all jobs (single scheduler request)
+        if self.isStillAliveAccordingToSnapshot():
+            return True
+
         try:
             monitoringResult = subprocess.Popen(shlex.split(self.monitoringCommand),  stdout=subprocess.PIPE, stderr=subprocess.STDOUT).communicate()[0].split("\n")
-            if len(monitoringResult) >= 2 and str(self.jobid) not in monitoringResult[1]:
-                raise Warning("Could not check if job number %d for %s is still alive with the following monitoring command: %s" % (self.jobid, self.jobObject.getDescriptionString(), self.monitoringCommand))
+            # Note: the lines of the array tasks start with the identifier of their array job
+            if len(monitoringResult) >= 2 and str(self.jobid).split('_')[0] not in monitoringResult[1]:
+                raise Warning("Could not check if job number %s for %s is still alive with the following monitoring command: %s" % (self.jobid, self.jobObject.getDescriptionString(), self.monitoringCommand))
         except:
             self.logger.debug(traceback.format_exc())
             self.logger.warning("Failed to check if %s job for %s (jobid %s) is still alive" % (self.className, self.jobObject.getDescriptionString(), self.jobid))
@@ -156,6 +176,38 @@ class SLURM (TriAnnotRunner):
             return True
 
 
+    def getQueueLoad(self):
+        # Expected columns of the bulk monitoring command: job identifier, job state (%T) and reason (%r)
+        # Pending reasons such as QOSMaxJobsPerUserLimit or AssocGrpCpuLimit mean that more jobs will not run sooner
+        return self.summarizeJobStatusSnapshot(1, ['PENDING'], 2, r'Limit')
+
+
+    def countJobsInSnapshotLine(self, fields):
+        # Pending array tasks are grouped on a single line (Ex: 1234_[5-10,12%4])
+        arrayTasksMatch = re.search(r'_\[([^\]%]+)', fields[0])
+        if arrayTasksMatch is None:
+            return 1
+
+        nbJobs = 0
+        for taskRange in arrayTasksMatch.group(1).split(','):
+            rangeBoundaries = taskRange.split(':')[0].split('-')
+            if len(rangeBoundaries) == 2 and rangeBoundaries[0].isdigit() and rangeBoundaries[1].isdigit():
+                nbJobs += int(rangeBoundaries[1]) - int(rangeBoundaries[0]) + 1
+            else:
+                nbJobs += 1
+
+        return nbJobs
+
+
+    def getJobIdentifiersInSnapshotLine(self, fields):
+        # Array tasks are listed as <arrayJobId>_<taskIndex> - OR - as <arrayJobId>_[<ranges>] for pending tasks (the array job itself is alive as long as one of its tasks is listed)
+        arrayTasksMatch = re.match(r'^(\d+)_\[?([^\]]+)\]?$', fields[0])
+        if arrayTasksMatch is None:
+            return [fields[0]]
+
+        return [arrayTasksMatch.group(1)] + ["%s_%d" % (arrayTasksMatch.group(1), arrayTaskIndex) for arrayTaskIndex in self.expandArrayTaskRanges(arrayTasksMatch.group(2))]
+
+
     def triggerEventsAfterJobSubmission(self):
         pass
 
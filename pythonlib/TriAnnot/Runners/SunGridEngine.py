@@ -30,6 +30,8 @@ class SunGridEngine (TriAnnotRunner):
 
         self.allowSubmissionFromComputeNodes = TriAnnotConfig.TRIANNOT_CONF['Runners'][self.runnerType]['allowSubmissionFromComputeNodes'];
 
+        self.arrayTaskIdentifierVariable = 'SGE_TASK_ID'
+
 
     def getRunnerDescription(self):
         runnerDescription = self.runnerType
@@ -59,6 +61,8 @@ class SunGridEngine (TriAnnotRunner):
         self.checkCommandPatternForUnsupportedKeywords(self.submitCommandPattern, "submission")
         self.checkCommandPatternForUnsupportedKeywords(self.monitoringCommandPattern, "monitoring")
         self.checkCommandPatternForUnsupportedKeywords(self.killCommandPattern, "kill")
+        if self.bulkMonitoringCommandPattern is not None:
+            self.checkCommandPatternForUnsupportedKeywords(self.bulkMonitoringCommandPattern, "bulk monitoring")
 
         if len(self.configurationErrors) > 0:
             for error in self.configurationErrors:
@@ -82,7 +86,7 @@ class SunGridEngine (TriAnnotRunner):
             return True
 
 
-    def submitJob(self, jobName, wrapperFileFullPath):
+    def submitJob(self, jobName, wrapperFileFullPath, nbArrayTasks = None):
         # Command line building
         # Replace keywords by values in the basic submit commands
         self.submitCommand = self.replaceKeywordsInCommandPattern(self.submitCommandPattern, "submission")
@@ -104,6 +108,10 @@ class SunGridEngine (TriAnnotRunner):
         elif self.requestedRessources != "":
             self.submitCommand += " -l %s" % (self.requestedRessources)
 
+        # Array job
+        if nbArrayTasks is not None:
+            self.submitCommand += " -t 1-%d" % (nbArrayTasks)
+
         # Script to run
         self.submitCommand += " " + wrapperFileFullPath
 
@@ -118,7 +126,8 @@ class SunGridEngine (TriAnnotRunner):
 
         if returnStatus == 0:
             jobidFileHandler = open(outputFile, "r")
-            self.jobid = int(jobidFileHandler.readline().split(" ")[2])
+            # Note: for array jobs, qsub returns the job identifier followed by the task range (Ex: Your job-array 1234.1-10:1 ("name") has been submitted)
+            self.jobid = int(jobidFileHandler.readline().split(" ")[2].split(".")[0])
             jobidFileHandler.close()
             os.remove(outputFile)
 
@@ -132,13 +141,22 @@ class SunGridEngine (TriAnnotRunner):
         return returnStatus
 
 
+    def getArrayTaskJobIdentifier(self, arrayJobIdentifier, arrayTaskIndex):
+        return "%s.%d" % (arrayJobIdentifier, arrayTaskIndex)
+
+
     def isStillAlive(self):
         monitoringResult = []
 
+        # Most of the time the answer can be found in the job status snapshot shared by all jobs (single scheduler request)
+        if self.isStillAliveAccordingToSnapshot():
+            return True
+
         try:
             monitoringResult = subprocess.Popen(shlex.split(self.monitoringCommand),  stdout=subprocess.PIPE, stderr=subprocess.STDOUT).communicate()[0].split("\n")
-            if len(monitoringResult) >= 2 and str(self.jobid) not in monitoringResult[1]:
-                raise Warning("Could not check if job number %d for %s is still alive with the following monitoring command: %s" % (self.jobid, self.jobObject.getDescriptionString(), self.monitoringCommand))
+            # Note: the array tasks are described by the output of their array job
+            if len(monitoringResult) >= 2 and str(self.jobid).split('.')[0] not in monitoringResult[1]:
+                raise Warning("Could not check if job number %s for %s is still alive with the following monitoring command: %s" % (self.jobid, self.jobObject.getDescriptionString(), self.monitoringCommand))
         except:
             self.logger.debug(traceback.format_exc())
             self.logger.warning("Failed to check if %s job for %s (jobid %s) is still alive" % (self.className, self.jobObject.getDescriptionString(), self.jobid))
@@ -154,6 +172,29 @@ class SunGridEngine (TriAnnotRunner):
             return True
 
 
+    def getQueueLoad(self):
+        # Expected columns of the bulk monitoring command (qstat -u): job-ID, prior, name, user, state, etc. (SGE does not provide any pending reason)
+        return self.summarizeJobStatusSnapshot(4, ['qw', 'hqw'])
+
+
+    def countJobsInSnapshotLine(self, fields):
+        # Pending array jobs are described by a single line ending with the task range (Ex: 1-10:1)
+        taskRangeMatch = re.match(r'^(\d+)-(\d+):(\d+)$', fields[-1])
+        if len(fields) < 6 or taskRangeMatch is None:
+            return 1
+
+        return (int(taskRangeMatch.group(2)) - int(taskRangeMatch.group(1))) / int(taskRangeMatch.group(3)) + 1
+
+
+    def getJobIdentifiersInSnapshotLine(self, fields):
+        # The last column (ja-task-ID) only exists for array jobs: index of a running task (Ex: 5) - OR - ranges of pending tasks (Ex: 6-10:1)
+        # Note: the lines of the pending jobs have no queue column
+        if len(fields) < 5 or len(fields) < (9 if 'q' in fields[4] else 10):
+            return [fields[0]]
+
+        return [fields[0]] + ["%s.%d" % (fields[0], arrayTaskIndex) for arrayTaskIndex in self.expandArrayTaskRanges(fields[-1])]
+
+
     def triggerEventsAfterJobSubmission(self):
         pass
 
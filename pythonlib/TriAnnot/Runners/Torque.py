@@ -33,6 +33,8 @@ class Torque (TriAnnotRunner):
 
         self.allowSubmissionFromComputeNodes = TriAnnotConfig.TRIANNOT_CONF['Runners'][self.runnerType]['allowSubmissionFromComputeNodes'];
 
+        self.arrayTaskIdentifierVariable = 'PBS_ARRAYID'
+
 
     def getRunnerDescription(self):
         runnerDescription = self.runnerType
@@ -69,6 +71,8 @@ class Torque (TriAnnotRunner):
         self.checkCommandPatternForUnsupportedKeywords(self.submitCommandPattern, "submission")
         self.checkCommandPatternForUnsupportedKeywords(self.monitoringCommandPattern, "monitoring")
         self.checkCommandPatternForUnsupportedKeywords(self.killCommandPattern, "kill")
+        if self.bulkMonitoringCommandPattern is not None:
+            self.checkCommandPatternForUnsupportedKeywords(self.bulkMonitoringCommandPattern, "bulk monitoring")
 
         if len(self.configurationErrors) > 0:
             for error in self.configurationErrors:
@@ -92,7 +96,7 @@ class Torque (TriAnnotRunner):
             return True
 
 
-    def submitJob(self, jobName, wrapperFileFullPath):
+    def submitJob(self, jobName, wrapperFileFullPath, nbArrayTasks = None):
         # Command line building
         # Replace keywords by values in the basic submit commands
         self.submitCommand = self.replaceKeywordsInCommandPattern(self.submitCommandPattern, "submission")
@@ -116,6 +120,10 @@ class Torque (TriAnnotRunner):
 
         self.submitCommand += " -l %s" % (",".join(allRessources))
 
+        # Array job
+        if nbArrayTasks is not None:
+            self.submitCommand += " -t 1-%d" % (nbArrayTasks)
+
         # Script to run
         self.submitCommand += " " + wrapperFileFullPath
 
@@ -131,7 +139,12 @@ class Torque (TriAnnotRunner):
         if returnStatus == 0:
             jobidFileHandler = open(outputFile, "r")
             jobIdAsString = jobidFileHandler.readline().split(".")[0]
-            self.jobid = int(jobIdAsString)
+
+            # Array jobs are identified by the job identifier followed by empty brackets (Ex: 1234[].server)
+            if nbArrayTasks is not None:
+                self.jobid = "%d[]" % int(jobIdAsString.rstrip('[]'))
+            else:
+                self.jobid = int(jobIdAsString)
             jobidFileHandler.close()
             os.remove(outputFile)
 
@@ -145,13 +158,22 @@ class Torque (TriAnnotRunner):
         return returnStatus
 
 
+    def getArrayTaskJobIdentifier(self, arrayJobIdentifier, arrayTaskIndex):
+        # Array jobs are identified by the job identifier followed by empty brackets (Ex: 1234[]) and their tasks by the job identifier followed by their index (Ex: 1234[5])
+        return "%s[%d]" % (str(arrayJobIdentifier).rstrip('[]'), arrayTaskIndex)
+
+
     def isStillAlive(self):
         monitoringResult = []
 
+        # Most of the time the answer can be found in the job status snapshot shared by all jobs (single scheduler request)
+        if self.isStillAliveAccordingToSnapshot():
+            return True
+
         try:
             monitoringResult = subprocess.Popen(shlex.split(self.monitoringCommand),  stdout=subprocess.PIPE, stderr=subprocess.STDOUT).communicate()[0].split("\n")
             if len(monitoringResult) >= 2 and str(self.jobid) not in monitoringResult[0]:
-                raise Warning("Could not check if job number %d for %s is still alive with the following monitoring command: %s" % (self.jobid, self.jobObject.getDescriptionString(), self.monitoringCommand))
+                raise Warning("Could not check if job number %s for %s is still alive with the following monitoring command: %s" % (self.jobid, self.jobObject.getDescriptionString(), self.monitoringCommand))
         except:
             self.logger.debug(traceback.format_exc())
             self.logger.warning("Failed to check if %s job for %s (jobid %s) is still alive" % (self.className, self.jobObject.getDescriptionString(), self.jobid))
@@ -167,6 +189,11 @@ class Torque (TriAnnotRunner):
             return True
 
 
+    def getQueueLoad(self):
+        # Expected columns of the bulk monitoring command (qstat -u): Job ID, Username, Queue, Jobname, SessID, NDS, TSK, Memory, Time, S, Time (Torque does not provide any pending reason)
+        return self.summarizeJobStatusSnapshot(9, ['Q', 'H', 'W'])
+
+
     def triggerEventsAfterJobSubmission(self):
         pass
 
@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+
+import os
+import zlib
+import struct
+import bisect
+import logging
+import threading
+
+from TriAnnot.TriAnnotConfig import *
+
+class TriAnnotBgzfFile (object):
+
+    # Static class variables
+    indexFileSuffix = '.gzi'
+
+    # Beginning of the header of any BGZF block (gzip magic number, deflate compression method and FEXTRA flag)
+    blockHeaderMagic = '\x1f\x8b\x08\x04'
+    blockHeaderSize = 12
+    blockFooterSize = 8
+
+    # Block indexes already loaded by the current process (Key = file full path / Value = tuple)
+    # Note: the processes of a multiprocessing pool inherit the indexes loaded by the main process
+    loadedBlockIndexes = dict()
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self, sequenceFileFullPath, fallbackDirectoryFullPath = None):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotBgzfFile")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        # Note: the .gzi index is written next to the compressed file or in the fallback directory (ie. the main execution folder) when the directory of the compressed file is read-only
+        self.sequenceFileFullPath = sequenceFileFullPath
+        self.fallbackDirectoryFullPath = fallbackDirectoryFullPath
+
+        # Block index: compressed and uncompressed offsets of the beginning of each (non empty) block
+        self.compressedBlockOffsets = None
+        self.uncompressedBlockOffsets = None
+        self.uncompressedFileSize = None
+
+        # File-like object related attributes
+        self.fileHandler = None
+        self.currentPosition = 0
+        self.currentBlockNumber = None
+        self.currentBlockData = ''
+        self.readingLock = threading.Lock()
+
+
+    ###############################
+    ##  Block index management  ##
+    ###############################
+    def getIndexFileFullPaths(self):
+        # Possible locations of the index file (in order of preference)
+        indexFileFullPaths = [self.sequenceFileFullPath + TriAnnotBgzfFile.indexFileSuffix]
+        if self.fallbackDirectoryFullPath is not None:
+            indexFileFullPaths.append(os.path.join(self.fallbackDirectoryFullPath, os.path.basename(self.sequenceFileFullPath) + TriAnnotBgzfFile.indexFileSuffix))
+
+        return indexFileFullPaths
+
+
+    def loadIndex(self):
+        # Initializations
+        sequenceFileModificationTime = os.stat(self.sequenceFileFullPath).st_mtime
+
+        if self.compressedBlockOffsets is not None:
+            return
+
+        # Index already loaded or built by the current process
+        loadedBlockIndex = TriAnnotBgzfFile.loadedBlockIndexes.get(self.sequenceFileFullPath)
+        if loadedBlockIndex is not None and loadedBlockIndex[0] == sequenceFileModificationTime:
+            self.compressedBlockOffsets, self.uncompressedBlockOffsets, self.uncompressedFileSize = loadedBlockIndex[1:]
+            return
+
+        # Existing .gzi index (ex: created by bgzip --index or samtools faidx)
+        for indexFileFullPath in self.getIndexFileFullPaths():
+            if not Utils.isExistingFile(indexFileFullPath) or os.stat(indexFileFullPath).st_mtime < sequenceFileModificationTime:
+                continue
+
+            try:
+                self.readIndexFile(indexFileFullPath)
+            except (IOError, struct.error) as ex:
+                self.logger.warning("The following BGZF index file is invalid and will be ignored: %s (%s)" % (indexFileFullPath, ex))
+                continue
+
+            self.logger.debug("The BGZF index of the fasta input file has been loaded from the following file: %s" % indexFileFullPath)
+            break
+
+        # Index built from the headers of the blocks
+        else:
+            self.buildIndex()
+            self.saveIndex()
+
+        TriAnnotBgzfFile.loadedBlockIndexes[self.sequenceFileFullPath] = (sequenceFileModificationTime, self.compressedBlockOffsets, self.uncompressedBlockOffsets, self.uncompressedFileSize)
+
+
+    def readIndexFile(self, indexFileFullPath):
+        # The .gzi format is a list of (compressed offset, uncompressed offset) pairs of 64 bits integers (the first block is implicit)
+        with open(indexFileFullPath, 'rb') as indexFileHandler:
+            nbEntries = struct.unpack('<Q', indexFileHandler.read(8))[0]
+            indexEntries = struct.unpack("<%dQ" % (2 * nbEntries), indexFileHandler.read(16 * nbEntries))
+
+        self.compressedBlockOffsets = [0] + list(indexEntries[0::2])
+        self.uncompressedBlockOffsets = [0] + list(indexEntries[1::2])
+
+        # The size of the uncompressed file is computed from the blocks located after the last indexed block
+        with open(self.sequenceFileFullPath, 'rb') as sequenceFileHandler:
+            compressedOffset = self.compressedBlockOffsets[-1]
+            self.uncompressedFileSize = self.uncompressedBlockOffsets[-1]
+
+            while True:
+                blockSize, uncompressedBlockSize = TriAnnotBgzfFile.readBlockSizes(sequenceFileHandler, compressedOffset)
+                if blockSize is None:
+                    break
+                compressedOffset += blockSize
+                self.uncompressedFileSize += uncompressedBlockSize
+
+
+    def buildIndex(self):
+        # Initializations
+        self.compressedBlockOffsets = list()
+        self.uncompressedBlockOffsets = list()
+        compressedOffset = 0
+        uncompressedOffset = 0
+
+        self.logger.info("The BGZF index of the fasta input file will now be built")
+
+        # Only the header and the footer of each block are read
+        with open(self.sequenceFileFullPath, 'rb') as sequenceFileHandler:
+            while True:
+                blockSize, uncompressedBlockSize = TriAnnotBgzfFile.readBlockSizes(sequenceFileHandler, compressedOffset)
+                if blockSize is None:
+                    break
+
+                # Empty blocks (ex: end of file marker) are not indexed
+                if uncompressedBlockSize > 0:
+                    self.compressedBlockOffsets.append(compressedOffset)
+                    self.uncompressedBlockOffsets.append(uncompressedOffset)
+
+                compressedOffset += blockSize
+                uncompressedOffset += uncompressedBlockSize
+
+        if len(self.compressedBlockOffsets) == 0 or self.compressedBlockOffsets[0] != 0:
+            self.compressedBlockOffsets.insert(0, 0)
+            self.uncompressedBlockOffsets.insert(0, 0)
+
+        self.uncompressedFileSize = uncompressedOffset
+
+
+    def saveIndex(self):
+        # Initializations
+        indexEntries = list()
+        for compressedOffset, uncompressedOffset in zip(self.compressedBlockOffsets[1:], self.uncompressedBlockOffsets[1:]):
+            indexEntries.extend([compressedOffset, uncompressedOffset])
+
+        for indexFileFullPath in self.getIndexFileFullPaths():
+            try:
+                with open(indexFileFullPath, 'wb') as indexFileHandler:
+                    indexFileHandler.write(struct.pack('<Q', len(indexEntries) / 2))
+                    indexFileHandler.write(struct.pack("<%dQ" % len(indexEntries), *indexEntries))
+            except (IOError, OSError):
+                self.logger.debug("The BGZF index file can't be written in the following location: %s" % indexFileFullPath)
+                continue
+
+            self.logger.info("The BGZF index of the fasta input file has been saved in the following file: %s" % indexFileFullPath)
+            return
+
+
+    def getUncompressedFileSize(self):
+        self.loadIndex()
+
+        return self.uncompressedFileSize
+
+
+    ###################################
+    ##  File-like object management  ##
+    ###################################
+    def open(self):
+        self.loadIndex()
+
+        if self.fileHandler is None:
+            self.fileHandler = open(self.sequenceFileFullPath, 'rb')
+            self.currentPosition = 0
+
+        return self
+
+
+    def close(self):
+        if self.fileHandler is not None:
+            self.fileHandler.close()
+            self.fileHandler = None
+
+        self.currentBlockNumber = None
+        self.currentBlockData = ''
+
+
+    def __enter__(self):
+        return self.open()
+
+
+    def __exit__(self, exceptionType, exceptionValue, exceptionTraceback):
+        self.close()
+
+
+    def seek(self, uncompressedOffset):
+        self.currentPosition = uncompressedOffset
+
+
+    def tell(self):
+        return self.currentPosition
+
+
+    def read(self, size = -1):
+        # Initializations
+        readParts = list()
+        remainingSize = self.uncompressedFileSize - self.currentPosition if size < 0 else min(size, self.uncompressedFileSize - self.currentPosition)
+
+        while remainingSize > 0:
+            # Only the blocks that contain the requested bytes are decompressed
+            blockNumber = bisect.bisect_right(self.uncompressedBlockOffsets, self.currentPosition) - 1
+            self.loadBlock(blockNumber)
+
+            positionInBlock = self.currentPosition - self.uncompressedBlockOffsets[blockNumber]
+            readPart = self.currentBlockData[positionInBlock:positionInBlock + remainingSize]
+            if readPart == '':
+                break
+
+            readParts.append(readPart)
+            self.currentPosition += len(readPart)
+            remainingSize -= len(readPart)
+
+        return ''.join(readParts)
+
+
+    def readline(self):
+        # Initializations
+        readParts = list()
+
+        while self.currentPosition < self.uncompressedFileSize:
+            blockNumber = bisect.bisect_right(self.uncompressedBlockOffsets, self.currentPosition) - 1
+            self.loadBlock(blockNumber)
+
+            positionInBlock = self.currentPosition - self.uncompressedBlockOffsets[blockNumber]
+            newLinePosition = self.currentBlockData.find('\n', positionInBlock)
+            readPart = self.currentBlockData[positionInBlock:] if newLinePosition == -1 else self.currentBlockData[positionInBlock:newLinePosition + 1]
+            if readPart == '':
+                break
+
+            readParts.append(readPart)
+            self.currentPosition += len(readPart)
+
+            if newLinePosition != -1:
+                break
+
+        return ''.join(readParts)
+
+
+    def readAt(self, uncompressedOffset, size):
+        # Thread-safe equivalent of seek + read (the file is shared by the background preparation threads)
+        with self.readingLock:
+            self.seek(uncompressedOffset)
+            return self.read(size)
+
+
+    def loadBlock(self, blockNumber):
+        if blockNumber == self.currentBlockNumber:
+            return
+
+        # The data of a block can span several BGZF blocks when empty blocks are located in the middle of the file
+        blockEndOffset = self.compressedBlockOffsets[blockNumber + 1] if blockNumber + 1 < len(self.compressedBlockOffsets) else None
+
+        self.fileHandler.seek(self.compressedBlockOffsets[blockNumber])
+        compressedData = self.fileHandler.read() if blockEndOffset is None else self.fileHandler.read(blockEndOffset - self.compressedBlockOffsets[blockNumber])
+
+        self.currentBlockData = TriAnnotBgzfFile.decompressBlocks(compressedData)
+        self.currentBlockNumber = blockNumber
+
+
+    ######################
+    ##  Static methods  ##
+    ######################
+    @staticmethod
+    def isBgzfFile(fileFullPath):
+        with open(fileFullPath, 'rb') as fileHandler:
+            fileHeader = fileHandler.read(18)
+
+        # The first extra subfield of a BGZF block is the BC subfield (total size of the block)
+        return len(fileHeader) == 18 and fileHeader.startswith(TriAnnotBgzfFile.blockHeaderMagic) and fileHeader[12:14] == 'BC'
+
+
+    @staticmethod
+    def readBlockSizes(fileHandler, compressedOffset):
+        # Returns the compressed and uncompressed sizes of the block located at compressedOffset (or None, None at the end of the file)
+        fileHandler.seek(compressedOffset)
+        blockHeader = fileHandler.read(TriAnnotBgzfFile.blockHeaderSize)
+
+        if blockHeader == '':
+            return None, None
+
+        if len(blockHeader) < TriAnnotBgzfFile.blockHeaderSize or not blockHeader.startswith(TriAnnotBgzfFile.blockHeaderMagic):
+            raise IOError("Invalid BGZF block header at offset %d" % compressedOffset)
+
+        # Search the BC subfield in the extra field of the header
+        extraFieldSize = struct.unpack('<H', blockHeader[10:12])[0]
+        extraField = fileHandler.read(extraFieldSize)
+        blockSize = None
+
+        subFieldPosition = 0
+        while subFieldPosition + 4 <= len(extraField):
+            subFieldSize = struct.unpack('<H', extraField[subFieldPosition + 2:subFieldPosition + 4])[0]
+            if extraField[subFieldPosition:subFieldPosition + 2] == 'BC' and subFieldSize == 2:
+                blockSize = struct.unpack('<H', extraField[subFieldPosition + 4:subFieldPosition + 6])[0] + 1
+            subFieldPosition += 4 + subFieldSize
+
+        if blockSize is None:
+            raise IOError("The gzip member located at offset %d is not a BGZF block (the file must be compressed with bgzip)" % compressedOffset)
+
+        # The uncompressed size of the block is stored in its last 4 bytes
+        fileHandler.seek(compressedOffset + blockSize - 4)
+        uncompressedBlockSize = struct.unpack('<I', fileHandler.read(4))[0]
+
+        return blockSize, uncompressedBlockSize
+
+
+    @staticmethod
+    def decompressBlocks(compressedData):
+        # Initializations
+        decompressedParts = list()
+        blockOffset = 0
+
+        while blockOffset < len(compressedData):
+            extraFieldSize = struct.unpack('<H', compressedData[blockOffset + 10:blockOffset + 12])[0]
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            decompressedParts.append(decompressor.decompress(compressedData[blockOffset + TriAnnotBgzfFile.blockHeaderSize + extraFieldSize:]))
+
+            # The next block starts after the compressed data of the current block and its footer (CRC32 + ISIZE)
+            blockOffset = len(compressedData) - len(decompressor.unused_data) + TriAnnotBgzfFile.blockFooterSize
+
+        return ''.join(decompressedParts)
+
+
+    @staticmethod
+    def openSequenceFile(sequenceFileFullPath):
+        # Returns a file-like object that gives access to the uncompressed content of a plain or BGZF compressed fasta file
+        if TriAnnotBgzfFile.isBgzfFile(sequenceFileFullPath):
+            return TriAnnotBgzfFile(sequenceFileFullPath).open()
+
+        return open(sequenceFileFullPath, 'rb')
+
+
+    @staticmethod
+    def getSequenceFileSize(sequenceFileFullPath):
+        # Size of the uncompressed content of a plain or BGZF compressed fasta file
+        if TriAnnotBgzfFile.isBgzfFile(sequenceFileFullPath):
+            return TriAnnotBgzfFile(sequenceFileFullPath).getUncompressedFileSize()
+
+        return os.path.getsize(sequenceFileFullPath)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+import re
+import bisect
+import logging
+
+class TriAnnotChunkBoundaryPlanner (object):
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self, sequenceExtractor, chunkMaxSize, chunkOverlappingSize, minimumGapLength, gapSearchDistance):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotChunkBoundaryPlanner")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        # Note: the sequence extractor gives access to the bases located around the theoretical chunk boundaries (whatever the format of the fasta file)
+        self.sequenceExtractor = sequenceExtractor
+        self.chunkMaxSize = chunkMaxSize
+        self.chunkOverlappingSize = chunkOverlappingSize
+        self.minimumGapLength = minimumGapLength
+
+        # A chunk can't be shortened by more than half of the maximum chunk size
+        self.gapSearchDistance = min(gapSearchDistance, chunkMaxSize / 2)
+
+        # Runs of N (scaffold gaps) long enough to host a chunk boundary
+        self.gapPattern = re.compile('[Nn]{%d,}' % max(minimumGapLength, 1))
+
+        # Statistics
+        self.nbGapBoundaries = 0
+
+
+    ########################
+    ##  Planning methods  ##
+    ########################
+    def planChunks(self, instanceTableEntry, lineRuns):
+        # Returns the list of the (chunkStartOffset, chunkEndOffset, chunkSize) tuples of the sequence - OR - None when no boundary can be placed in a gap (the default chunks are kept in this case)
+        # Note: a chunk ends in the middle of a gap and the next chunk starts at the same position (no overlap), the other chunks overlap as usual
+        # Initializations
+        chunkBoundaries = list()
+        isGapBoundaryFound = False
+        chunkStartBase = 0
+        sequenceSize = instanceTableEntry.sequenceSize
+
+        if self.gapSearchDistance <= 0 or not lineRuns:
+            return None
+
+        lineRunEndBases = self.getLineRunEndBases(lineRuns)
+
+        while chunkStartBase + self.chunkMaxSize < sequenceSize:
+            theoreticalChunkEndBase = chunkStartBase + self.chunkMaxSize
+            gapBoundaryBase = self.findGapBoundary(lineRuns, lineRunEndBases, theoreticalChunkEndBase - self.gapSearchDistance, theoreticalChunkEndBase)
+
+            if gapBoundaryBase is not None:
+                chunkBoundaries.append((chunkStartBase, gapBoundaryBase))
+                chunkStartBase = gapBoundaryBase
+                isGapBoundaryFound = True
+            else:
+                chunkBoundaries.append((chunkStartBase, theoreticalChunkEndBase))
+                chunkStartBase = theoreticalChunkEndBase - self.chunkOverlappingSize
+
+        chunkBoundaries.append((chunkStartBase, sequenceSize))
+
+        if not isGapBoundaryFound:
+            return None
+
+        self.nbGapBoundaries += len([chunkIndex for chunkIndex in range(1, len(chunkBoundaries)) if chunkBoundaries[chunkIndex][0] == chunkBoundaries[chunkIndex - 1][1]])
+
+        # Conversion of the base positions into offsets of the fasta file
+        return [(self.getBaseOffset(lineRuns, lineRunEndBases, startBase, instanceTableEntry.sequenceStartOffset), self.getBaseOffset(lineRuns, lineRunEndBases, endBase, instanceTableEntry.sequenceStartOffset) if endBase < sequenceSize else instanceTableEntry.sequenceEndOffset, endBase - startBase) for startBase, endBase in chunkBoundaries]
+
+
+    def findGapBoundary(self, lineRuns, lineRunEndBases, windowStartBase, windowEndBase):
+        # Returns the position of the middle of the gap that is the closest to the end of the window (or None when the window does not contain any gap)
+        # Initializations
+        windowStartOffset = self.getBaseOffset(lineRuns, lineRunEndBases, windowStartBase, lineRuns[0][0])
+        windowEndOffset = self.getBaseOffset(lineRuns, lineRunEndBases, windowEndBase, lineRuns[0][0])
+
+        self.sequenceExtractor.open()
+        windowBases = self.sequenceExtractor.readWindow(windowStartOffset, windowEndOffset).translate(None, '\r\n')
+
+        # The bases of the window are not contiguous in the fasta file (ex: comment lines)
+        if len(windowBases) != windowEndBase - windowStartBase:
+            return None
+
+        lastGap = None
+        for lastGap in self.gapPattern.finditer(windowBases):
+            pass
+
+        if lastGap is None:
+            return None
+
+        return windowStartBase + (lastGap.start() + lastGap.end()) / 2
+
+
+    ##############################
+    ##  Offset related methods  ##
+    ##############################
+    def getLineRunEndBases(self, lineRuns):
+        # Number of bases of the sequence located before the end of each run of lines
+        lineRunEndBases = list()
+        nbBases = 0
+
+        for firstLineOffset, nbCharactersByLine, nbLines, nbBytesByLine in lineRuns:
+            nbBases += nbCharactersByLine * nbLines
+            lineRunEndBases.append(nbBases)
+
+        return lineRunEndBases
+
+
+    def getBaseOffset(self, lineRuns, lineRunEndBases, basePosition, sequenceStartOffset):
+        # Offset of the boundary located after the first basePosition bases of the sequence
+        # Note: same convention as the TriAnnotSequenceGoals objects, a boundary located at the end of a line points to the beginning of the next line
+        if basePosition <= 0:
+            return sequenceStartOffset
+
+        runIndex = bisect.bisect_left(lineRunEndBases, basePosition)
+        firstLineOffset, nbCharactersByLine, nbLines, nbBytesByLine = lineRuns[runIndex]
+        runStartBase = lineRunEndBases[runIndex] - nbCharactersByLine * nbLines
+
+        lineIndex = (basePosition - runStartBase - 1) / nbCharactersByLine
+        lineStartBase = runStartBase + lineIndex * nbCharactersByLine
+
+        if basePosition == lineStartBase + nbCharactersByLine:
+            return firstLineOffset + (lineIndex + 1) * nbBytesByLine
+
+        return firstLineOffset + lineIndex * nbBytesByLine + basePosition - lineStartBase
@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+
+import os
+import logging
+
+# XML parsing module
+import xml.etree.cElementTree as etree
+
+from TriAnnot.TriAnnotConfig import *
+from TriAnnot.TriAnnotBgzfFile import *
+from TriAnnot.TriAnnotVersion import TRIANNOT_VERSION
+
+class TriAnnotFastaIndex (object):
+
+    # Static class variables
+    indexFileSuffix = '.fai'
+    chunkPlanFileSuffix = '.triannot_chunk_plan.xml'
+
+    # Chunk related attributes of TriAnnotInstanceTableEntry objects stored in the chunk plan
+    chunkAttributeNames = ['sequenceName', 'sequenceStartOffset', 'sequenceEndOffset', 'sequenceSize', 'chunkName', 'chunkNumber', 'chunkStartOffset', 'chunkEndOffset', 'chunkSize']
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self, sequenceFileFullPath, fallbackDirectoryFullPath):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotFastaIndex")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        # Note: the index and the chunk plan are written next to the fasta file or in the fallback directory (ie. the main execution folder) when the directory of the fasta file is read-only
+        self.sequenceFileFullPath = sequenceFileFullPath
+        self.fallbackDirectoryFullPath = fallbackDirectoryFullPath
+
+        sequenceFileStat = os.stat(self.sequenceFileFullPath)
+        self.sequenceFileSize = sequenceFileStat.st_size
+        self.uncompressedFileSize = TriAnnotBgzfFile.getSequenceFileSize(self.sequenceFileFullPath)
+        self.sequenceFileModificationTime = int(sequenceFileStat.st_mtime)
+        self._sequenceFileFingerprint = None
+
+        # Content of the samtools compatible index: one [name, length, offset, lineBases, lineWidth] list for each sequence
+        self.indexedSequences = list()
+        self.isIndexComplete = False
+        self.loadedIndexFileFullPath = None
+
+        # State of the index built during the scan of the fasta file
+        self.isIndexable = True
+        self.currentIndexedSequence = None
+        self.currentSequenceLineRuns = list()
+
+
+    def getSidecarFileFullPaths(self, fileSuffix):
+        # Possible locations of a sidecar file (in order of preference)
+        return [self.sequenceFileFullPath + fileSuffix, os.path.join(self.fallbackDirectoryFullPath, os.path.basename(self.sequenceFileFullPath) + fileSuffix)]
+
+
+    def getSequenceFileFingerprint(self):
+        if self._sequenceFileFingerprint is None:
+            # Reading the whole file would cost as much as the scan that the index avoids
+            self._sequenceFileFingerprint = Utils.getFileChecksum(self.sequenceFileFullPath, fastMode = True)
+
+        return self._sequenceFileFingerprint
+
+
+    #####################################
+    ##  Index building related methods ##
+    #####################################
+    def startSequence(self, descriptionLine, firstBaseOffset):
+        self.finalizeSequence()
+
+        # The name of a sequence in a fai file is the first word of its description line
+        descriptionWords = descriptionLine[1:].split(None, 1)
+        if len(descriptionWords) == 0:
+            self.isIndexable = False
+            return
+
+        self.currentIndexedSequence = [descriptionWords[0], 0, firstBaseOffset, 0, 0]
+        self.currentSequenceLineRuns = list()
+
+
+    def addLineRun(self, firstLineOffset, nbCharactersByLine, nbLines, nbBytesByLine):
+        # Consecutive runs with the same line length (ie. a run split by the end of a block) are merged
+        if len(self.currentSequenceLineRuns) > 0:
+            previousLineRun = self.currentSequenceLineRuns[-1]
+            if previousLineRun[1] == nbCharactersByLine and previousLineRun[3] == nbBytesByLine and previousLineRun[0] + previousLineRun[2] * previousLineRun[3] == firstLineOffset:
+                previousLineRun[2] += nbLines
+                return
+
+        self.currentSequenceLineRuns.append([firstLineOffset, nbCharactersByLine, nbLines, nbBytesByLine])
+
+
+    def addCommentLine(self):
+        # Comment lines are not supported by the fai format
+        self.isIndexable = False
+
+
+    def finalizeSequence(self):
+        if self.currentIndexedSequence is None:
+            return
+
+        # A sequence can be described by a fai file when all its lines have the same length (except the last one that can be shorter)
+        lineRuns = self.currentSequenceLineRuns
+        if len(lineRuns) == 0 or len(lineRuns) > 2 or lineRuns[0][0] != self.currentIndexedSequence[2]:
+            self.isIndexable = False
+        elif len(lineRuns) == 2 and (lineRuns[1][2] != 1 or lineRuns[1][1] > lineRuns[0][1] or lineRuns[1][0] != lineRuns[0][0] + lineRuns[0][2] * lineRuns[0][3]):
+            self.isIndexable = False
+        elif lineRuns[0][3] != lineRuns[0][1] + 1 and not (len(lineRuns) == 1 and lineRuns[0][2] == 1):
+            self.isIndexable = False
+        else:
+            self.currentIndexedSequence[1] = sum([lineRun[1] * lineRun[2] for lineRun in lineRuns])
+            self.currentIndexedSequence[3] = lineRuns[0][1]
+            self.currentIndexedSequence[4] = lineRuns[0][1] + 1
+            self.indexedSequences.append(self.currentIndexedSequence)
+
+        self.currentIndexedSequence = None
+        self.currentSequenceLineRuns = list()
+
+
+    def completeIndex(self):
+        self.finalizeSequence()
+        self.isIndexComplete = self.isIndexable and len(self.indexedSequences) > 0
+
+
+    def getLineRuns(self, indexedSequence):
+        # Runs of lines of the same length of an indexed sequence (see the 'lines' events of TriAnnotFastaScanner)
+        # Initializations
+        sequenceName, sequenceLength, firstBaseOffset, lineBases, lineWidth = indexedSequence
+        lineRuns = list()
+
+        if sequenceLength == 0 or lineBases == 0:
+            return lineRuns
+
+        nbFullLines = sequenceLength / lineBases
+        nbLastLineBases = sequenceLength % lineBases
+
+        if nbLastLineBases > 0:
+            lineRuns.append([firstBaseOffset, lineBases, nbFullLines, lineWidth])
+            lineRuns.append([firstBaseOffset + nbFullLines * lineWidth, nbLastLineBases, 1, nbLastLineBases + lineWidth - lineBases])
+        else:
+            lineRuns.append([firstBaseOffset, lineBases, nbFullLines - 1, lineWidth])
+            lineRuns.append([firstBaseOffset + (nbFullLines - 1) * lineWidth, lineBases, 1, lineWidth])
+
+        # The last line of the file might not end with an end of line character
+        lineRuns[-1][3] = min(lineRuns[-1][3], self.uncompressedFileSize - lineRuns[-1][0])
+
+        return [lineRun for lineRun in lineRuns if lineRun[2] > 0]
+
+
+    ################################
+    ##  Index file related methods ##
+    ################################
+    def loadIndex(self):
+        # Initializations
+        self.indexedSequences = list()
+        self.isIndexComplete = False
+
+        for indexFileFullPath in self.getSidecarFileFullPaths(TriAnnotFastaIndex.indexFileSuffix):
+            # An index older than the fasta file can't be trusted
+            if not Utils.isExistingFile(indexFileFullPath) or os.stat(indexFileFullPath).st_mtime < self.sequenceFileModificationTime:
+                continue
+
+            try:
+                with open(indexFileFullPath, 'r') as indexFileHandler:
+                    for indexLine in indexFileHandler:
+                        indexColumns = indexLine.rstrip('\n').split('\t')
+                        self.indexedSequences.append([indexColumns[0]] + [int(indexColumns[columnIndex]) for columnIndex in range(1, 5)])
+            except (IOError, ValueError, IndexError) as ex:
+                self.logger.warning("The following fasta index file is invalid and will be ignored: %s (%s)" % (indexFileFullPath, ex))
+                self.indexedSequences = list()
+                continue
+
+            if not self.isIndexConsistent():
+                self.logger.warning("The following fasta index file does not describe the fasta input file and will be ignored: %s" % indexFileFullPath)
+                self.indexedSequences = list()
+                continue
+
+            self.isIndexComplete = True
+            self.loadedIndexFileFullPath = indexFileFullPath
+            self.logger.info("The offsets of the <%d> sequence(s) of the fasta input file have been loaded from the following index file: %s" % (len(self.indexedSequences), indexFileFullPath))
+            return True
+
+        return False
+
+
+    def isIndexConsistent(self):
+        # Initializations
+        previousEndOffset = 0
+
+        if len(self.indexedSequences) == 0:
+            return False
+
+        for sequenceName, sequenceLength, firstBaseOffset, lineBases, lineWidth in self.indexedSequences:
+            if sequenceLength <= 0 or lineBases <= 0 or lineWidth != lineBases + 1 or firstBaseOffset <= previousEndOffset:
+                return False
+
+            # Offset following the last base of the sequence
+            previousEndOffset = firstBaseOffset + ((sequenceLength - 1) / lineBases) * lineWidth + (sequenceLength - 1) % lineBases + 1
+            if previousEndOffset > self.uncompressedFileSize:
+                return False
+
+        # The last sequence ends at the end of the file (with or without end of line character)
+        return self.uncompressedFileSize - previousEndOffset <= 1
+
+
+    def saveIndex(self):
+        # Nothing to save when the index is incomplete or has been loaded from an existing file
+        if not self.isIndexComplete or self.loadedIndexFileFullPath is not None:
+            return
+
+        for indexFileFullPath in self.getSidecarFileFullPaths(TriAnnotFastaIndex.indexFileSuffix):
+            try:
+                with open(indexFileFullPath, 'w') as indexFileHandler:
+                    for indexedSequence in self.indexedSequences:
+                        indexFileHandler.write("\t".join([str(indexColumn) for indexColumn in indexedSequence]) + "\n")
+            except (IOError, OSError):
+                self.logger.debug("The fasta index file can't be written in the following location: %s" % indexFileFullPath)
+                continue
+
+            self.logger.info("The offsets of the sequences of the fasta input file have been saved in the following index file: %s" % indexFileFullPath)
+            return
+
+
+    #####################################
+    ##  Chunk plan file related methods ##
+    #####################################
+    def getChunkPlanAttributes(self, chunkingParameters):
+        # The plan is only valid for the current content of the fasta file and for the current chunking parameters (a copy of the fasta file can reuse it)
+        chunkPlanAttributes = {'fasta_size': str(self.sequenceFileSize), 'fasta_fingerprint': self.getSequenceFileFingerprint()}
+        for parameterName, parameterValue in chunkingParameters.items():
+            chunkPlanAttributes[parameterName] = str(parameterValue)
+
+        return chunkPlanAttributes
+
+
+    def findChunkPlan(self, chunkingParameters):
+        # Returns the full path of the chunk plan file that contains a suitable chunk plan (or None if there is none)
+        # Initializations
+        chunkPlanAttributes = self.getChunkPlanAttributes(chunkingParameters)
+
+        for chunkPlanFileFullPath in self.getSidecarFileFullPaths(TriAnnotFastaIndex.chunkPlanFileSuffix):
+            if not Utils.isExistingFile(chunkPlanFileFullPath):
+                continue
+
+            try:
+                for chunkPlanElement in self.iterateChunkPlanElements(chunkPlanFileFullPath, None):
+                    if TriAnnotFastaIndex.isMatchingChunkPlan(chunkPlanElement, chunkPlanAttributes):
+                        return chunkPlanFileFullPath
+            except Exception as ex:
+                self.logger.warning("The following chunk plan file is invalid and will be ignored: %s (%s)" % (chunkPlanFileFullPath, ex))
+
+        return None
+
+
+    def iterateChunkPlan(self, chunkPlanFileFullPath, chunkingParameters):
+        # Generator of the chunks (as dict) of the suitable chunk plan of a chunk plan file
+        # Initializations
+        chunkPlanAttributes = self.getChunkPlanAttributes(chunkingParameters)
+
+        for chunkElement in self.iterateChunkPlanElements(chunkPlanFileFullPath, chunkPlanAttributes):
+            chunkData = dict()
+            for attributeName in TriAnnotFastaIndex.chunkAttributeNames:
+                chunkData[attributeName] = chunkElement.get(attributeName) if attributeName in ['sequenceName', 'chunkName'] else int(chunkElement.get(attributeName))
+
+            yield chunkData
+
+
+    def iterateChunkPlanElements(self, chunkPlanFileFullPath, chunkPlanAttributes):
+        # Generates the plan elements (without their chunks) when chunkPlanAttributes is None or the chunk elements of the matching plan otherwise
+        # Note: the file is parsed incrementally and each chunk element is discarded once treated so that the memory usage does not depend on the number of chunks
+        # Initializations
+        currentChunkPlanElement = None
+        isMatchingChunkPlan = False
+
+        for eventType, xmlElement in etree.iterparse(chunkPlanFileFullPath, events = ('start', 'end')):
+            if xmlElement.tag == 'plan':
+                if eventType == 'start':
+                    currentChunkPlanElement = xmlElement
+                    if chunkPlanAttributes is None:
+                        yield xmlElement
+                    else:
+                        isMatchingChunkPlan = TriAnnotFastaIndex.isMatchingChunkPlan(xmlElement, chunkPlanAttributes)
+                elif isMatchingChunkPlan:
+                    return
+
+            elif xmlElement.tag == 'chunk' and eventType == 'end':
+                if isMatchingChunkPlan:
+                    yield xmlElement
+                currentChunkPlanElement.remove(xmlElement)
+
+
+    def saveChunkPlan(self, chunkingParameters, chunkDefinitions):
+        # The chunk definitions are either dict or sqlite3.Row objects (see the iterateChunkDefinitions method of TriAnnotSqlite)
+        # Initializations
+        chunkPlanAttributes = self.getChunkPlanAttributes(chunkingParameters)
+
+        for chunkPlanFileFullPath in self.getSidecarFileFullPaths(TriAnnotFastaIndex.chunkPlanFileSuffix):
+            # The plans computed for the other chunking parameters are kept (as long as they describe the current version of the fasta file)
+            otherChunkPlansAttributes = list()
+            if Utils.isExistingFile(chunkPlanFileFullPath):
+                try:
+                    for chunkPlanElement in self.iterateChunkPlanElements(chunkPlanFileFullPath, None):
+                        if chunkPlanElement.get('fasta_fingerprint') == chunkPlanAttributes['fasta_fingerprint'] and not TriAnnotFastaIndex.isMatchingChunkPlan(chunkPlanElement, chunkPlanAttributes):
+                            otherChunkPlansAttributes.append(dict(chunkPlanElement.items()))
+                except Exception:
+                    otherChunkPlansAttributes = list()
+
+            # The file might be shared by several TriAnnotPipeline executions so it is written under a temporary name and then renamed
+            # Note: the chunk elements are written one by one (the whole XML tree is never built in memory)
+            try:
+                temporaryFileFullPath = "%s.%d.tmp" % (chunkPlanFileFullPath, os.getpid())
+                with open(temporaryFileFullPath, 'w') as chunkPlanFileHandler:
+                    chunkPlanFileHandler.write("<?xml version='1.0' encoding='ISO-8859-1'?>\n")
+                    chunkPlanFileHandler.write("<chunk_plans triannot_version=\"%s\">\n" % TRIANNOT_VERSION)
+
+                    for otherChunkPlanAttributes in otherChunkPlansAttributes:
+                        self.writeChunkPlan(chunkPlanFileHandler, otherChunkPlanAttributes, self.iterateChunkPlan(chunkPlanFileFullPath, otherChunkPlanAttributes))
+
+                    self.writeChunkPlan(chunkPlanFileHandler, chunkPlanAttributes, chunkDefinitions)
+
+                    chunkPlanFileHandler.write("</chunk_plans>\n")
+                os.rename(temporaryFileFullPath, chunkPlanFileFullPath)
+            except (IOError, OSError):
+                self.logger.debug("The chunk plan file can't be written in the following location: %s" % chunkPlanFileFullPath)
+                continue
+
+            self.logger.debug("The chunk plan of the fasta input file has been saved in the following file: %s" % chunkPlanFileFullPath)
+            return
+
+
+    def writeChunkPlan(self, chunkPlanFileHandler, chunkPlanAttributes, chunkDefinitions):
+        chunkPlanFileHandler.write("\t%s\n" % etree.tostring(etree.Element('plan', chunkPlanAttributes)).replace(' />', '>'))
+
+        for chunkDefinition in chunkDefinitions:
+            chunkPlanFileHandler.write("\t\t%s\n" % etree.tostring(etree.Element('chunk', dict([(attributeName, str(chunkDefinition[attributeName])) for attributeName in TriAnnotFastaIndex.chunkAttributeNames]))))
+
+        chunkPlanFileHandler.write("\t</plan>\n")
+
+
+    ######################
+    ##  Static methods  ##
+    ######################
+    @staticmethod
+    def isMatchingChunkPlan(chunkPlanElement, chunkPlanAttributes):
+        return all([chunkPlanElement.get(attributeName) == attributeValue for attributeName, attributeValue in chunkPlanAttributes.items()])
@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+
+import logging
+
+from TriAnnot.TriAnnotBgzfFile import *
+
+class TriAnnotFastaScanner (object):
+
+    # Static class variables
+    # Authorized characters (IUPAC code) for each type of sequence
+    authorizedCharacters = {'nucleic': 'ACGTURYSWKMBDHVN', 'proteic': 'ABCDEFGHIKLMNPQRSTVWXYZ*'}
+
+    # Characters that are removed by the strip() of the line by line analysis (the offsets of lines that contain them can't be computed arithmetically)
+    strippedCharacters = ' \t\r\x0b\x0c'
+
+    defaultBlockSize = 16 * 1024 * 1024
+
+    # Number of bytes read after the theoretical boundary of a shard to find the beginning of a description line
+    shardBoundaryLookAheadSize = 1024 * 1024
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self, sequenceFileFullPath, sequenceType, blockSize = None):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotFastaScanner")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        self.sequenceFileFullPath = sequenceFileFullPath
+        self.sequenceType = sequenceType
+        self.blockSize = blockSize if blockSize is not None else TriAnnotFastaScanner.defaultBlockSize
+
+        # Characters deleted (with str.translate) from the sequence lines during the validation: what remains is invalid
+        self.validationDeleteCharacters = TriAnnotFastaScanner.authorizedCharacters[self.sequenceType] + TriAnnotFastaScanner.authorizedCharacters[self.sequenceType].lower() + '\n'
+
+
+    ###########################
+    ##  Scanning generators  ##
+    ###########################
+    def scanFile(self, startOffset = 0, endOffset = None, startsInSequence = False):
+        # Scans the portion of the file located between startOffset (beginning of a line) and endOffset (beginning of a line or end of the file)
+        # Note: startsInSequence must be used when the portion of the file starts in the middle of a sequence (the lines located before its first description line are then treated as sequence lines)
+        # Generates the following events (offsets are in bytes from the beginning of the file):
+        #   - ('header', offset, descriptionLine)
+        #   - ('comment', offset, commentLine)
+        #   - ('lines', offset, nbCharactersByLine, nbLines, nbBytesByLine): run of consecutive sequence lines of the same length
+        #   - ('invalid', offset, invalidLine): sequence line that contains unauthorized characters
+        #   - ('unsupported', offset, reason): the offsets of the file can't be computed from its blocks (the scan is stopped)
+        # Initializations
+        blockOffset = startOffset
+        readOffset = startOffset
+        remainingBytes = ''
+        headerFound = startsInSequence
+
+        with TriAnnotBgzfFile.openSequenceFile(self.sequenceFileFullPath) as sequenceFileHandler:
+            sequenceFileHandler.seek(startOffset)
+
+            while True:
+                if endOffset is None:
+                    newBytes = sequenceFileHandler.read(self.blockSize)
+                else:
+                    newBytes = sequenceFileHandler.read(max(min(self.blockSize, endOffset - readOffset), 0))
+                readOffset += len(newBytes)
+
+                currentBlock = remainingBytes + newBytes
+
+                if currentBlock == '':
+                    break
+
+                # Only complete lines are analyzed (except for the last line of the file)
+                if newBytes != '':
+                    lastNewLinePosition = currentBlock.rfind('\n')
+                    if lastNewLinePosition == -1:
+                        remainingBytes = currentBlock
+                        continue
+
+                    remainingBytes = currentBlock[lastNewLinePosition + 1:]
+                    currentBlock = currentBlock[:lastNewLinePosition + 1]
+                else:
+                    remainingBytes = ''
+
+                # The line by line analysis opens the file in universal newline mode so its offsets don't match the bytes of files with carriage returns
+                if '\r' in currentBlock:
+                    yield ('unsupported', blockOffset, 'the file contains carriage return characters')
+                    return
+
+                for event in self.scanBlock(currentBlock, blockOffset, headerFound):
+                    if event[0] == 'header':
+                        headerFound = True
+                    yield event
+                    if event[0] == 'unsupported':
+                        return
+
+                blockOffset += len(currentBlock)
+
+                if newBytes == '':
+                    break
+
+
+    def scanBlock(self, currentBlock, blockOffset, headerFound):
+        # Initializations
+        position = 0
+        blockSize = len(currentBlock)
+        nextHeaderPosition = self.findLineStart(currentBlock, '>', 0)
+        nextCommentPosition = self.findLineStart(currentBlock, '#', 0)
+
+        while position < blockSize:
+            # Header and comment lines
+            if currentBlock[position] == '>' or currentBlock[position] == '#':
+                lineEndPosition = currentBlock.find('\n', position)
+                lineEndPosition = blockSize if lineEndPosition == -1 else lineEndPosition + 1
+
+                yield ('header' if currentBlock[position] == '>' else 'comment', blockOffset + position, currentBlock[position:lineEndPosition])
+                headerFound = headerFound or currentBlock[position] == '>'
+                position = lineEndPosition
+
+                # Search the next header/comment line only when the previous one has been reached
+                if nextHeaderPosition < position:
+                    nextHeaderPosition = self.findLineStart(currentBlock, '>', position)
+                if nextCommentPosition < position:
+                    nextCommentPosition = self.findLineStart(currentBlock, '#', position)
+                continue
+
+            # Sequence lines (up to the next header/comment line)
+            segmentEndPosition = min(nextHeaderPosition, nextCommentPosition)
+
+            # Lines located before the first header are ignored (without being counted) by the line by line analysis
+            if not headerFound:
+                yield ('unsupported', blockOffset + position, 'some lines are located before the first description line')
+                return
+
+            for event in self.scanSequenceLines(currentBlock[position:segmentEndPosition], blockOffset + position):
+                yield event
+                if event[0] == 'unsupported':
+                    return
+
+            position = segmentEndPosition
+
+
+    def scanSequenceLines(self, sequenceLines, linesOffset):
+        # Validation of all the lines at once: authorized characters are deleted, anything left is either invalid or a blank character
+        remainingCharacters = sequenceLines.translate(None, self.validationDeleteCharacters)
+
+        if remainingCharacters != '':
+            if remainingCharacters.translate(None, TriAnnotFastaScanner.strippedCharacters) != '':
+                yield self.getInvalidLineEvent(sequenceLines, linesOffset)
+            else:
+                yield ('unsupported', linesOffset, 'some sequence lines contain blank characters')
+            return
+
+        # The line by line analysis does not count the bytes of empty lines in its offsets
+        if sequenceLines.startswith('\n') or '\n\n' in sequenceLines:
+            yield ('unsupported', linesOffset, 'some sequence lines are empty')
+            return
+
+        # Group consecutive lines of the same length
+        position = 0
+        segmentSize = len(sequenceLines)
+
+        while position < segmentSize:
+            newLinePosition = sequenceLines.find('\n', position)
+
+            # Last line of the file without end of line character
+            if newLinePosition == -1:
+                yield ('lines', linesOffset + position, segmentSize - position, 1, segmentSize - position)
+                return
+
+            nbCharactersByLine = newLinePosition - position
+            nbBytesByLine = nbCharactersByLine + 1
+
+            # The end of line characters of a run of identical lines are located every nbBytesByLine bytes
+            # Note: the checked window grows exponentially so that files with lines of variable length are not analyzed in quadratic time
+            nbLines = 0
+            nbLinesInWindow = 64
+
+            while True:
+                windowEndPosition = min(segmentSize, position + (nbLines + nbLinesInWindow) * nbBytesByLine)
+                lineEndCharacters = sequenceLines[position + nbLines * nbBytesByLine + nbCharactersByLine:windowEndPosition:nbBytesByLine]
+                nbLineEndsFound = len(lineEndCharacters) - len(lineEndCharacters.lstrip('\n'))
+                nbLines += nbLineEndsFound
+
+                if nbLineEndsFound < len(lineEndCharacters) or windowEndPosition == segmentSize:
+                    break
+                nbLinesInWindow *= 2
+
+            # A shorter line might end exactly where a line of the run would end
+            if nbLines > 1 and sequenceLines.count('\n', position, position + nbLines * nbBytesByLine) != nbLines:
+                nbLines = 1
+
+            yield ('lines', linesOffset + position, nbCharactersByLine, nbLines, nbBytesByLine)
+            position += nbLines * nbBytesByLine
+
+
+    def getShardOffsets(self, nbShards):
+        # Returns the start offsets of (at most) nbShards portions of the file of similar size that can be scanned independently
+        # Note: the shards start at the beginning of a description line when possible (ie. for sequences smaller than shardBoundaryLookAheadSize) or at the beginning of a sequence line otherwise
+        # Initializations
+        shardOffsets = [0]
+        sequenceFileSize = TriAnnotBgzfFile.getSequenceFileSize(self.sequenceFileFullPath)
+
+        with TriAnnotBgzfFile.openSequenceFile(self.sequenceFileFullPath) as sequenceFileHandler:
+            for shardNumber in range(1, nbShards):
+                theoreticalOffset = max(sequenceFileSize * shardNumber / nbShards, shardOffsets[-1])
+
+                sequenceFileHandler.seek(theoreticalOffset)
+                lookAheadBytes = sequenceFileHandler.read(TriAnnotFastaScanner.shardBoundaryLookAheadSize)
+
+                boundaryPosition = lookAheadBytes.find('\n>')
+                if boundaryPosition == -1:
+                    boundaryPosition = lookAheadBytes.find('\n')
+                    if boundaryPosition == -1:
+                        continue
+
+                shardOffset = theoreticalOffset + boundaryPosition + 1
+                if shardOffset > shardOffsets[-1] and shardOffset < sequenceFileSize:
+                    shardOffsets.append(shardOffset)
+
+        return shardOffsets
+
+
+    def getInvalidLineEvent(self, sequenceLines, linesOffset):
+        # Initializations
+        lineStartPosition = 0
+
+        for sequenceLine in sequenceLines.split('\n'):
+            if sequenceLine.translate(None, self.validationDeleteCharacters + TriAnnotFastaScanner.strippedCharacters) != '':
+                return ('invalid', linesOffset + lineStartPosition, sequenceLine)
+            lineStartPosition += len(sequenceLine) + 1
+
+
+    ######################
+    ##  Static methods  ##
+    ######################
+    @staticmethod
+    def findLineStart(currentBlock, firstCharacter, position):
+        # Returns the position of the next line that starts with firstCharacter (or the size of the block if there is none)
+        if position == 0 and currentBlock.startswith(firstCharacter):
+            return 0
+
+        linePosition = currentBlock.find('\n' + firstCharacter, max(position - 1, 0))
+
+        return len(currentBlock) if linePosition == -1 else linePosition + 1
+
+
+########################################
+###  Process pool related functions  ###
+########################################
+
+def scanSequenceFileShard(shardDescription):
+    # Scan of a portion of a fasta file by a process of a multiprocessing pool (the events are returned all at once)
+    sequenceFileFullPath, sequenceType, startOffset, endOffset = shardDescription
+
+    return list(TriAnnotFastaScanner(sequenceFileFullPath, sequenceType).scanFile(startOffset, endOffset, startOffset > 0))
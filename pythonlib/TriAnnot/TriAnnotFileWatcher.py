@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+import os
+import logging
+
+from TriAnnot.TriAnnotConfig import *
+
+class TriAnnotFileWatcher (object):
+
+    # Static class variables
+    networkFileSystemTypes = ['nfs', 'nfs4', 'lustre', 'gpfs', 'cifs', 'smbfs', 'smb3', 'beegfs', 'fhgfs', 'ceph', 'glusterfs', 'fuse.glusterfs', 'fuse.sshfs', 'panfs', 'afs', 'ocfs2', 'gfs2']
+
+    # Constructor
+    def __init__(self, watcherType, watchedFileNames):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotFileWatcher")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        self.watcherType = watcherType
+        self.watchedFileNames = watchedFileNames
+
+        # Watched directories (Key = identifier of the watched object (ie. instance id) / Value = directory full path)
+        self.watchedDirectories = dict()
+
+        # Change class to a specialized subclass if there is one defined for self.watcherType
+        for watcherClass in TriAnnotFileWatcher.__subclasses__():
+            if watcherClass.__name__ == self.watcherType:
+                self.__class__ = watcherClass
+                self.logger = logging.getLogger("TriAnnot.FileWatcher.%s" % self.__class__.__name__)
+                self.logger.addHandler(logging.NullHandler())
+                self.__init__()
+
+
+    # Semi-Virtual methods
+    def getWatcherDescription(self):
+        raise NotImplementedError('No getWatcherDescription method implemented for file watcher %s' % (self.watcherType))
+
+
+    def addWatch(self, identifier, directoryFullPath):
+        raise NotImplementedError('No addWatch method implemented for file watcher %s' % (self.watcherType))
+
+
+    def removeWatch(self, identifier):
+        raise NotImplementedError('No removeWatch method implemented for file watcher %s' % (self.watcherType))
+
+
+    def waitForEvents(self, timeout):
+        raise NotImplementedError('No waitForEvents method implemented for file watcher %s' % (self.watcherType))
+
+
+    def close(self):
+        raise NotImplementedError('No close method implemented for file watcher %s' % (self.watcherType))
+
+
+    # Static methods
+    @staticmethod
+    def getBestWatcherType(requestedWatcherType, directoryFullPath):
+        # Any explicitly requested watcher type is kept as is
+        if requestedWatcherType != 'auto':
+            return requestedWatcherType
+
+        # Kernel notifications are not emitted when a file is modified by a remote host on a network file system
+        if TriAnnotFileWatcher.isOnNetworkFileSystem(directoryFullPath):
+            return 'Polling'
+
+        for watcherClass in TriAnnotFileWatcher.__subclasses__():
+            if watcherClass.__name__ == 'Inotify' and watcherClass.isAvailable():
+                return 'Inotify'
+
+        return 'Polling'
+
+
+    @staticmethod
+    def isOnNetworkFileSystem(directoryFullPath):
+        # Initializations
+        bestMountPoint = ''
+        bestFileSystemType = None
+        directoryRealPath = os.path.realpath(directoryFullPath)
+
+        # Find the mount point that contains the directory (ie. the longest matching mount point)
+        try:
+            with open('/proc/mounts', 'r') as mountsFileHandler:
+                for mountLine in mountsFileHandler:
+                    mountFields = mountLine.split()
+                    if len(mountFields) < 3:
+                        continue
+
+                    mountPoint = mountFields[1].replace('\\040', ' ')
+                    if (directoryRealPath == mountPoint or directoryRealPath.startswith(mountPoint.rstrip('/') + '/')) and len(mountPoint) >= len(bestMountPoint):
+                        bestMountPoint = mountPoint
+                        bestFileSystemType = mountFields[2]
+        except IOError:
+            # /proc/mounts is only available on Linux so we assume the worst case
+            return True
+
+        return bestFileSystemType is None or bestFileSystemType in TriAnnotFileWatcher.networkFileSystemTypes
+
+
+# Import all subclasses from FileWatchers folder
+for f in glob.glob(os.path.dirname(__file__)+"/FileWatchers/*.py"):
+    name = os.path.basename(f)[:-3]
+    if name != "__init__":
+        __import__("FileWatchers." + name, locals(), globals())
@@ -2,7 +2,7 @@
 
 # Basic python modules
 import os
-import time
+import copy
 import logging
 import traceback
 from time import sleep
@@ -28,6 +28,10 @@ class TriAnnotInstance (object):
         for attributeName, attributeValue in instanceToLaunchAsDict.iteritems():
             setattr(self, attributeName, attributeValue)
 
+        # Databases created by older versions of TriAnnot do not store the index of the array task
+        if not hasattr(self, 'instanceArrayTaskIndex'):
+            self.instanceArrayTaskIndex = None
+
         # Runner related attibutes
         self.runner = None
         self.jobRunnerName = requestedJobRunnerName
@@ -39,6 +43,9 @@ class TriAnnotInstance (object):
         self.failedSubmitCount = 0
         self.startTime = None
 
+        # Speculative execution related attributes (duplicate execution of a straggler instance in another directory)
+        self.speculativeAttempt = False
+
         # Monitoring related attributes
         self.checkedIsAliveTime = None
         self._cptFailedCheckStillAlive = 0
@@ -52,7 +59,9 @@ class TriAnnotInstance (object):
         self.progressFileContent = None
 
         # Error related attributes
+        # Note: the error class is used by the automatic retry policy (see TriAnnotRetryPolicy)
         self.errorsList = list()
+        self.errorClass = None
         self.needToAbortPipeline = None
         self.abortPipelineReason = None
 
@@ -116,7 +125,7 @@ class TriAnnotInstance (object):
 
 
     def isExecutionFinishedBasedOnFiles(self):
-        # Check if the TriAnnot_finished file exists, is readable and has been generated more than 10s before the check
+        # Check if the TriAnnot_finished file exists and is readable
         if not self.isTriAnnotFinishedFileAvailable():
             return False
 
@@ -128,7 +137,7 @@ class TriAnnotInstance (object):
         self.instanceStatus = TriAnnotStatus.getStatusCode(Utils.findFirstElementOccurence(self.finishedFileContent, 'status', returnTextValue = True))
 
         if self.instanceStatus == TriAnnotStatus.ERROR:
-            self.setErrorStatus("Instance/Unit execution has exited with ERROR status")
+            self.setErrorStatus("Instance/Unit execution has exited with ERROR status", 'execution')
             return True
         elif self.instanceStatus == TriAnnotStatus.COMPLETED or self.instanceStatus == TriAnnotStatus.CANCELED:
             return True
@@ -147,10 +156,9 @@ class TriAnnotInstance (object):
             else:
                 return False
 
-        if not Utils.isExistingFile(self.finishedFileFullPath, checkOnlyOnce = False):
-            return False
-
-        if time.time() - os.path.getmtime(self.finishedFileFullPath) < 10:
+        # Note: TriAnnotUnit writes this file atomically (temporary file + rename) so there is no need to wait before reading it
+        # A missing file will simply be checked again during the next monitoring turn
+        if not Utils.isExistingFile(self.finishedFileFullPath):
             return False
 
         return True
@@ -167,7 +175,7 @@ class TriAnnotInstance (object):
             self.finishedFileContent = Utils.getDictFromXmlFile(self.finishedFileFullPath)
 
         except Exception as ex:
-            self.setErrorStatus("An unexpected error occured during the parsing of the %s XML file (%s): %s" % (fileToParseBasename, self.finishedFileFullPath, ex))
+            self.setErrorStatus("An unexpected error occured during the parsing of the %s XML file (%s): %s" % (fileToParseBasename, self.finishedFileFullPath, ex), 'fileSystem')
             return False
 
         # Check for mandatory tags
@@ -192,10 +200,8 @@ class TriAnnotInstance (object):
             else:
                 return False
 
-        if not Utils.isExistingFile(self.progressFileFullPath, checkOnlyOnce = False):
-            return False
-
-        if time.time() - os.path.getmtime(self.progressFileFullPath) < 10:
+        # Note: TriAnnotUnit writes this file atomically (temporary file + rename) so there is no need to wait before reading it
+        if not Utils.isExistingFile(self.progressFileFullPath):
             return False
 
         # Try to parse the XML file and convert it into a dictionary
@@ -204,7 +210,7 @@ class TriAnnotInstance (object):
             self.progressFileContent = Utils.getDictFromXmlFile(self.progressFileFullPath)
 
         except Exception as ex:
-            self.setErrorStatus("An unexpected error occured during the parsing of the %s XML file (%s): %s" % (fileToParseBasename, self.progressFileFullPath, ex))
+            self.setErrorStatus("An unexpected error occured during the parsing of the %s XML file (%s): %s" % (fileToParseBasename, self.progressFileFullPath, ex), 'fileSystem')
             #os.remove(self.progressFileFullPath)
             return False
 
@@ -222,7 +228,7 @@ class TriAnnotInstance (object):
             self.progressFileContent = Utils.getDictFromXmlFile(self.progressFileFullPath)
 
         except Exception as ex:
-            self.setErrorStatus("An unexpected error occured during the parsing of the %s XML file (%s): %s" % (fileToParseBasename, self.progressFileFullPath, ex))
+            self.setErrorStatus("An unexpected error occured during the parsing of the %s XML file (%s): %s" % (fileToParseBasename, self.progressFileFullPath, ex), 'fileSystem')
             return False
 
         # Check for mandatory tags
@@ -275,6 +281,41 @@ class TriAnnotInstance (object):
                     abortFileHandler.write("kill=yes")
 
 
+    #############################################
+    ##  Speculative execution related methods  ##
+    #############################################
+    def createSpeculativeAttempt(self, attemptDirectoryFullPath):
+        # The speculative attempt is a copy of the current instance (same identifier and chunk) executed in its own directory
+        speculativeAttempt = copy.copy(self)
+        speculativeAttempt.speculativeAttempt = True
+
+        speculativeAttempt.instanceDirectoryFullPath = attemptDirectoryFullPath
+        speculativeAttempt.instanceFastaFileFullPath = None
+        speculativeAttempt.instanceStatus = TriAnnotStatus.PENDING
+        speculativeAttempt.instanceProgression = 0
+        speculativeAttempt.instanceJobIdentifier = None
+        speculativeAttempt.instanceArrayTaskIndex = None
+
+        speculativeAttempt.runner = None
+        speculativeAttempt.failedSubmitCount = 0
+        speculativeAttempt.startTime = None
+        speculativeAttempt.checkedIsAliveTime = None
+        speculativeAttempt._cptFailedCheckStillAlive = 0
+        speculativeAttempt._cptNotAlive = 0
+
+        speculativeAttempt.finishedFileFullPath = None
+        speculativeAttempt.finishedFileContent = None
+        speculativeAttempt.progressFileFullPath = None
+        speculativeAttempt.progressFileContent = None
+
+        speculativeAttempt.errorsList = list()
+        speculativeAttempt.errorClass = None
+        speculativeAttempt.needToAbortPipeline = None
+        speculativeAttempt.abortPipelineReason = None
+
+        return speculativeAttempt
+
+
     ##############################
     ##  Unsorted basic methods  ##
     ##############################
@@ -286,15 +327,20 @@ class TriAnnotInstance (object):
         return 1
 
 
-    def setErrorStatus(self, errorMessage):
+    def setErrorStatus(self, errorMessage, errorClass = 'unknown'):
         self.logger.error("Execution failed for %s - %s" % (self.getDescriptionString(), errorMessage))
         self.instanceStatus = TriAnnotStatus.ERROR
         self.errorsList.append(errorMessage)
+        self.errorClass = errorClass
 
 
     def setStartTime(self, time):
+        self.startTime = time
         self.checkedIsAliveTime = time
 
 
     def getDescriptionString(self):
+        if self.speculativeAttempt:
+            return "speculative attempt of instance %s [Chunk name: %s - Chunk size: %s - Sequence type: %s]" % (self.id, self.chunkName, self.chunkSize, self.sequenceType)
+
         return "instance %s [Chunk name: %s - Chunk size: %s - Sequence type: %s]" % (self.id, self.chunkName, self.chunkSize, self.sequenceType)
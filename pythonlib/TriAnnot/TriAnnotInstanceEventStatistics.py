@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+
+import logging
+from collections import OrderedDict
+
+from TriAnnot.TriAnnotStatus import *
+
+class TriAnnotInstanceEventStatistics (object):
+
+    # Static class variables
+    # Note: the progress events are not needed to rebuild the execution attempts of the instances
+    usefulEventTypes = ['submission', 'start', 'completion', 'abort', 'retry']
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self, chunkSizes, intervalLength = 3600):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotInstanceEventStatistics")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        # Note: chunkSizes gives the size (in bp) of the chunk of each instance, the throughput and the concurrency are computed for consecutive intervals of intervalLength seconds
+        self.chunkSizes = chunkSizes
+        self.intervalLength = intervalLength
+
+        # Execution attempts of the instances (one for each submission) and attempts that are not finished yet (by instance id)
+        self.attempts = list()
+        self.openAttempts = dict()
+
+        self.firstEventTime = None
+        self.lastEventTime = None
+        self.nbEvents = 0
+
+
+    #############################
+    ##  Event loading methods  ##
+    #############################
+    def loadEvents(self, instanceEvents):
+        # The events must be given in chronological order
+        # Note: the events of an instance executed twice at the same time (speculative execution) are given with the job identifier of the concerned execution
+        for instanceEvent in instanceEvents:
+            self.nbEvents += 1
+            eventTime = instanceEvent['eventTime']
+            instanceId = instanceEvent['instanceId']
+
+            if self.firstEventTime is None:
+                self.firstEventTime = eventTime
+            self.lastEventTime = eventTime
+
+            if instanceEvent['eventType'] == 'submission':
+                attempt = {'instanceId': instanceId, 'submissionTime': eventTime, 'startTime': None, 'endTime': None, 'outcome': None, 'runnerName': instanceEvent['runnerName'], 'jobIdentifier': instanceEvent['jobIdentifier']}
+                self.attempts.append(attempt)
+                self.openAttempts.setdefault(instanceId, list()).append(attempt)
+
+            elif instanceEvent['eventType'] == 'start':
+                for attempt in self.getConcernedOpenAttempts(instanceId, instanceEvent['jobIdentifier']):
+                    if attempt['startTime'] is None:
+                        attempt['startTime'] = eventTime
+                        break
+
+            else:
+                # Completion, abort or retry: every concerned attempt of the instance is over (ex: PENDING instances canceled before their submission have no attempt)
+                for attempt in self.getConcernedOpenAttempts(instanceId, instanceEvent['jobIdentifier']):
+                    attempt['endTime'] = eventTime
+                    attempt['outcome'] = TriAnnotStatus.STATUS_NAMES.get(instanceEvent['instanceStatus'], instanceEvent['eventType'].upper())
+                    self.openAttempts[instanceId].remove(attempt)
+
+                if len(self.openAttempts.get(instanceId, list())) == 0:
+                    self.openAttempts.pop(instanceId, None)
+
+        self.logger.debug("<%d> execution attempt(s) have been rebuilt from <%d> event(s)" % (len(self.attempts), self.nbEvents))
+
+
+    def getConcernedOpenAttempts(self, instanceId, jobIdentifier):
+        # An event with a job identifier only concerns the attempt of the same job - OR - every open attempt of the instance when no attempt matches
+        openAttempts = self.openAttempts.get(instanceId, list())
+
+        if jobIdentifier is not None:
+            matchingAttempts = [attempt for attempt in openAttempts if attempt['jobIdentifier'] is not None and str(attempt['jobIdentifier']) == str(jobIdentifier)]
+            if len(matchingAttempts) > 0:
+                return matchingAttempts
+
+        return list(openAttempts)
+
+
+    def getAttemptEndTime(self, attempt):
+        # The attempts that are still running are considered until the last recorded event
+        return attempt['endTime'] if attempt['endTime'] is not None else self.lastEventTime
+
+
+    def getOutcomeCounters(self):
+        # Initializations
+        outcomeCounters = OrderedDict()
+
+        for attempt in self.attempts:
+            outcome = attempt['outcome'] if attempt['outcome'] is not None else 'UNFINISHED'
+            outcomeCounters[outcome] = outcomeCounters.get(outcome, 0) + 1
+
+        return outcomeCounters
+
+
+    ############################
+    ##  Distribution methods  ##
+    ############################
+    def getRunnerNames(self):
+        return sorted(set([attempt['runnerName'] for attempt in self.attempts if attempt['runnerName'] is not None]))
+
+
+    def getQueueWaits(self, runnerName = None):
+        # Time between the submission of the attempts and the detection of their start
+        return [attempt['startTime'] - attempt['submissionTime'] for attempt in self.attempts if attempt['startTime'] is not None and (runnerName is None or attempt['runnerName'] == runnerName)]
+
+
+    def getRunTimes(self):
+        # Execution time of the successful attempts
+        return [attempt['endTime'] - attempt['startTime'] for attempt in self.attempts if attempt['startTime'] is not None and attempt['outcome'] == 'COMPLETED']
+
+
+    @staticmethod
+    def getDistributionSummary(values):
+        # Returns the minimum, the main percentiles (nearest rank) and the maximum of the values - OR - None when there is no value
+        if len(values) == 0:
+            return None
+
+        sortedValues = sorted(values)
+        distributionSummary = OrderedDict()
+
+        distributionSummary['min'] = sortedValues[0]
+        for percentile in [50, 90, 99]:
+            distributionSummary["p%d" % percentile] = sortedValues[min(len(sortedValues) - 1, max(0, (percentile * len(sortedValues) + 99) / 100 - 1))]
+        distributionSummary['max'] = sortedValues[-1]
+        distributionSummary['mean'] = sum(sortedValues) / float(len(sortedValues))
+
+        return distributionSummary
+
+
+    ###################################
+    ##  Time series related methods  ##
+    ###################################
+    def getIntervalStartTime(self, eventTime):
+        return eventTime - eventTime % self.intervalLength
+
+
+    def computeThroughput(self):
+        # Returns the number of completed instances and of analyzed bases (sum of the chunk sizes) for each interval
+        # Initializations
+        throughput = OrderedDict()
+
+        if self.firstEventTime is None:
+            return throughput
+
+        intervalStartTime = self.getIntervalStartTime(self.firstEventTime)
+        while intervalStartTime <= self.lastEventTime:
+            throughput[intervalStartTime] = {'nbCompletedInstances': 0, 'nbAnalyzedBases': 0}
+            intervalStartTime += self.intervalLength
+
+        for attempt in self.attempts:
+            if attempt['outcome'] == 'COMPLETED':
+                throughput[self.getIntervalStartTime(attempt['endTime'])]['nbCompletedInstances'] += 1
+                throughput[self.getIntervalStartTime(attempt['endTime'])]['nbAnalyzedBases'] += int(self.chunkSizes.get(attempt['instanceId'], 0))
+
+        return throughput
+
+
+    def computeConcurrency(self):
+        # Returns the mean and maximum numbers of running and queued (submitted but not started) attempts for each interval
+        # Initializations
+        concurrency = OrderedDict()
+        levelChanges = list()
+        currentLevels = {'running': 0, 'queued': 0}
+
+        if self.firstEventTime is None:
+            return concurrency
+
+        # Changes of the number of running/queued attempts (the decreases are applied first when several changes happen at the same time)
+        for attempt in self.attempts:
+            if attempt['startTime'] is not None:
+                levelChanges.extend([(attempt['submissionTime'], 'queued', 1), (attempt['startTime'], 'queued', -1), (attempt['startTime'], 'running', 1), (self.getAttemptEndTime(attempt), 'running', -1)])
+            else:
+                levelChanges.extend([(attempt['submissionTime'], 'queued', 1), (self.getAttemptEndTime(attempt), 'queued', -1)])
+
+        levelChanges.sort(key = lambda levelChange: (levelChange[0], levelChange[2]))
+
+        intervalStartTime = self.getIntervalStartTime(self.firstEventTime)
+        while intervalStartTime <= self.lastEventTime:
+            concurrency[intervalStartTime] = {'meanRunning': 0.0, 'maxRunning': 0, 'meanQueued': 0.0, 'maxQueued': 0}
+            intervalStartTime += self.intervalLength
+
+        # The levels are integrated over time (the area under the curve divided by the length of the interval gives the mean level)
+        previousTime = self.firstEventTime
+        for changeTime, levelName, levelDelta in levelChanges + [(self.lastEventTime, None, 0)]:
+            while previousTime < changeTime:
+                intervalStartTime = self.getIntervalStartTime(previousTime)
+                intervalEndTime = min(intervalStartTime + self.intervalLength, changeTime)
+
+                concurrency[intervalStartTime]['meanRunning'] += currentLevels['running'] * (intervalEndTime - previousTime) / float(self.intervalLength)
+                concurrency[intervalStartTime]['meanQueued'] += currentLevels['queued'] * (intervalEndTime - previousTime) / float(self.intervalLength)
+                concurrency[intervalStartTime]['maxRunning'] = max(concurrency[intervalStartTime]['maxRunning'], currentLevels['running'])
+                concurrency[intervalStartTime]['maxQueued'] = max(concurrency[intervalStartTime]['maxQueued'], currentLevels['queued'])
+
+                previousTime = intervalEndTime
+
+            if levelName is not None:
+                currentLevels[levelName] += levelDelta
+
+        return concurrency
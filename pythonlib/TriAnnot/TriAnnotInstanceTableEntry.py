@@ -6,12 +6,12 @@ from TriAnnot.TriAnnotStatus import *
 
 class TriAnnotInstanceTableEntry (object):
 
+    # Logger (shared by all the objects: one object is created for each chunk of the fasta input file)
+    logger = logging.getLogger("TriAnnot.TriAnnotAnalysis")
+    logger.addHandler(logging.NullHandler())
+
     # Constructor
     def __init__(self, sequenceName = "", sequenceType = "", sequenceStartOffset = 0, sequenceEndOffset = 0, sequenceSize = 0):
-        # Logger
-        self.logger = logging.getLogger("TriAnnot.TriAnnotAnalysis")
-        self.logger.addHandler(logging.NullHandler())
-
         #self.logger.debug("Creating a new %s object" % (self.__class__.__name__))
 
         # Attributes
@@ -37,18 +37,12 @@ class TriAnnotInstanceTableEntry (object):
         self.instanceDirectoryFullPath = None
         self.instanceDirectorySize = 0
         self.instanceJobIdentifier = None
+        self.instanceArrayTaskIndex = None
         self.instanceMonitoringCommand = None
         self.instanceKillCommand = None
         self.instanceBackupArchive = None
 
 
     def convertToDict(self):
-        # Initializations
-        cleanDict = dict()
-
-        for attributeName in dir(self):
-            attributeValue = getattr(self, attributeName)
-            if not attributeName.startswith('__') and not callable(attributeValue) and not attributeName == 'logger':
-                cleanDict[attributeName] = attributeValue
-
-        return cleanDict
+        # Only the attributes of the object itself are columns of the Instances table
+        return dict(self.__dict__)
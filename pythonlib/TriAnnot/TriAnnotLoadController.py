@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+import time
+import logging
+
+from TriAnnot.TriAnnotConfig import *
+
+class TriAnnotLoadController (object):
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self, initialMaxParallelAnalysis):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotLoadController")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        # Note: the value of the --maxinstance argument is used as a starting point
+        # The adjustment is disabled by default because it can exceed the value of the --maxinstance argument (ie. a limit explicitly requested by the user)
+        self.initialMaxParallelAnalysis = int(initialMaxParallelAnalysis)
+        self.dynamicParallelAnalysis = False
+        self.minimumParallelAnalysis = 1
+        self.maximumParallelAnalysis = self.initialMaxParallelAnalysis * 4
+        self.targetNumberOfPendingJobs = 5
+        self.adjustmentInterval = 120.0
+
+        self.loadSettings()
+
+        # Current state of the controller
+        self.currentMaxParallelAnalysis = self.initialMaxParallelAnalysis
+        self.lastAdjustmentTime = None
+        self.lastQueueLoad = None
+
+
+    def loadSettings(self):
+        if TriAnnotConfig.isConfigValueDefined('Global|dynamicParallelAnalysis'):
+            self.dynamicParallelAnalysis = TriAnnotConfig.getConfigValue('Global|dynamicParallelAnalysis').lower() == 'yes'
+
+        if TriAnnotConfig.isConfigValueDefined('Global|minimumParallelAnalysis'):
+            self.minimumParallelAnalysis = max(int(TriAnnotConfig.getConfigValue('Global|minimumParallelAnalysis')), 1)
+
+        if TriAnnotConfig.isConfigValueDefined('Global|maximumParallelAnalysisFactor'):
+            self.maximumParallelAnalysis = int(self.initialMaxParallelAnalysis * float(TriAnnotConfig.getConfigValue('Global|maximumParallelAnalysisFactor')))
+
+        if TriAnnotConfig.isConfigValueDefined('Global|targetNumberOfPendingJobs'):
+            self.targetNumberOfPendingJobs = int(TriAnnotConfig.getConfigValue('Global|targetNumberOfPendingJobs'))
+
+        if TriAnnotConfig.isConfigValueDefined('Global|parallelAnalysisAdjustmentInterval'):
+            self.adjustmentInterval = float(TriAnnotConfig.getConfigValue('Global|parallelAnalysisAdjustmentInterval'))
+
+        # The initial value must always be reachable
+        self.minimumParallelAnalysis = min(self.minimumParallelAnalysis, self.initialMaxParallelAnalysis)
+        self.maximumParallelAnalysis = max(self.maximumParallelAnalysis, self.initialMaxParallelAnalysis)
+
+
+    def getControllerDescription(self):
+        if not self.dynamicParallelAnalysis:
+            return "%d (static)" % self.initialMaxParallelAnalysis
+
+        return "between %d and %d depending on the load of the cluster (initial value: %d)" % (self.minimumParallelAnalysis, self.maximumParallelAnalysis, self.initialMaxParallelAnalysis)
+
+
+    ##################################
+    ##  Value computation methods  ##
+    ##################################
+    def getMaxParallelAnalysis(self, runner, nbRunningInstances):
+        # Nothing to do when the feature is disabled or when there is no runner to question
+        if not self.dynamicParallelAnalysis or runner is None:
+            return self.currentMaxParallelAnalysis
+
+        # The value is adjusted at most once per adjustment interval so that the effect of the previous adjustment can be observed
+        if self.lastAdjustmentTime is not None and time.time() - self.lastAdjustmentTime < self.adjustmentInterval:
+            return self.currentMaxParallelAnalysis
+
+        self.lastAdjustmentTime = time.time()
+
+        # Runners that can't describe the load of their queue (Ex: Local) keep the initial value
+        self.lastQueueLoad = runner.getQueueLoad()
+        if self.lastQueueLoad is None:
+            return self.currentMaxParallelAnalysis
+
+        newMaxParallelAnalysis = self.computeNewMaxParallelAnalysis(self.lastQueueLoad, nbRunningInstances)
+
+        if newMaxParallelAnalysis != self.currentMaxParallelAnalysis:
+            self.logger.info("The maximum number of simultaneous analysis has been adjusted from <%d> to <%d> (Jobs of the current user in the %s queue: %d pending (%d blocked by a limit) / %d running)" % (self.currentMaxParallelAnalysis, newMaxParallelAnalysis, runner.runnerType, self.lastQueueLoad['nbPendingJobs'], self.lastQueueLoad['nbLimitedJobs'], self.lastQueueLoad['nbRunningJobs']))
+            self.currentMaxParallelAnalysis = newMaxParallelAnalysis
+
+        return self.currentMaxParallelAnalysis
+
+
+    def computeNewMaxParallelAnalysis(self, queueLoad, nbRunningInstances):
+        # A user/account limit has been reached: additional jobs would only wait in the queue
+        if queueLoad['nbLimitedJobs'] > 0:
+            return max(self.minimumParallelAnalysis, min(self.currentMaxParallelAnalysis, nbRunningInstances))
+
+        # Too many jobs are waiting for resources: multiplicative decrease
+        if queueLoad['nbPendingJobs'] > self.targetNumberOfPendingJobs:
+            return max(self.minimumParallelAnalysis, int(self.currentMaxParallelAnalysis * 0.75))
+
+        # Nothing is waiting while the current limit is reached: additive increase
+        if queueLoad['nbPendingJobs'] == 0 and nbRunningInstances >= self.currentMaxParallelAnalysis:
+            return min(self.maximumParallelAnalysis, self.currentMaxParallelAnalysis + max(1, self.currentMaxParallelAnalysis / 4))
+
+        return self.currentMaxParallelAnalysis
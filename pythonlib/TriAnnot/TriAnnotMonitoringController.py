@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+
+import logging
+
+from TriAnnot.TriAnnotConfig import *
+
+class TriAnnotMonitoringController (object):
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self, baseInterval):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotMonitoringController")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        # Note: the base interval is the monitoring interval of the runner (ie. the constant interval used when the adaptive monitoring is disabled)
+        self.baseInterval = float(baseInterval)
+        self.adaptiveMonitoring = True
+        self.minimumInterval = min(2.0, self.baseInterval)
+        self.maximumInterval = self.baseInterval * 4
+        self.backoffFactor = 1.5
+        self.idleCyclesBeforeBackoff = 3
+
+        self.loadSettings()
+
+        # Current state of the controller
+        self.currentInterval = self.baseInterval
+        self.lastInterval = None
+        self.nbIdleCycles = 0
+
+        # Average duration of the already finished jobs (Key = job category / Value = [number of jobs, sum of durations in seconds])
+        self.jobDurations = dict()
+
+        # Statistics
+        self.nbCycles = 0
+        self.totalWaitingTime = 0.0
+        self.shortestInterval = None
+        self.longestInterval = None
+
+
+    def loadSettings(self):
+        if TriAnnotConfig.isConfigValueDefined('Global|adaptiveMonitoring'):
+            self.adaptiveMonitoring = TriAnnotConfig.getConfigValue('Global|adaptiveMonitoring').lower() == 'yes'
+
+        if TriAnnotConfig.isConfigValueDefined('Global|minimumMonitoringInterval'):
+            self.minimumInterval = min(float(TriAnnotConfig.getConfigValue('Global|minimumMonitoringInterval')), self.baseInterval)
+
+        if TriAnnotConfig.isConfigValueDefined('Global|maximumMonitoringIntervalFactor'):
+            self.maximumInterval = max(self.baseInterval * float(TriAnnotConfig.getConfigValue('Global|maximumMonitoringIntervalFactor')), self.baseInterval)
+
+        if TriAnnotConfig.isConfigValueDefined('Global|monitoringBackoffFactor'):
+            self.backoffFactor = max(float(TriAnnotConfig.getConfigValue('Global|monitoringBackoffFactor')), 1.0)
+
+        if TriAnnotConfig.isConfigValueDefined('Global|idleCyclesBeforeBackoff'):
+            self.idleCyclesBeforeBackoff = int(TriAnnotConfig.getConfigValue('Global|idleCyclesBeforeBackoff'))
+
+
+    def getControllerDescription(self):
+        if not self.adaptiveMonitoring:
+            return "every %s second(s)" % self.baseInterval
+
+        return "every %s to %s second(s) depending on the activity (base interval: %s second(s))" % (self.minimumInterval, self.maximumInterval, self.baseInterval)
+
+
+    ###################################
+    ##  Interval computation methods ##
+    ###################################
+    def getNextInterval(self, activityDetected, expectedRemainingTimes = None):
+        # Constant interval when the adaptive monitoring is disabled
+        if not self.adaptiveMonitoring:
+            return self.registerInterval(self.baseInterval)
+
+        # Something has just changed (submission, completion, etc.): poll fast since other changes usually follow
+        if activityDetected:
+            self.nbIdleCycles = 0
+            nextInterval = self.minimumInterval
+
+        # Nothing has changed: come back progressively to the base interval and exceed it after several idle cycles
+        else:
+            self.nbIdleCycles += 1
+            if self.nbIdleCycles > self.idleCyclesBeforeBackoff:
+                nextInterval = min(self.currentInterval * self.backoffFactor, self.maximumInterval)
+            else:
+                nextInterval = min(self.currentInterval * self.backoffFactor, max(self.baseInterval, self.currentInterval))
+
+        self.currentInterval = nextInterval
+
+        # Do not sleep (much) longer than the expected remaining time of the job that should end first
+        # Note: the jobs that already run longer than expected are ignored (they follow the normal backoff instead of forcing the minimum interval until they end)
+        expectedRemainingTimes = [expectedRemainingTime for expectedRemainingTime in (expectedRemainingTimes or list()) if expectedRemainingTime is not None and expectedRemainingTime > 0]
+        if expectedRemainingTimes:
+            nextInterval = min(nextInterval, max(min(expectedRemainingTimes), self.minimumInterval))
+
+        return self.registerInterval(nextInterval)
+
+
+    def registerInterval(self, effectiveInterval):
+        if effectiveInterval != self.lastInterval:
+            self.logger.debug("Effective monitoring interval: %.1f second(s)" % effectiveInterval)
+
+        self.nbCycles += 1
+        self.totalWaitingTime += effectiveInterval
+        self.lastInterval = effectiveInterval
+        self.shortestInterval = effectiveInterval if self.shortestInterval is None else min(self.shortestInterval, effectiveInterval)
+        self.longestInterval = effectiveInterval if self.longestInterval is None else max(self.longestInterval, effectiveInterval)
+
+        return effectiveInterval
+
+
+    ############################################
+    ##  Historical job duration based methods ##
+    ############################################
+    def recordJobDuration(self, jobCategory, duration):
+        if duration is None or duration < 0:
+            return
+
+        categoryDurations = self.jobDurations.setdefault(jobCategory, [0, 0.0])
+        categoryDurations[0] += 1
+        categoryDurations[1] += duration
+
+
+    def getExpectedRemainingTime(self, jobCategory, elapsedTime):
+        # Returns None when there is no finished job in the given category or when the job already runs longer than the average duration
+        if not self.jobDurations.has_key(jobCategory):
+            return None
+
+        nbJobs, sumOfDurations = self.jobDurations[jobCategory]
+        expectedRemainingTime = sumOfDurations / nbJobs - elapsedTime
+
+        if expectedRemainingTime <= 0:
+            return None
+
+        return expectedRemainingTime
+
+
+    ##########################
+    ##  Statistics methods  ##
+    ##########################
+    def getStatistics(self):
+        averageInterval = self.totalWaitingTime / self.nbCycles if self.nbCycles > 0 else self.baseInterval
+
+        return {'nbCycles': self.nbCycles, 'averageInterval': averageInterval, 'shortestInterval': self.shortestInterval, 'longestInterval': self.longestInterval}
+
+
+    def getStatisticsAsStrings(self):
+        # Used to write the statistics as XML attributes
+        statistics = self.getStatistics()
+
+        return dict([(statisticName, "%.1f" % statisticValue if isinstance(statisticValue, float) else str(statisticValue)) for statisticName, statisticValue in statistics.items()])
+
+
+    def getStatisticsAsString(self):
+        statistics = self.getStatistics()
+
+        if statistics['nbCycles'] == 0:
+            return 'no monitoring cycle'
+
+        return "%d monitoring cycles - Average interval: %.1fs (min: %.1fs / max: %.1fs)" % (statistics['nbCycles'], statistics['averageInterval'], statistics['shortestInterval'], statistics['longestInterval'])
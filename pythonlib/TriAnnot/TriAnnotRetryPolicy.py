@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+
+import os
+import time
+import shutil
+import logging
+from multiprocessing.pool import ThreadPool
+
+from TriAnnot.TriAnnotConfig import *
+
+class TriAnnotRetryPolicy (object):
+
+    # Static class variables
+    # Possible error classes (see the setErrorStatus method of TriAnnotInstance):
+    #   - lostJob: the job of the instance has disappeared (crashed node, job killed by the scheduler, etc.)
+    #   - monitoring: the job of the instance could not be monitored too many times
+    #   - submission: the job of the instance could not be submitted
+    #   - fileSystem: the TriAnnot_progress/TriAnnot_finished files could not be read (NFS hiccups, full disk, etc.)
+    #   - execution: TriAnnotUnit has exited with the ERROR status (ie. at least one task has failed)
+    #   - unknown: any other error
+    errorClasses = ['lostJob', 'monitoring', 'submission', 'fileSystem', 'execution', 'unknown']
+    defaultMaximumRetries = {'lostJob': 3, 'monitoring': 2, 'submission': 2, 'fileSystem': 3, 'execution': 1, 'unknown': 0}
+
+    # Errors that are related to the runner itself (and that might be avoided with the fallback runner)
+    runnerRelatedErrorClasses = ['lostJob', 'monitoring', 'submission']
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotRetryPolicy")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        self.automaticRetry = True
+        self.maximumRetries = dict(TriAnnotRetryPolicy.defaultMaximumRetries)
+        self.retryBackoffBase = 60.0
+        self.retryBackoffFactor = 2.0
+        self.maximumRetryBackoff = 3600.0
+        self.retryWithFallbackRunner = False
+
+        self.loadSettings()
+
+        # Number of retries of each instance for each error class (Key = instance identifier / Value = dict)
+        self.retriesByInstance = dict()
+
+        # Instances waiting for the end of their backoff delay (Key = instance identifier / Value = time of the next submission)
+        self.delayedInstances = dict()
+
+        # Background compression of the quarantined execution folders (Key = archive full path / Value = AsyncResult object)
+        self.compressionPool = None
+        self.pendingCompressions = dict()
+
+        # Statistics
+        self.nbRetries = 0
+
+
+    def loadSettings(self):
+        if TriAnnotConfig.isConfigValueDefined('Global|automaticRetry'):
+            self.automaticRetry = TriAnnotConfig.getConfigValue('Global|automaticRetry').lower() == 'yes'
+
+        for errorClass in TriAnnotRetryPolicy.errorClasses:
+            if TriAnnotConfig.isConfigValueDefined("Global|maximumRetriesByErrorClass|%s" % errorClass):
+                self.maximumRetries[errorClass] = int(TriAnnotConfig.getConfigValue("Global|maximumRetriesByErrorClass|%s" % errorClass))
+
+        if TriAnnotConfig.isConfigValueDefined('Global|retryBackoffBase'):
+            self.retryBackoffBase = float(TriAnnotConfig.getConfigValue('Global|retryBackoffBase'))
+
+        if TriAnnotConfig.isConfigValueDefined('Global|retryBackoffFactor'):
+            self.retryBackoffFactor = max(float(TriAnnotConfig.getConfigValue('Global|retryBackoffFactor')), 1.0)
+
+        if TriAnnotConfig.isConfigValueDefined('Global|maximumRetryBackoff'):
+            self.maximumRetryBackoff = float(TriAnnotConfig.getConfigValue('Global|maximumRetryBackoff'))
+
+        if TriAnnotConfig.isConfigValueDefined('Global|retryWithFallbackRunner'):
+            self.retryWithFallbackRunner = TriAnnotConfig.getConfigValue('Global|retryWithFallbackRunner').lower() == 'yes'
+
+
+    def getPolicyDescription(self):
+        if not self.automaticRetry:
+            return "disabled"
+
+        return "%s - Backoff: %s second(s) multiplied by %s after each retry (max: %s second(s))" % (', '.join(["%s: %d" % (errorClass, self.maximumRetries[errorClass]) for errorClass in TriAnnotRetryPolicy.errorClasses]), self.retryBackoffBase, self.retryBackoffFactor, self.maximumRetryBackoff)
+
+
+    ########################
+    ##  Decision methods  ##
+    ########################
+    def registerRetry(self, instanceId, errorClass):
+        # Returns the delay (in seconds) before the next submission of the instance or None if the instance must not be retried
+        if not self.automaticRetry:
+            return None
+
+        if errorClass not in TriAnnotRetryPolicy.errorClasses:
+            errorClass = 'unknown'
+
+        instanceRetries = self.retriesByInstance.setdefault(instanceId, dict())
+        if instanceRetries.get(errorClass, 0) >= self.maximumRetries[errorClass]:
+            return None
+
+        instanceRetries[errorClass] = instanceRetries.get(errorClass, 0) + 1
+        self.nbRetries += 1
+
+        # Exponential backoff based on the total number of retries of the instance
+        retryDelay = min(self.retryBackoffBase * self.retryBackoffFactor ** (sum(instanceRetries.values()) - 1), self.maximumRetryBackoff)
+        self.delayedInstances[instanceId] = time.time() + retryDelay
+
+        return retryDelay
+
+
+    def getNumberOfRetries(self, instanceId):
+        return sum(self.retriesByInstance.get(instanceId, dict()).values())
+
+
+    def needFallbackRunner(self, errorClass):
+        return self.retryWithFallbackRunner and errorClass in TriAnnotRetryPolicy.runnerRelatedErrorClasses
+
+
+    def popInstancesReadyForRetry(self):
+        # Initializations
+        currentTime = time.time()
+        readyInstanceIds = [instanceId for instanceId, nextSubmissionTime in self.delayedInstances.items() if nextSubmissionTime <= currentTime]
+
+        for instanceId in readyInstanceIds:
+            self.delayedInstances.pop(instanceId)
+
+        return sorted(readyInstanceIds)
+
+
+    ##########################
+    ##  Quarantine methods  ##
+    ##########################
+    def quarantineDirectory(self, directoryFullPath, quarantineSuffix):
+        # Returns the full path of the (future) archive of the quarantined directory
+        # Note: the rename is immediate, the compression is done in background so that the instance can be submitted again without waiting
+        quarantineDirectoryFullPath = directoryFullPath + quarantineSuffix
+        archiveFullPath = quarantineDirectoryFullPath + '.zip'
+
+        if Utils.isExistingDirectory(quarantineDirectoryFullPath):
+            shutil.rmtree(quarantineDirectoryFullPath)
+        if Utils.isExistingFile(archiveFullPath):
+            os.remove(archiveFullPath)
+
+        os.rename(directoryFullPath, quarantineDirectoryFullPath)
+
+        if self.compressionPool is None:
+            self.compressionPool = ThreadPool(1)
+
+        self.pendingCompressions[archiveFullPath] = self.compressionPool.apply_async(TriAnnotRetryPolicy.compressQuarantinedDirectory, (quarantineDirectoryFullPath, archiveFullPath))
+
+        return archiveFullPath
+
+
+    def waitForCompression(self, archiveFullPath):
+        if not self.pendingCompressions.has_key(archiveFullPath):
+            return
+
+        try:
+            self.pendingCompressions.pop(archiveFullPath).get()
+        except Exception as ex:
+            self.logger.warning("The following quarantined execution folder could not be compressed: %s (%s)" % (archiveFullPath, ex))
+
+
+    def close(self):
+        # Wait for the end of the compressions in progress
+        for archiveFullPath in self.pendingCompressions.keys():
+            self.waitForCompression(archiveFullPath)
+
+        if self.compressionPool is not None:
+            self.compressionPool.close()
+            self.compressionPool.join()
+            self.compressionPool = None
+
+
+    ######################
+    ##  Static methods  ##
+    ######################
+    @staticmethod
+    def compressQuarantinedDirectory(quarantineDirectoryFullPath, archiveFullPath):
+        Utils.createDirectoryBackup(quarantineDirectoryFullPath, archiveFullPath)
+        shutil.rmtree(quarantineDirectoryFullPath)
@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 
 import os
+import time
+import getpass
 import logging
 import subprocess, shlex
 
@@ -8,6 +10,10 @@ from TriAnnot.TriAnnotConfig import *
 
 class TriAnnotRunner (object):
 
+    # Static class variables
+    # Snapshots of the status of all the jobs of the current user (Key = runner type / Value = dict with the creation time of the snapshot, the job status by job identifier and the columns of each line of the snapshot)
+    jobStatusSnapshots = dict()
+
     # Constructor
     def __init__(self, runnertype, jobType, instanceOrTaskObject):
         # Logger
@@ -30,6 +36,22 @@ class TriAnnotRunner (object):
         self.monitoringCommandPattern = None;
         self.killCommandPattern = None;
 
+        # Optional command used to collect the status of all jobs in a single request to the scheduler
+        self.bulkMonitoringCommandPattern = None
+        if TriAnnotConfig.isConfigValueDefined("Runners|%s|bulkMonitoringCommandPattern" % self.runnerType):
+            self.bulkMonitoringCommandPattern = TriAnnotConfig.TRIANNOT_CONF['Runners'][self.runnerType]['bulkMonitoringCommandPattern']
+        self.userName = getpass.getuser()
+
+        # Optional array job submission (ie. several jobs submitted at once with a single submission command)
+        # Note: the name of the environment variable that stores the index of the array task must be defined by the specialized runners that support array jobs
+        self.arrayTaskIdentifierVariable = None
+        self.arrayJobSubmission = 'no'
+        if TriAnnotConfig.isConfigValueDefined("Runners|%s|arrayJobSubmission" % self.runnerType):
+            self.arrayJobSubmission = TriAnnotConfig.TRIANNOT_CONF['Runners'][self.runnerType]['arrayJobSubmission']
+        self.maximumArrayJobSize = 1000
+        if TriAnnotConfig.isConfigValueDefined("Runners|%s|maximumArrayJobSize" % self.runnerType):
+            self.maximumArrayJobSize = int(TriAnnotConfig.TRIANNOT_CONF['Runners'][self.runnerType]['maximumArrayJobSize'])
+
         self.defaultNumberOfThread = TriAnnotConfig.TRIANNOT_CONF['Runners'][self.runnerType]['defaultNumberOfThread'];
         self.maximumNumberOfThreadByTool = TriAnnotConfig.TRIANNOT_CONF['Runners'][self.runnerType]['maximumNumberOfThreadByTool'];
 
@@ -65,10 +87,14 @@ class TriAnnotRunner (object):
         raise NotImplementedError('No isCompatibleWithCurrentTool method implemented for runner %s' % (self.runnerType))
 
 
-    def submitJob(self, job):
+    def submitJob(self, jobName, wrapperFileFullPath, nbArrayTasks = None):
         raise NotImplementedError('No submitJob method implemented for runner %s' % (self.runnerType))
 
 
+    def getArrayTaskJobIdentifier(self, arrayJobIdentifier, arrayTaskIndex):
+        raise NotImplementedError('No getArrayTaskJobIdentifier method implemented for runner %s' % (self.runnerType))
+
+
     def isStillAlive(self):
         raise NotImplementedError('No isStillAlive method implemented for runner %s' % (self.runnerType))
 
@@ -81,6 +107,11 @@ class TriAnnotRunner (object):
         raise NotImplementedError('No triggerEventsAfterJobCompletion method implemented for runner %s' % (self.runnerType))
 
 
+    def getQueueLoad(self):
+        # Runners that can't describe the load of their queue (ie. number of pending/running jobs of the current user) return None
+        return None
+
+
     # Common methods
     def getRunnerName(self):
         return self.runnerType
@@ -90,6 +121,147 @@ class TriAnnotRunner (object):
         self.monitoringInterval = newInterval
 
 
+    def isArrayJobSubmissionEnabled(self):
+        return self.arrayTaskIdentifierVariable is not None and self.arrayJobSubmission.lower() == 'yes'
+
+
+    def setArrayTaskJobIdentifier(self, arrayJobIdentifier, arrayTaskIndex):
+        # Each task of an array job is monitored and killed on its own (ie. with its own job identifier)
+        self.jobid = self.getArrayTaskJobIdentifier(arrayJobIdentifier, arrayTaskIndex)
+
+        # Replace keywords by values in the monitoring and kill commands
+        self.monitoringCommand = self.replaceKeywordsInCommandPattern(self.monitoringCommandPattern, "monitoring")
+        self.killCommand = self.replaceKeywordsInCommandPattern(self.killCommandPattern, "kill")
+
+        self.logger.debug("Monitoring command of array task <%d> after keyword replacement: %s" % (arrayTaskIndex, self.monitoringCommand))
+        self.logger.debug("Kill command of array task <%d> after keyword replacement: %s" % (arrayTaskIndex, self.killCommand))
+
+
+    def expandArrayTaskRanges(self, arrayTaskRanges):
+        # Returns the indexes of the array tasks described by a list of ranges (Ex: 1-10:2,15 - A maximum number of simultaneous tasks such as %4 is ignored)
+        # Initializations
+        arrayTaskIndexes = list()
+
+        for arrayTaskRange in arrayTaskRanges.split('%')[0].split(','):
+            rangeMatch = re.match(r'^(\d+)(?:-(\d+)(?::(\d+))?)?$', arrayTaskRange)
+            if rangeMatch is None:
+                continue
+
+            firstIndex = int(rangeMatch.group(1))
+            lastIndex = int(rangeMatch.group(2)) if rangeMatch.group(2) is not None else firstIndex
+            indexStep = int(rangeMatch.group(3)) if rangeMatch.group(3) is not None else 1
+            arrayTaskIndexes.extend(range(firstIndex, lastIndex + 1, max(indexStep, 1)))
+
+        return arrayTaskIndexes
+
+
+    def isStillAliveAccordingToSnapshot(self):
+        # A job listed in the shared snapshot is alive
+        # A job which is not listed might be finished or might have been submitted after the creation of the snapshot, so the regular monitoring command must be used to get a reliable answer
+        jobStatusSnapshot = self.getJobStatusSnapshot()
+
+        if jobStatusSnapshot is None or self.jobid is None or not jobStatusSnapshot.has_key(str(self.jobid)):
+            return False
+
+        self.jobObject._cptFailedCheckStillAlive = 0
+        self.logger.debug("%s job for %s (jobid: %s) is still alive (Status in snapshot: %s)" % (self.runnerType, self.jobObject.getDescriptionString(), self.jobid, jobStatusSnapshot[str(self.jobid)]))
+        return True
+
+
+    def getJobStatusSnapshot(self):
+        if self.bulkMonitoringCommandPattern is None:
+            return None
+
+        # The snapshot is shared by all runner objects of the same type and refreshed at most once per monitoring interval
+        jobStatusSnapshot = TriAnnotRunner.jobStatusSnapshots.get(self.runnerType)
+
+        if jobStatusSnapshot is None or time.time() - jobStatusSnapshot['creationTime'] > float(self.monitoringInterval):
+            jobs, jobLines = self.collectJobStatusSnapshot()
+            jobStatusSnapshot = {'creationTime': time.time(), 'jobs': jobs, 'jobLines': jobLines}
+            TriAnnotRunner.jobStatusSnapshots[self.runnerType] = jobStatusSnapshot
+
+        return jobStatusSnapshot['jobs']
+
+
+    def getJobStatusSnapshotLines(self):
+        if self.getJobStatusSnapshot() is None:
+            return None
+
+        return TriAnnotRunner.jobStatusSnapshots[self.runnerType]['jobLines']
+
+
+    def summarizeJobStatusSnapshot(self, stateColumnIndex, pendingStates, reasonColumnIndex = None, limitReasonPattern = None):
+        # Initializations
+        jobLines = self.getJobStatusSnapshotLines()
+
+        if jobLines is None:
+            return None
+
+        # Count the pending and running jobs of the current user (pending jobs blocked by a user/account limit are counted separately)
+        queueLoad = {'nbPendingJobs': 0, 'nbRunningJobs': 0, 'nbLimitedJobs': 0}
+
+        for fields in jobLines:
+            if len(fields) <= stateColumnIndex:
+                continue
+
+            nbJobs = self.countJobsInSnapshotLine(fields)
+
+            if fields[stateColumnIndex] in pendingStates:
+                queueLoad['nbPendingJobs'] += nbJobs
+                if reasonColumnIndex is not None and len(fields) > reasonColumnIndex and re.search(limitReasonPattern, fields[reasonColumnIndex]):
+                    queueLoad['nbLimitedJobs'] += nbJobs
+            else:
+                queueLoad['nbRunningJobs'] += nbJobs
+
+        return queueLoad
+
+
+    def countJobsInSnapshotLine(self, fields):
+        # Pending array jobs might be described by a single line
+        return 1
+
+
+    def getJobIdentifiersInSnapshotLine(self, fields):
+        # The server name is removed from Torque/PBS job identifiers (Ex: 1234.server or 1234[5].server for an array task)
+        # Note: runners that support array jobs must also return the identifier of each array task described by the line
+        return [fields[0].split('.')[0]]
+
+
+    def collectJobStatusSnapshot(self):
+        # Initializations
+        jobs = dict()
+        jobLines = list()
+        bulkMonitoringCommand = self.replaceKeywordsInCommandPattern(self.bulkMonitoringCommandPattern, "bulk monitoring")
+
+        # Effective execution of the bulk monitoring command
+        try:
+            bulkMonitoringProcess = subprocess.Popen(shlex.split(bulkMonitoringCommand), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            bulkMonitoringResult = bulkMonitoringProcess.communicate()[0]
+        except:
+            self.logger.debug(traceback.format_exc())
+            self.logger.warning("Failed to collect the status of all %s jobs with the following command: %s" % (self.runnerType, bulkMonitoringCommand))
+            return (None, None)
+
+        if bulkMonitoringProcess.returncode != 0:
+            self.logger.warning("The following %s bulk monitoring command has exited with a non-zero status (%s): %s" % (self.runnerType, bulkMonitoringProcess.returncode, bulkMonitoringCommand))
+            return (None, None)
+
+        # The first column must be the job identifier and the (optional) second column the job status (header lines are ignored)
+        for line in bulkMonitoringResult.split("\n"):
+            fields = line.split()
+            if len(fields) == 0 or not fields[0][0].isdigit():
+                continue
+
+            jobStatus = fields[1] if len(fields) > 1 else 'listed'
+            for jobIdentifier in self.getJobIdentifiersInSnapshotLine(fields):
+                jobs[jobIdentifier] = jobStatus
+            jobLines.append(fields)
+
+        self.logger.debug("Status of <%d> %s jobs collected with the following command: %s" % (len(jobs), self.runnerType, bulkMonitoringCommand))
+
+        return (jobs, jobLines)
+
+
     def checkCommandPatternForUnsupportedKeywords(self, commandPattern, patternType):
         # Build regexp pattern
         regexpPattern = re.compile(r'{(\w+)}', re.IGNORECASE)
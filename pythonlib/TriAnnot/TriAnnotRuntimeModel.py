@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+
+import os
+import re
+import logging
+from collections import OrderedDict
+
+# XML parsing module
+import xml.etree.cElementTree as etree
+
+from TriAnnot.TriAnnotConfig import *
+from TriAnnot.TriAnnotVersion import TRIANNOT_VERSION
+
+class TriAnnotRuntimeModel (object):
+
+    # Static class variables
+    # Only the most recent analyses are kept so that the model follows the evolution of the tools/databases/hardware
+    maximumNumberOfLearnedAnalyses = 50
+    statisticNames = ['nbSamples', 'sumSize', 'sumSizeSquare', 'sumDuration', 'sumSizeDuration', 'sumDiskUsage', 'sumSizeDiskUsage']
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self, modelsFileFullPath, taskFileChecksum, taskFileDescription = ''):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotRuntimeModel")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        # Note: a model is built for each step/task file (identified by the checksum of the global step/task file) since the cost of a chunk depends mostly on the executed tasks
+        self.modelsFileFullPath = modelsFileFullPath
+        self.taskFileChecksum = taskFileChecksum
+        self.taskFileDescription = taskFileDescription
+
+        # Statistics of each learned analysis (Key = analysis identifier / Value = dict of statistics - Sizes are in Mb, durations in seconds and disk usages in bytes)
+        self.learnedAnalyses = OrderedDict()
+
+        # Models of the other step/task files (kept as is when the models file is rewritten)
+        self.otherModelElements = list()
+
+        # Aggregated statistics (computed on demand)
+        self._aggregatedStatistics = None
+
+
+    ##################################
+    ##  Models file related methods ##
+    ##################################
+    def loadModels(self):
+        # Nothing to load for the first analysis
+        if not Utils.isExistingFile(self.modelsFileFullPath):
+            return
+
+        try:
+            modelsRoot = etree.parse(self.modelsFileFullPath).getroot()
+        except Exception as ex:
+            self.logger.warning("The following runtime models file is invalid and will be ignored: %s (%s)" % (self.modelsFileFullPath, ex))
+            return
+
+        for modelElement in modelsRoot.findall('model'):
+            if modelElement.get('task_file_checksum') != self.taskFileChecksum:
+                self.otherModelElements.append(modelElement)
+                continue
+
+            for analysisElement in modelElement.findall('analysis'):
+                analysisStatistics = dict()
+                for statisticName in TriAnnotRuntimeModel.statisticNames:
+                    analysisStatistics[statisticName] = float(analysisElement.get(statisticName, 0))
+                self.learnedAnalyses[analysisElement.get('identifier')] = analysisStatistics
+
+        self._aggregatedStatistics = None
+        self.logger.debug("<%d> previous analyses have been loaded from the following runtime models file: %s" % (len(self.learnedAnalyses), self.modelsFileFullPath))
+
+
+    def saveModels(self):
+        # Initializations
+        modelsDirectoryFullPath = os.path.dirname(self.modelsFileFullPath)
+
+        # Create the parent directory if needed
+        if not Utils.isExistingDirectory(modelsDirectoryFullPath):
+            try:
+                os.makedirs(modelsDirectoryFullPath)
+            except OSError:
+                self.logger.warning("The directory of the runtime models file can't be created: %s" % modelsDirectoryFullPath)
+                return
+
+        # Build the root of the XML file
+        modelsRoot = etree.Element('runtime_models', {'triannot_version': TRIANNOT_VERSION})
+        for modelElement in self.otherModelElements:
+            modelsRoot.append(modelElement)
+
+        currentModelElement = etree.SubElement(modelsRoot, 'model', {'task_file_checksum': self.taskFileChecksum, 'description': self.taskFileDescription})
+        for analysisIdentifier, analysisStatistics in self.learnedAnalyses.items():
+            analysisElement = etree.SubElement(currentModelElement, 'analysis', {'identifier': analysisIdentifier})
+            for statisticName in TriAnnotRuntimeModel.statisticNames:
+                analysisElement.set(statisticName, repr(analysisStatistics[statisticName]))
+
+        # Indent the XML content
+        TriAnnotConfig.indent(modelsRoot)
+
+        # The file might be shared by several TriAnnotPipeline executions so it is written under a temporary name and then renamed
+        try:
+            temporaryFileFullPath = "%s.%d.tmp" % (self.modelsFileFullPath, os.getpid())
+            with open(temporaryFileFullPath, 'w') as modelsFileHandler:
+                modelsFileHandler.write(etree.tostring(modelsRoot, 'ISO-8859-1'))
+            os.rename(temporaryFileFullPath, self.modelsFileFullPath)
+        except (IOError, OSError) as ex:
+            self.logger.warning("The following runtime models file could not be updated: %s (%s)" % (self.modelsFileFullPath, ex))
+            return
+
+        self.logger.info("The runtime model of the current step/task file has been updated in the following file: %s" % self.modelsFileFullPath)
+
+
+    #########################
+    ##  Learning methods  ##
+    #########################
+    def learnFromDatabase(self, sqliteObject, analysisIdentifier):
+        # Initializations
+        analysisStatistics = dict.fromkeys(TriAnnotRuntimeModel.statisticNames, 0.0)
+
+        # Only successful executions are representative of the cost of a chunk
+        for costData in sqliteObject.getCompletedInstancesCostData():
+            executionTimeInSeconds = TriAnnotRuntimeModel.convertElapsedTimeToSeconds(costData['instanceExecutionTime'])
+            if executionTimeInSeconds is None or costData['chunkSize'] is None or int(costData['chunkSize']) <= 0:
+                continue
+
+            chunkSizeInMb = int(costData['chunkSize']) / 1000000.0
+            diskUsage = float(costData['instanceDirectorySize'] or 0)
+
+            analysisStatistics['nbSamples'] += 1
+            analysisStatistics['sumSize'] += chunkSizeInMb
+            analysisStatistics['sumSizeSquare'] += chunkSizeInMb * chunkSizeInMb
+            analysisStatistics['sumDuration'] += executionTimeInSeconds
+            analysisStatistics['sumSizeDuration'] += chunkSizeInMb * executionTimeInSeconds
+            analysisStatistics['sumDiskUsage'] += diskUsage
+            analysisStatistics['sumSizeDiskUsage'] += chunkSizeInMb * diskUsage
+
+        if analysisStatistics['nbSamples'] == 0:
+            return False
+
+        # The statistics of an already learned analysis are replaced (resume/retry modes) and the analysis becomes the most recent one
+        self.learnedAnalyses.pop(analysisIdentifier, None)
+        self.learnedAnalyses[analysisIdentifier] = analysisStatistics
+
+        while len(self.learnedAnalyses) > TriAnnotRuntimeModel.maximumNumberOfLearnedAnalyses:
+            self.learnedAnalyses.popitem(last = False)
+
+        self._aggregatedStatistics = None
+        self.logger.debug("<%d> completed instance(s) have been learned from analysis: %s" % (analysisStatistics['nbSamples'], analysisIdentifier))
+
+        return True
+
+
+    ###########################
+    ##  Prediction methods  ##
+    ###########################
+    def isUsable(self):
+        return self.getAggregatedStatistics()['nbSamples'] > 0
+
+
+    def getNumberOfSamples(self):
+        return int(self.getAggregatedStatistics()['nbSamples'])
+
+
+    def predictDuration(self, chunkSize):
+        # Returns the predicted execution time (in seconds) of a chunk
+        return self._predictCost(chunkSize, 'sumDuration', 'sumSizeDuration')
+
+
+    def predictDiskUsage(self, chunkSize):
+        # Returns the predicted size (in bytes) of the execution folder of a chunk
+        return self._predictCost(chunkSize, 'sumDiskUsage', 'sumSizeDiskUsage')
+
+
+    def getAggregatedStatistics(self):
+        if self._aggregatedStatistics is None:
+            self._aggregatedStatistics = dict.fromkeys(TriAnnotRuntimeModel.statisticNames, 0.0)
+            for analysisStatistics in self.learnedAnalyses.values():
+                for statisticName in TriAnnotRuntimeModel.statisticNames:
+                    self._aggregatedStatistics[statisticName] += analysisStatistics[statisticName]
+
+        return self._aggregatedStatistics
+
+
+    def _predictCost(self, chunkSize, sumCostName, sumSizeCostName):
+        # Initializations
+        statistics = self.getAggregatedStatistics()
+        nbSamples = statistics['nbSamples']
+        chunkSizeInMb = int(chunkSize) / 1000000.0
+
+        if nbSamples == 0:
+            return None
+
+        # Linear model (fixed cost + cost per Mb) fitted with the least squares method when there is enough distinct chunk sizes
+        denominator = nbSamples * statistics['sumSizeSquare'] - statistics['sumSize'] * statistics['sumSize']
+        if nbSamples >= 3 and denominator > 1e-12:
+            slope = (nbSamples * statistics[sumSizeCostName] - statistics['sumSize'] * statistics[sumCostName]) / denominator
+            intercept = (statistics[sumCostName] - slope * statistics['sumSize']) / nbSamples
+            if slope >= 0:
+                return max(0.0, intercept + slope * chunkSizeInMb)
+
+        # Cost per Mb otherwise
+        if statistics['sumSize'] > 0:
+            return statistics[sumCostName] / statistics['sumSize'] * chunkSizeInMb
+
+        return statistics[sumCostName] / nbSamples
+
+
+    ######################
+    ##  Static methods  ##
+    ######################
+    @staticmethod
+    def convertElapsedTimeToSeconds(elapsedTime):
+        # Elapsed times are written by TriAnnotUnit with the following format: 01H 02m 3.45s
+        if elapsedTime is None:
+            return None
+
+        elapsedTimeMatch = re.match(r'^\s*(\d+)H\s+(\d+)m\s+([\d.]+)s\s*$', str(elapsedTime))
+        if elapsedTimeMatch is None:
+            return None
+
+        return int(elapsedTimeMatch.group(1)) * 3600 + int(elapsedTimeMatch.group(2)) * 60 + float(elapsedTimeMatch.group(3))
+
+
+    @staticmethod
+    def convertSecondsToElapsedTime(seconds):
+        totalHours = int(seconds / (60.0 * 60.0))
+        totalMinutes = int((seconds - (totalHours * 60.0 * 60.0)) / 60.0)
+        totalSeconds = seconds - (totalHours * 60.0 * 60.0) - (totalMinutes * 60.0)
+
+        return "%02iH %02im %02is" % (totalHours, totalMinutes, totalSeconds)
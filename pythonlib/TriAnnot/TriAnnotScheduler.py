@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+
+import heapq
+import logging
+
+class TriAnnotScheduler (object):
+
+    # Static class variables
+    # Possible values are:
+    #   - fifo: instances are submitted in the order of the input sequence file
+    #   - largestFirst: the largest chunks are submitted first (Longest Processing Time first - Reduces the tail of the analysis)
+    #   - roundRobin: one chunk of each sequence is submitted before the second chunk of any sequence
+    #   - weighted: the size of the chunks is multiplied by a user defined weight for each sequence (largest weighted size first)
+    availablePolicies = ['fifo', 'largestFirst', 'roundRobin', 'weighted']
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self, schedulingPolicy, sequenceWeights = None):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotScheduler")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        self.schedulingPolicy = schedulingPolicy
+        self.sequenceWeights = sequenceWeights if sequenceWeights is not None else dict()
+
+        # Priority queue of instance identifiers (list of (priority key, instance id) tuples managed with the heapq module)
+        self.priorityQueue = list()
+        self.priorityKeys = dict()
+
+
+    ###############################
+    ##  Queue management methods ##
+    ###############################
+    def buildQueue(self, instancesSchedulingData):
+        # Initializations
+        chunkRankInSequence = dict()
+        self.priorityQueue = list()
+        self.priorityKeys = dict()
+
+        # Note: instancesSchedulingData must be sorted by instance identifier
+        for instanceData in instancesSchedulingData:
+            # Rank of the current chunk among the chunks of the same sequence that still need to be submitted (used for round-robin)
+            chunkRankInSequence[instanceData['sequenceName']] = chunkRankInSequence.get(instanceData['sequenceName'], 0) + 1
+            instanceData['chunkRank'] = chunkRankInSequence[instanceData['sequenceName']]
+
+            self.priorityKeys[instanceData['id']] = self.computePriorityKey(instanceData)
+            self.priorityQueue.append((self.priorityKeys[instanceData['id']], instanceData['id']))
+
+        heapq.heapify(self.priorityQueue)
+
+        self.logger.debug("<%d> instance(s) have been added to the submission queue (Scheduling policy: %s)" % (len(self.priorityQueue), self.schedulingPolicy))
+
+
+    def computePriorityKey(self, instanceData):
+        # The smallest key has the highest priority and the instance identifier is always used to break ties
+        if self.schedulingPolicy == 'largestFirst':
+            return (-int(instanceData['chunkSize']), instanceData['id'])
+
+        elif self.schedulingPolicy == 'roundRobin':
+            return (instanceData['chunkRank'], instanceData['id'])
+
+        elif self.schedulingPolicy == 'weighted':
+            return (-float(self.sequenceWeights.get(instanceData['sequenceName'], 1.0)) * int(instanceData['chunkSize']), instanceData['id'])
+
+        else:
+            return (instanceData['id'],)
+
+
+    def popNextInstanceIdentifier(self):
+        if len(self.priorityQueue) == 0:
+            return None
+
+        return heapq.heappop(self.priorityQueue)[1]
+
+
+    def pushBackInstanceIdentifier(self, instanceId):
+        # Instances that could not be submitted keep their original priority
+        heapq.heappush(self.priorityQueue, (self.priorityKeys[instanceId], instanceId))
+
+
+    def addInstanceIdentifier(self, instanceData):
+        # Instances added after the creation of the queue (Ex: automatic retry) are considered as the first remaining chunk of their sequence
+        instanceData.setdefault('chunkRank', 1)
+
+        self.priorityKeys[instanceData['id']] = self.computePriorityKey(instanceData)
+        heapq.heappush(self.priorityQueue, (self.priorityKeys[instanceData['id']], instanceData['id']))
+
+
+    def getNextInstanceIdentifiers(self, nbInstances):
+        # Instances that will be popped next (the queue is not modified)
+        return [instanceId for priorityKey, instanceId in heapq.nsmallest(nbInstances, self.priorityQueue)]
+
+
+    def getQueueLength(self):
+        return len(self.priorityQueue)
+
+
+    ######################
+    ##  Static methods  ##
+    ######################
+    @staticmethod
+    def loadSequenceWeightsFile(weightsFileFullPath):
+        # Initializations
+        sequenceWeights = dict()
+
+        # Expected format: one sequence name and one weight (float) by line - Empty lines and lines starting with # are ignored
+        with open(weightsFileFullPath, 'r') as weightsFileHandler:
+            for lineNumber, line in enumerate(weightsFileHandler, 1):
+                line = line.strip()
+                if line == '' or line.startswith('#'):
+                    continue
+
+                fields = line.split()
+                if len(fields) != 2:
+                    raise RuntimeError("Line %d of the sequence weights file is invalid (2 columns expected: sequence name and weight): %s" % (lineNumber, weightsFileFullPath))
+
+                try:
+                    sequenceWeights[fields[0]] = float(fields[1])
+                except ValueError:
+                    raise RuntimeError("The weight defined at line %d of the sequence weights file is not a valid number: %s" % (lineNumber, weightsFileFullPath))
+
+        return sequenceWeights
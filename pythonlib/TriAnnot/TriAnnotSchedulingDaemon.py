@@ -0,0 +1,390 @@
+#!/usr/bin/env python
+
+import os
+import sys
+import time
+import json
+import errno
+import socket
+import sqlite3
+import logging
+import threading
+import subprocess
+import SocketServer
+
+class TriAnnotSchedulingDaemon (object):
+
+    # Static class variables
+    # Status of the analyses managed by the daemon
+    analysisStatutes = ['submitted', 'running', 'finished', 'failed', 'lost']
+    activeAnalysisStatutes = ['submitted', 'running']
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self, socketFileFullPath, stateDatabaseFileFullPath, totalParallelAnalysis, monitoringInterval = 30):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotSchedulingDaemon")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        # Note: the daemon shares <totalParallelAnalysis> simultaneous instances between all the analyses (ie. TriAnnotPipeline.py executions) that are registered
+        self.socketFileFullPath = socketFileFullPath
+        self.stateDatabaseFileFullPath = stateDatabaseFileFullPath
+        self.totalParallelAnalysis = int(totalParallelAnalysis)
+        self.monitoringInterval = float(monitoringInterval)
+        self.pipelineProgramFullPath = os.path.join(os.path.dirname(os.path.realpath(sys.argv[0])), 'TriAnnotPipeline.py')
+
+        # Shared state (Key = main working directory of the analysis / Value = dict) - Protected by a lock since requests are treated by several threads
+        self.analyses = dict()
+        self.stateLock = threading.Lock()
+        self.registrationCounter = 0
+
+        # Processes of the analyses submitted through the daemon (Key = main working directory of the analysis / Value = Popen object)
+        self.analysisProcesses = dict()
+
+        self.server = None
+        self.stopRequested = False
+
+
+    ######################################
+    ##  State database related methods  ##
+    ######################################
+    def createStateDatabase(self):
+        sqlDatabaseConnection = sqlite3.connect(self.stateDatabaseFileFullPath)
+        try:
+            sqlDatabaseConnection.execute('CREATE TABLE IF NOT EXISTS Analyses (workdir TEXT PRIMARY KEY, weight REAL, pid INTEGER, status TEXT, submissionDate TEXT, lastReportDate TEXT, nbActiveInstances INTEGER, nbPendingInstances INTEGER, maxParallelAnalysis INTEGER, allocatedParallelAnalysis INTEGER, commandLine TEXT)')
+        finally:
+            sqlDatabaseConnection.commit()
+            sqlDatabaseConnection.close()
+
+
+    def loadStateDatabase(self):
+        # Analyses that were running when the previous daemon stopped are registered again (they will be checked by the first monitoring cycle)
+        sqlDatabaseConnection = sqlite3.connect(self.stateDatabaseFileFullPath)
+        sqlDatabaseConnection.row_factory = sqlite3.Row
+        try:
+            for analysisRow in sqlDatabaseConnection.execute('SELECT * FROM Analyses ORDER BY submissionDate ASC'):
+                analysis = dict(analysisRow)
+                self.registrationCounter += 1
+                analysis['registrationRank'] = self.registrationCounter
+                self.analyses[analysis['workdir']] = analysis
+        finally:
+            sqlDatabaseConnection.close()
+
+
+    def saveAnalysis(self, analysis):
+        # Note: must be called with the state lock acquired
+        columnNames = ['workdir', 'weight', 'pid', 'status', 'submissionDate', 'lastReportDate', 'nbActiveInstances', 'nbPendingInstances', 'maxParallelAnalysis', 'allocatedParallelAnalysis', 'commandLine']
+
+        sqlDatabaseConnection = sqlite3.connect(self.stateDatabaseFileFullPath)
+        try:
+            sqlDatabaseConnection.execute('INSERT OR REPLACE INTO Analyses (%s) VALUES (%s)' % (', '.join(columnNames), ', '.join(['?'] * len(columnNames))), [analysis.get(columnName) for columnName in columnNames])
+        except sqlite3.Error as sqlError:
+            self.logger.error("The state of the analysis <%s> could not be saved in the state database: %s" % (analysis['workdir'], sqlError))
+            sqlDatabaseConnection.rollback()
+        finally:
+            sqlDatabaseConnection.commit()
+            sqlDatabaseConnection.close()
+
+
+    #########################
+    ##  Main loop methods  ##
+    #########################
+    def serve(self):
+        # Initializations
+        self.createStateDatabase()
+        self.loadStateDatabase()
+
+        # A socket file left by a crashed daemon is removed (but a running daemon is never replaced)
+        if os.path.exists(self.socketFileFullPath):
+            if TriAnnotDaemonClient(self.socketFileFullPath).isDaemonAlive():
+                raise RuntimeError("A scheduling daemon is already listening on the following socket: %s" % self.socketFileFullPath)
+            os.remove(self.socketFileFullPath)
+
+        self.server = TriAnnotDaemonServer(self.socketFileFullPath, TriAnnotDaemonRequestHandler)
+        self.server.daemonObject = self
+
+        serverThread = threading.Thread(target = self.server.serve_forever)
+        serverThread.daemon = True
+        serverThread.start()
+
+        self.logger.info("The scheduling daemon is listening on socket <%s> and will share <%d> simultaneous instances between the registered analyses" % (self.socketFileFullPath, self.totalParallelAnalysis))
+
+        # Single monitoring loop for all the analyses
+        try:
+            while not self.stopRequested:
+                self.monitorAnalyses()
+                time.sleep(self.monitoringInterval)
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+            if os.path.exists(self.socketFileFullPath):
+                os.remove(self.socketFileFullPath)
+
+        self.logger.info('The scheduling daemon has been stopped')
+
+
+    def monitorAnalyses(self):
+        with self.stateLock:
+            for workdir, analysis in self.analyses.items():
+                if analysis['status'] not in TriAnnotSchedulingDaemon.activeAnalysisStatutes:
+                    continue
+
+                # Analyses submitted through the daemon: the exit code of the process is available
+                if self.analysisProcesses.has_key(workdir):
+                    returnCode = self.analysisProcesses[workdir].poll()
+                    if returnCode is None:
+                        continue
+
+                    self.analysisProcesses.pop(workdir)
+                    analysis['status'] = 'finished' if returnCode == 0 else 'failed'
+
+                # Analyses started by hand (or by a previous daemon): only the existence of the process can be checked
+                elif analysis['pid'] is None or TriAnnotSchedulingDaemon.isProcessAlive(analysis['pid']):
+                    continue
+
+                else:
+                    analysis['status'] = 'lost'
+
+                self.logger.info("Analysis <%s> is over (Status: %s)" % (workdir, analysis['status']))
+                self.saveAnalysis(analysis)
+
+            self.computeFairShares()
+
+
+    ###############################
+    ##  Request related methods  ##
+    ###############################
+    def processRequest(self, request):
+        # Initializations
+        requestHandlers = {'register': self.registerAnalysis, 'share': self.getAnalysisShare, 'unregister': self.unregisterAnalysis, 'submit': self.submitAnalysis, 'status': self.getStatus, 'stop': self.stop}
+
+        if not requestHandlers.has_key(request.get('action')):
+            return {'error': "Unknown action: %s" % request.get('action')}
+
+        with self.stateLock:
+            return requestHandlers[request['action']](request)
+
+
+    def registerAnalysis(self, request):
+        analysis = self.analyses.get(request['workdir'])
+
+        # Analyses submitted through the daemon are already known
+        if analysis is None or analysis['status'] not in TriAnnotSchedulingDaemon.activeAnalysisStatutes:
+            self.registrationCounter += 1
+            analysis = {'workdir': request['workdir'], 'weight': float(request.get('weight', 1.0)), 'submissionDate': time.strftime("%Y-%m-%d %H:%M:%S"), 'commandLine': None, 'registrationRank': self.registrationCounter}
+            self.analyses[request['workdir']] = analysis
+
+        analysis.update({'pid': request.get('pid'), 'status': 'running', 'lastReportDate': time.strftime("%Y-%m-%d %H:%M:%S"), 'maxParallelAnalysis': int(request.get('maxParallelAnalysis', self.totalParallelAnalysis)), 'nbActiveInstances': 0, 'nbPendingInstances': 0, 'allocatedParallelAnalysis': 0})
+        self.logger.info("Analysis <%s> has been registered (Weight: %s)" % (analysis['workdir'], analysis['weight']))
+
+        self.computeFairShares()
+        self.saveAnalysis(analysis)
+
+        return {'allocatedParallelAnalysis': analysis['allocatedParallelAnalysis']}
+
+
+    def getAnalysisShare(self, request):
+        analysis = self.analyses.get(request['workdir'])
+        if analysis is None or analysis['status'] != 'running':
+            return {'error': "Analysis <%s> is not registered" % request['workdir']}
+
+        analysis.update({'lastReportDate': time.strftime("%Y-%m-%d %H:%M:%S"), 'nbActiveInstances': int(request['nbActiveInstances']), 'nbPendingInstances': int(request['nbPendingInstances'])})
+
+        self.computeFairShares()
+        self.saveAnalysis(analysis)
+
+        return {'allocatedParallelAnalysis': analysis['allocatedParallelAnalysis']}
+
+
+    def unregisterAnalysis(self, request):
+        analysis = self.analyses.get(request['workdir'])
+        if analysis is None:
+            return {'error': "Analysis <%s> is not registered" % request['workdir']}
+
+        analysis['status'] = request.get('status', 'finished')
+        analysis['allocatedParallelAnalysis'] = 0
+        self.logger.info("Analysis <%s> has been unregistered (Status: %s)" % (analysis['workdir'], analysis['status']))
+
+        self.computeFairShares()
+        self.saveAnalysis(analysis)
+
+        return {}
+
+
+    def submitAnalysis(self, request):
+        # Initializations
+        workdir = os.path.realpath(os.path.expanduser(request['workdir']))
+        commandLine = [self.pipelineProgramFullPath, '--workdir', workdir] + list(request['arguments'])
+
+        if self.analyses.has_key(workdir) and self.analyses[workdir]['status'] in TriAnnotSchedulingDaemon.activeAnalysisStatutes:
+            return {'error': "An analysis is already running in the following directory: %s" % workdir}
+
+        if not os.path.isdir(workdir):
+            os.makedirs(workdir)
+
+        # The analysis will register itself with the socket and the weight given through the environment
+        analysisEnvironment = dict(os.environ)
+        analysisEnvironment.update({'TRIANNOT_DAEMON_SOCKET': self.socketFileFullPath, 'TRIANNOT_ANALYSIS_WEIGHT': str(request.get('weight', 1.0))})
+
+        with open(os.path.join(workdir, 'TriAnnotPipeline_daemon.log'), 'a') as logFileHandler:
+            self.analysisProcesses[workdir] = subprocess.Popen(commandLine, stdout = logFileHandler, stderr = subprocess.STDOUT, cwd = workdir, env = analysisEnvironment, close_fds = True)
+
+        self.registrationCounter += 1
+        analysis = {'workdir': workdir, 'weight': float(request.get('weight', 1.0)), 'pid': self.analysisProcesses[workdir].pid, 'status': 'submitted', 'submissionDate': time.strftime("%Y-%m-%d %H:%M:%S"), 'lastReportDate': None, 'nbActiveInstances': 0, 'nbPendingInstances': 0, 'maxParallelAnalysis': self.totalParallelAnalysis, 'allocatedParallelAnalysis': 0, 'commandLine': ' '.join(commandLine), 'registrationRank': self.registrationCounter}
+        self.analyses[workdir] = analysis
+        self.saveAnalysis(analysis)
+
+        self.logger.info("A new analysis has been submitted in directory <%s> (pid: %d - Weight: %s)" % (workdir, analysis['pid'], analysis['weight']))
+
+        return {'pid': analysis['pid']}
+
+
+    def getStatus(self, request):
+        return {'totalParallelAnalysis': self.totalParallelAnalysis, 'analyses': sorted([dict([(key, value) for key, value in analysis.items() if key != 'registrationRank']) for analysis in self.analyses.values()], key = lambda analysis: analysis['submissionDate'])}
+
+
+    def stop(self, request):
+        self.stopRequested = True
+
+        return {}
+
+
+    ##############################
+    ##  Fair-share computation  ##
+    ##############################
+    def computeFairShares(self):
+        # Note: must be called with the state lock acquired
+        runningAnalyses = [analysis for analysis in self.analyses.values() if analysis['status'] == 'running']
+
+        demands = dict()
+        for analysis in runningAnalyses:
+            demands[analysis['workdir']] = min(analysis['nbActiveInstances'] + analysis['nbPendingInstances'], analysis['maxParallelAnalysis'])
+
+        shares = TriAnnotSchedulingDaemon.computeWeightedMaxMinShares(self.totalParallelAnalysis, demands, dict([(analysis['workdir'], analysis['weight']) for analysis in runningAnalyses]), dict([(analysis['workdir'], analysis['registrationRank']) for analysis in runningAnalyses]))
+
+        for analysis in runningAnalyses:
+            analysis['allocatedParallelAnalysis'] = shares[analysis['workdir']]
+
+
+    @staticmethod
+    def computeWeightedMaxMinShares(totalSlots, demands, weights, ranks):
+        # Weighted max-min fairness: each slot is given to the unsatisfied analysis with the lowest share/weight ratio (the oldest analysis wins ties)
+        # Note: the slots that are not needed by an analysis are redistributed to the other ones
+        shares = dict.fromkeys(demands.keys(), 0)
+
+        for slotNumber in range(totalSlots):
+            unsatisfiedAnalyses = [workdir for workdir in demands.keys() if shares[workdir] < demands[workdir] and weights[workdir] > 0]
+            if len(unsatisfiedAnalyses) == 0:
+                break
+
+            selectedAnalysis = min(unsatisfiedAnalyses, key = lambda workdir: (shares[workdir] / weights[workdir], ranks[workdir]))
+            shares[selectedAnalysis] += 1
+
+        return shares
+
+
+    ######################
+    ##  Static methods  ##
+    ######################
+    @staticmethod
+    def isProcessAlive(pid):
+        try:
+            os.kill(int(pid), 0)
+        except OSError as err:
+            return err.errno == errno.EPERM
+
+        return True
+
+
+class TriAnnotDaemonServer (SocketServer.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class TriAnnotDaemonRequestHandler (SocketServer.StreamRequestHandler):
+
+    def handle(self):
+        # One JSON request per connection and one JSON answer
+        try:
+            response = self.server.daemonObject.processRequest(json.loads(self.rfile.readline()))
+        except Exception as ex:
+            response = {'error': str(ex)}
+
+        self.wfile.write(json.dumps(response) + '\n')
+
+
+class TriAnnotDaemonClient (object):
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self, socketFileFullPath, timeout = 10):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotDaemonClient")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        self.socketFileFullPath = socketFileFullPath
+        self.timeout = timeout
+
+
+    def sendRequest(self, request):
+        # Returns the answer of the daemon (dict) or None if the daemon can't be reached
+        clientSocket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        clientSocket.settimeout(self.timeout)
+
+        try:
+            clientSocket.connect(self.socketFileFullPath)
+            clientSocket.sendall(json.dumps(request) + '\n')
+            response = json.loads(clientSocket.makefile('r').readline())
+        except (socket.error, ValueError) as err:
+            self.logger.debug("The scheduling daemon could not be reached through socket <%s>: %s" % (self.socketFileFullPath, err))
+            return None
+        finally:
+            clientSocket.close()
+
+        if response.has_key('error'):
+            self.logger.warning("The scheduling daemon has returned the following error: %s" % response['error'])
+            return None
+
+        return response
+
+
+    def isDaemonAlive(self):
+        return self.sendRequest({'action': 'status'}) is not None
+
+
+    #########################
+    ##  Analysis requests  ##
+    #########################
+    def registerAnalysis(self, workdir, weight, maxParallelAnalysis):
+        return self.sendRequest({'action': 'register', 'workdir': workdir, 'weight': weight, 'pid': os.getpid(), 'maxParallelAnalysis': maxParallelAnalysis}) is not None
+
+
+    def requestParallelAnalysisShare(self, workdir, nbActiveInstances, nbPendingInstances):
+        response = self.sendRequest({'action': 'share', 'workdir': workdir, 'nbActiveInstances': nbActiveInstances, 'nbPendingInstances': nbPendingInstances})
+
+        if response is None:
+            return None
+
+        return int(response['allocatedParallelAnalysis'])
+
+
+    def unregisterAnalysis(self, workdir, status):
+        return self.sendRequest({'action': 'unregister', 'workdir': workdir, 'status': status}) is not None
+
+
+    #######################
+    ##  Daemon requests  ##
+    #######################
+    def submitAnalysis(self, workdir, weight, arguments):
+        return self.sendRequest({'action': 'submit', 'workdir': workdir, 'weight': weight, 'arguments': arguments})
+
+
+    def getStatus(self):
+        return self.sendRequest({'action': 'status'})
+
+
+    def stopDaemon(self):
+        return self.sendRequest({'action': 'stop'}) is not None
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+
+import mmap
+import logging
+import threading
+
+from TriAnnot.TriAnnotBgzfFile import *
+
+class TriAnnotSequenceExtractor (object):
+
+    # Static class variables
+    # Note: the chunk sequences can't be written in one line because it causes crashes with the BioPerl Bio::DB:fasta library (max line length is 65536 char per line and chunks might be longer)
+    defaultOutputLineLength = 80
+
+    # Number of bytes of the fasta file treated at once (the memory used by an extraction does not depend on the size of the chunk)
+    defaultWindowSize = 4 * 1024 * 1024
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self, sequenceFileFullPath, outputLineLength = None, windowSize = None):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotSequenceExtractor")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        self.sequenceFileFullPath = sequenceFileFullPath
+        self.outputLineLength = outputLineLength if outputLineLength is not None else TriAnnotSequenceExtractor.defaultOutputLineLength
+        self.windowSize = windowSize if windowSize is not None else TriAnnotSequenceExtractor.defaultWindowSize
+
+        # The size of a window is a multiple of the output line length so that the output lines are never split between two windows (except for the end of line characters)
+        self.windowSize = max(self.windowSize / self.outputLineLength, 1) * self.outputLineLength
+
+        # The fasta file is mapped once and shared by all the extractions (including the ones of the background preparation threads)
+        # Note: slicing a read-only mmap object does not move any file position so the extractions can be done simultaneously
+        self.sequenceFileHandler = None
+        self.sequenceFileMap = None
+
+        # BGZF compressed fasta files are read block by block (with the help of their .gzi index) instead of being mapped
+        self.compressedSequenceFile = None
+        self.openingLock = threading.Lock()
+
+
+    def open(self):
+        with self.openingLock:
+            if self.sequenceFileHandler is not None or self.compressedSequenceFile is not None:
+                return
+
+            if TriAnnotBgzfFile.isBgzfFile(self.sequenceFileFullPath):
+                self.compressedSequenceFile = TriAnnotBgzfFile(self.sequenceFileFullPath).open()
+                return
+
+            self.sequenceFileHandler = open(self.sequenceFileFullPath, 'rb')
+
+            # An empty file can't be mapped
+            try:
+                self.sequenceFileMap = mmap.mmap(self.sequenceFileHandler.fileno(), 0, access = mmap.ACCESS_READ)
+            except (mmap.error, ValueError):
+                self.sequenceFileMap = ''
+
+
+    def close(self):
+        with self.openingLock:
+            if self.compressedSequenceFile is not None:
+                self.compressedSequenceFile.close()
+                self.compressedSequenceFile = None
+
+            if self.sequenceFileHandler is None:
+                return
+
+            if isinstance(self.sequenceFileMap, mmap.mmap):
+                self.sequenceFileMap.close()
+            self.sequenceFileHandler.close()
+
+            self.sequenceFileMap = None
+            self.sequenceFileHandler = None
+
+
+    ##########################
+    ##  Extraction methods  ##
+    ##########################
+    def writeSequence(self, outputFileHandler, startOffset, endOffset, upperCase = False):
+        # Writes the bases located between startOffset and endOffset in the fasta file (end of line characters excluded) as lines of outputLineLength characters
+        # Initializations
+        lineLength = self.outputLineLength
+        pendingBases = ''
+
+        self.open()
+
+        for windowStartOffset in xrange(startOffset, endOffset, self.windowSize):
+            # Removal of all the end of line characters of the window in one operation
+            windowBases = self.readWindow(windowStartOffset, min(windowStartOffset + self.windowSize, endOffset)).translate(None, '\r\n')
+            if upperCase:
+                windowBases = windowBases.upper()
+
+            # The bases of the last incomplete line of the previous window are completed with the first bases of the current window
+            firstLinePosition = 0
+            if pendingBases != '':
+                firstLinePosition = min(lineLength - len(pendingBases), len(windowBases))
+                pendingBases += windowBases[:firstLinePosition]
+
+                if len(pendingBases) < lineLength:
+                    continue
+
+                outputFileHandler.write(pendingBases + '\n')
+                pendingBases = ''
+
+            # The lines are written from views of the window (no copy of the sequence)
+            nbFullLines = (len(windowBases) - firstLinePosition) / lineLength
+            outputFileHandler.writelines(self.lineGenerator(windowBases, firstLinePosition, nbFullLines))
+
+            # The bases of the last incomplete line are written with the next window (or at the end)
+            pendingBases = windowBases[firstLinePosition + nbFullLines * lineLength:]
+
+        if pendingBases != '':
+            outputFileHandler.write(pendingBases + '\n')
+
+
+    def readWindow(self, windowStartOffset, windowEndOffset):
+        if self.compressedSequenceFile is not None:
+            return self.compressedSequenceFile.readAt(windowStartOffset, windowEndOffset - windowStartOffset)
+
+        return self.sequenceFileMap[windowStartOffset:windowEndOffset]
+
+
+    def lineGenerator(self, windowBases, firstLinePosition, nbFullLines):
+        for lineNumber in xrange(nbFullLines):
+            yield buffer(windowBases, firstLinePosition + lineNumber * self.outputLineLength, self.outputLineLength)
+            yield '\n'
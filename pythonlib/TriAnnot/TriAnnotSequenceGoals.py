@@ -5,11 +5,11 @@ import logging
 
 class TriAnnotSequenceGoals (object):
 
-    def __init__(self, chunkInterval, chunkMaxSize, currentOffset):
-        # Logger
-        self.logger = logging.getLogger("TriAnnot.TriAnnotSequenceGoals")
-        self.logger.addHandler(logging.NullHandler())
+    # Logger (shared by all the objects: one object is created for each sequence of the fasta input file)
+    logger = logging.getLogger("TriAnnot.TriAnnotSequenceGoals")
+    logger.addHandler(logging.NullHandler())
 
+    def __init__(self, chunkInterval, chunkMaxSize, currentOffset, recordLineRuns = False):
         #self.logger.debug("Creating a new %s object" % (self.__class__.__name__))
 
         # Atributes
@@ -24,3 +24,74 @@ class TriAnnotSequenceGoals (object):
         self.chunkEndOffsets = []
 
         self.alreadyCountedBases = 0
+
+        # Layout of the lines of the sequence (only needed to place the chunk boundaries in the gaps of the sequence, see TriAnnotChunkBoundaryPlanner)
+        self.lineRuns = list() if recordLineRuns else None
+
+
+    def storeGoalOffset(self, goalOffset):
+        # Store the offset of the current goal and define the next goal
+        if self.nextGoalIsAStart:
+            self.chunkStartOffsets.append(goalOffset)
+            if self.nextEndGoal == 0:
+                self.nextEndGoal = self.chunkMaxSize
+            else:
+                self.nextEndGoal += self.chunkInterval
+            self.nextGoal = self.nextEndGoal
+            self.nextGoalIsAStart = False
+        else:
+            self.chunkEndOffsets.append(goalOffset)
+            self.nextStartGoal += self.chunkInterval
+            self.nextGoal = self.nextStartGoal
+            self.nextGoalIsAStart = True
+
+
+    def storeLineRun(self, firstLineOffset, nbCharactersByLine, nbLines, nbBytesByLine):
+        # Consecutive runs of lines of the same length are merged
+        if self.lineRuns is None or nbCharactersByLine == 0:
+            return
+
+        if len(self.lineRuns) > 0:
+            lastLineRun = self.lineRuns[-1]
+            if lastLineRun[1] == nbCharactersByLine and lastLineRun[3] == nbBytesByLine and lastLineRun[0] + lastLineRun[2] * lastLineRun[3] == firstLineOffset:
+                lastLineRun[2] += nbLines
+                return
+
+        self.lineRuns.append([firstLineOffset, nbCharactersByLine, nbLines, nbBytesByLine])
+
+
+    def consumeLineRun(self, firstLineOffset, nbCharactersByLine, nbLines, nbBytesByLine):
+        # Arithmetic equivalent of the line by line treatment (see the treatSequenceLine method of TriAnnotPipeline) for a run of lines of the same length
+        # Note: a goal is treated on the current line as long as it does not exceed the last base of the line (even when the goal is behind, ie. when the overlap is greater than the chunk interval)
+        if nbCharactersByLine == 0:
+            return
+
+        self.storeLineRun(firstLineOffset, nbCharactersByLine, nbLines, nbBytesByLine)
+
+        # Initializations
+        runStartBase = self.alreadyCountedBases
+        runEndBase = runStartBase + nbCharactersByLine * nbLines
+        currentLineIndex = 0
+
+        while True:
+            # Line on which the next goal is reached
+            if self.nextGoal <= runStartBase + (currentLineIndex + 1) * nbCharactersByLine:
+                goalLineIndex = currentLineIndex
+            elif self.nextGoal <= runEndBase:
+                goalLineIndex = (self.nextGoal - runStartBase - 1) / nbCharactersByLine
+            else:
+                break
+
+            # A goal located at the end of a line points to the beginning of the next line (and the treatment of the line is over)
+            goalLineStartBase = runStartBase + goalLineIndex * nbCharactersByLine
+            if self.nextGoal == goalLineStartBase + nbCharactersByLine:
+                self.storeGoalOffset(firstLineOffset + (goalLineIndex + 1) * nbBytesByLine)
+                currentLineIndex = goalLineIndex + 1
+            else:
+                self.storeGoalOffset(firstLineOffset + goalLineIndex * nbBytesByLine + self.nextGoal - goalLineStartBase)
+                currentLineIndex = goalLineIndex
+
+            if currentLineIndex == nbLines:
+                break
+
+        self.alreadyCountedBases = runEndBase
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+
+import logging
+
+class TriAnnotSequencePacker (object):
+
+    # Static class variables
+    packNamePrefix = 'Packed_sequences_'
+
+    # Modules of the Perl side that accept a multi-fasta sequence file (allowMultiFasta = 'yes'), the other modules abort the execution of a packed instance
+    # Note: the results of the ProteinMaker module are not parsed, the results of the other modules are parsed by the parser module of the same name
+    multiFastaProgramModules = ['ProteinMaker', 'FuncAnnot', 'InterProScan', 'InterProScan5', 'BestHit']
+    multiFastaParserModules = []
+    unparsedProgramModules = ['ProteinMaker']
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self, maximumPackedSequenceLength, maximumPackLength):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotSequencePacker")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        # Note: sequences shorter than maximumPackedSequenceLength are analyzed together (in a single multi-fasta instance) as long as the total length of the pack does not exceed maximumPackLength
+        self.maximumPackedSequenceLength = maximumPackedSequenceLength
+        self.maximumPackLength = maximumPackLength
+
+        # Content of the pack being filled (TriAnnotInstanceTableEntry objects of the non splitted sequences)
+        self.currentPackMembers = list()
+        self.currentPackSize = 0
+
+        # Statistics
+        self.nbPacks = 0
+        self.nbPackedSequences = 0
+
+
+    @staticmethod
+    def getIncompatibleTaskTypes(taskTypes):
+        # Returns the task types whose program module - OR - parser module can't analyze a pack of sequences
+        return sorted(set([taskType for taskType in taskTypes if taskType not in TriAnnotSequencePacker.multiFastaProgramModules or (taskType not in TriAnnotSequencePacker.unparsedProgramModules and taskType not in TriAnnotSequencePacker.multiFastaParserModules)]))
+
+
+    def isPackableSequence(self, instanceTableEntry):
+        return instanceTableEntry.sequenceSize <= self.maximumPackedSequenceLength
+
+
+    def addSequence(self, instanceTableEntry):
+        # Returns the members of the previous pack when the sequence does not fit in it (or None)
+        # Note: the packs are filled in the order of the fasta file (next-fit) so that only one pack is kept in memory
+        closedPackMembers = None
+
+        if len(self.currentPackMembers) > 0 and self.currentPackSize + instanceTableEntry.sequenceSize > self.maximumPackLength:
+            closedPackMembers = self.closePack()
+
+        self.currentPackMembers.append(instanceTableEntry)
+        self.currentPackSize += instanceTableEntry.sequenceSize
+
+        return closedPackMembers
+
+
+    def closePack(self):
+        # Initializations
+        closedPackMembers = self.currentPackMembers
+
+        self.currentPackMembers = list()
+        self.currentPackSize = 0
+
+        # A pack of a single sequence is analyzed as a standalone sequence
+        if len(closedPackMembers) > 1:
+            self.nbPacks += 1
+            self.nbPackedSequences += len(closedPackMembers)
+
+        return closedPackMembers
+
+
+    def getLastPackName(self):
+        return "%s%d" % (TriAnnotSequencePacker.packNamePrefix, self.nbPacks)
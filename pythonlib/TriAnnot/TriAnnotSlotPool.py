@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+
+import os
+import time
+import fcntl
+import socket
+import logging
+
+class TriAnnotSlotPool (object):
+
+    # Static class variables
+    slotFilePattern = 'slot_%04d.lock'
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self, slotDirectoryFullPath, totalNumberOfSlots):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotSlotPool")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        # Note: each slot is a file of the slot directory that is locked (flock) by the process that owns the slot
+        # The kernel drops the locks of a process when it dies so the slots of a crashed process can't leak
+        # The locked descriptors are also inherited by the job that uses the slots (see getSlotInheritanceFunction) so the slots stay reserved as long as the job (or one of its children) is alive
+        self.slotDirectoryFullPath = slotDirectoryFullPath
+        self.totalNumberOfSlots = int(totalNumberOfSlots)
+
+
+    def createSlotDirectory(self):
+        if os.path.isdir(self.slotDirectoryFullPath):
+            return True
+
+        try:
+            os.makedirs(self.slotDirectoryFullPath)
+        except OSError:
+            # The directory might have been created by another process in the meantime
+            if not os.path.isdir(self.slotDirectoryFullPath):
+                return False
+
+        # The slot directory is shared by all the TriAnnot processes of the node (whatever the user)
+        try:
+            os.chmod(self.slotDirectoryFullPath, 01777)
+        except OSError:
+            pass
+
+        return True
+
+
+    ################################
+    ##  Slot management methods  ##
+    ################################
+    def acquireSlots(self, nbSlots):
+        # Initializations
+        acquiredSlots = list()
+
+        # A job that needs more slots than the node can provide would never be executed
+        nbSlots = min(max(int(nbSlots), 1), self.totalNumberOfSlots)
+
+        # The slots are scanned from a process dependent position to reduce the contention between processes
+        firstSlotNumber = os.getpid() % self.totalNumberOfSlots
+
+        for slotOffset in range(self.totalNumberOfSlots):
+            slotFileHandler = self.lockSlot((firstSlotNumber + slotOffset) % self.totalNumberOfSlots)
+            if slotFileHandler is not None:
+                acquiredSlots.append(slotFileHandler)
+                if len(acquiredSlots) == nbSlots:
+                    return acquiredSlots
+
+        # Not enough free slots: all or nothing
+        self.releaseSlots(acquiredSlots)
+
+        return None
+
+
+    def lockSlot(self, slotNumber):
+        slotFileFullPath = os.path.join(self.slotDirectoryFullPath, TriAnnotSlotPool.slotFilePattern % slotNumber)
+
+        # The slot files are shared by all the users of the node: a slot file created by another user (without write permission) is locked through a read-only descriptor (flock does not need write access)
+        try:
+            slotFileDescriptor = os.open(slotFileFullPath, os.O_RDWR | os.O_CREAT, 0666)
+            slotFileMode = 'r+'
+        except OSError:
+            try:
+                slotFileDescriptor = os.open(slotFileFullPath, os.O_RDONLY)
+                slotFileMode = 'r'
+            except OSError:
+                return None
+
+        # The umask of the process must not prevent the other users from writing in the slot file (only possible for the owner of the file)
+        try:
+            os.fchmod(slotFileDescriptor, 0666)
+        except OSError:
+            pass
+
+        # The descriptor is only inherited by the job that uses the slot (the other jobs launched by the process must not keep it open)
+        fcntl.fcntl(slotFileDescriptor, fcntl.F_SETFD, fcntl.fcntl(slotFileDescriptor, fcntl.F_GETFD) | fcntl.FD_CLOEXEC)
+
+        try:
+            slotFileHandler = os.fdopen(slotFileDescriptor, slotFileMode)
+        except (IOError, OSError):
+            os.close(slotFileDescriptor)
+            return None
+
+        try:
+            fcntl.flock(slotFileHandler.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except IOError:
+            slotFileHandler.close()
+            return None
+
+        # Write the owner of the slot (only used to ease the diagnosis of an overloaded node, impossible through a read-only descriptor)
+        try:
+            slotFileHandler.seek(0)
+            slotFileHandler.truncate()
+            slotFileHandler.write("%s %d %d\n" % (socket.gethostname(), os.getpid(), int(time.time())))
+            slotFileHandler.flush()
+        except IOError:
+            pass
+
+        return slotFileHandler
+
+
+    @staticmethod
+    def getSlotInheritanceFunction(acquiredSlots):
+        # Returns the function to execute in the child process of a job (preexec_fn of subprocess.Popen with close_fds = False) so that the job inherits the descriptors of its slots
+        # Note: a flock lock is only released when all the descriptors of the locked file are closed so the slots are not freed if the process that has acquired them dies before the job
+        slotFileDescriptors = [slotFileHandler.fileno() for slotFileHandler in acquiredSlots]
+
+        def inheritSlots():
+            # The descriptors of the slots of the job are kept open after the exec
+            for slotFileDescriptor in slotFileDescriptors:
+                fcntl.fcntl(slotFileDescriptor, fcntl.F_SETFD, fcntl.fcntl(slotFileDescriptor, fcntl.F_GETFD) & ~fcntl.FD_CLOEXEC)
+
+            # Same behavior as close_fds = True for the other descriptors (the close-on-exec descriptors like the error pipe of subprocess are closed by the exec)
+            if os.path.isdir('/proc/self/fd'):
+                openedFileDescriptors = [int(fileDescriptor) for fileDescriptor in os.listdir('/proc/self/fd')]
+            else:
+                openedFileDescriptors = range(3, os.sysconf('SC_OPEN_MAX'))
+
+            for fileDescriptor in openedFileDescriptors:
+                if fileDescriptor < 3 or fileDescriptor in slotFileDescriptors:
+                    continue
+                try:
+                    if not fcntl.fcntl(fileDescriptor, fcntl.F_GETFD) & fcntl.FD_CLOEXEC:
+                        os.close(fileDescriptor)
+                except (IOError, OSError):
+                    pass
+
+        return inheritSlots
+
+
+    def releaseSlots(self, acquiredSlots):
+        # Closing the file releases the lock
+        for slotFileHandler in acquiredSlots:
+            try:
+                slotFileHandler.close()
+            except IOError:
+                pass
@@ -1,19 +1,38 @@
 #!/usr/bin/env python
 
 import os
+import time
 import logging
 import sqlite3
+import threading
+from contextlib import contextmanager
 from collections import Counter, OrderedDict
 
 from TriAnnot.TriAnnotStatus import *
+from TriAnnot.TriAnnotFileWatcher import *
 import Utils
 
 class TriAnnotSqlite (object):
 
+    # Static class variables
+    # Note: the WAL journal mode lets the monitor mode read the database while the pipeline writes in it but it requires a file system that supports shared memory
+    # In auto mode, the databases located on a network file system (ex: NFS, Lustre, GPFS) use the DELETE journal mode instead
+    defaultJournalMode = 'auto'
+    synchronousMode = 'NORMAL'
+    cacheSize = -16384
+    busyTimeout = 60
+
+    # Maximum number of seconds between the write of a change of status/progression observed during the monitoring and its write in the database
+    defaultMonitoringUpdateFlushInterval = 30
+
+    # Version of the schema of the databases created by this version of TriAnnot (stored in the user_version header field of the database file)
+    # Note: the databases created before the introduction of the schema versions have the version 0 and are upgraded by the migrateToSchemaVersion<N> methods
+    schemaVersion = 3
+
     ###################
     ##  Constructor  ##
     ###################
-    def __init__(self, databaseFileFullPath):
+    def __init__(self, databaseFileFullPath, journalMode = None):
         # Logger
         self.logger = logging.getLogger("TriAnnot.TriAnnotSqlite")
         self.logger.addHandler(logging.NullHandler())
@@ -22,6 +41,13 @@ class TriAnnotSqlite (object):
 
         # Atributes
         self.databaseFileFullPath = databaseFileFullPath
+        self.journalMode = self.getEffectiveJournalMode(journalMode if journalMode is not None else TriAnnotSqlite.defaultJournalMode)
+
+        # Connection shared by all the requests (opened at the first request) and unit of work in progress (if any)
+        # Note: the background preparation threads of the pipeline also read the database so the use of the connection is serialized by a lock
+        self.sqlDatabaseConnection = None
+        self.connectionLock = threading.RLock()
+        self.unitOfWorkDepth = 0
 
         # Names of the tables
         self.globalFilesTableName = "Global_files"
@@ -29,11 +55,174 @@ class TriAnnotSqlite (object):
         self.sequencesTableName = "Sequences"
         self.instancesTableName = "Instances"
         self.systemStatisticsTableName = "System_Statistics"
-
-        # Create a new database if needed
+        self.packedSequencesTableName = "Packed_sequences"
+        self.instanceEventsTableName = "Instance_events"
+
+        # Batch registration of the sequences and instances of a new analysis
+        self.registrationBatchSize = 10000
+        self.registrationConnection = None
+        self.pendingSequenceRows = list()
+        self.pendingInstanceRows = list()
+        self.pendingPackedSequenceRows = list()
+        self.nbRegisteredSequences = 0
+        self.nbRegisteredInstances = 0
+
+        # Write-behind of the changes observed during the monitoring (instance id => (instanceStatus, instanceProgression))
+        # Note: only the SUBMITED to RUNNING transitions and the progressions are delayed, they are found again in the execution folders of the instances if the pipeline is killed before the flush
+        self.monitoringUpdateFlushInterval = TriAnnotSqlite.defaultMonitoringUpdateFlushInterval
+        self.lastMonitoringUpdateFlushTime = time.time()
+        self.persistedInstanceStates = dict()
+        self.pendingMonitoringUpdates = OrderedDict()
+
+        # Events of the instances waiting to be appended to the Instance_events table (written with the next update of the Instances table)
+        self.pendingInstanceEvents = list()
+
+        # Write-behind state changed in the current unit of work (restored if the unit of work is rolled back)
+        # Note: the state of each instance is saved before its first change (instance id => (pending monitoring update, persisted state))
+        self.uncommittedInstanceStates = dict()
+        self.uncommittedInstanceEvents = list()
+
+        # Create a new database if needed - OR - upgrade the schema of an existing database (ex: database of an analysis resumed with a newer version of TriAnnot)
         if not Utils.isExistingFile(self.databaseFileFullPath):
             self.createDefaultDatabase()
             self.initializeSystemStatisticsTableRow()
+        else:
+            self.upgradeSchema()
+
+
+    #####################################
+    ##  Connection management methods  ##
+    #####################################
+    def createConnection(self):
+        # Initializations
+        sqlDatabaseConnection = sqlite3.connect(self.databaseFileFullPath, timeout = TriAnnotSqlite.busyTimeout, check_same_thread = False)
+        sqlDatabaseConnection.row_factory = sqlite3.Row
+        sqlDatabaseConnection.text_factory = str
+
+        # A commit in NORMAL synchronous mode does not wait for the data to be written on the disk (the database stays consistent in WAL mode, only the last transactions can be lost by a power failure)
+        sqlDatabaseConnection.execute('PRAGMA synchronous = %s' % TriAnnotSqlite.synchronousMode)
+        sqlDatabaseConnection.execute('PRAGMA cache_size = %d' % TriAnnotSqlite.cacheSize)
+
+        return sqlDatabaseConnection
+
+
+    def getConnection(self):
+        # The lock is held until the releaseConnection method is called (at the end of the request)
+        self.connectionLock.acquire()
+
+        if self.sqlDatabaseConnection is None:
+            self.sqlDatabaseConnection = self.createConnection()
+
+        return self.sqlDatabaseConnection
+
+
+    def releaseConnection(self):
+        # The changes of a request are committed immediately - OR - at the end of the unit of work that contains it
+        try:
+            if self.sqlDatabaseConnection is not None and self.unitOfWorkDepth == 0:
+                self.sqlDatabaseConnection.commit()
+        finally:
+            self.connectionLock.release()
+
+
+    @contextmanager
+    def unitOfWork(self):
+        # All the changes made in the with block are committed in a single transaction (or rolled back if an exception is raised)
+        # Note: units of work can be nested, only the outermost one commits
+        sqlDatabaseConnection = self.getConnection()
+        self.unitOfWorkDepth += 1
+
+        try:
+            yield
+        except:
+            self.unitOfWorkDepth -= 1
+            if self.unitOfWorkDepth == 0:
+                sqlDatabaseConnection.rollback()
+                self.restoreUncommittedWriteBehindState()
+            self.connectionLock.release()
+            raise
+
+        self.unitOfWorkDepth -= 1
+        if self.unitOfWorkDepth > 0:
+            self.releaseConnection()
+            return
+
+        try:
+            self.releaseConnection()
+        except:
+            self.restoreUncommittedWriteBehindState()
+            raise
+
+        self.uncommittedInstanceStates.clear()
+        del self.uncommittedInstanceEvents[:]
+
+
+    def saveInstanceStateBeforeChange(self, instanceId):
+        # Only the first change of each instance in the current unit of work needs to be saved
+        if self.unitOfWorkDepth > 0 and not self.uncommittedInstanceStates.has_key(instanceId):
+            self.uncommittedInstanceStates[instanceId] = (self.pendingMonitoringUpdates.get(instanceId), self.persistedInstanceStates.get(instanceId))
+
+
+    def restoreUncommittedWriteBehindState(self):
+        # The rows written in the rolled back unit of work are lost: the instance states and the events must be written again
+        for instanceId, (pendingMonitoringUpdate, persistedInstanceState) in self.uncommittedInstanceStates.items():
+            if persistedInstanceState is None:
+                self.persistedInstanceStates.pop(instanceId, None)
+                self.pendingMonitoringUpdates.pop(instanceId, None)
+                continue
+
+            self.persistedInstanceStates[instanceId] = persistedInstanceState
+
+            # Note: a monitoring update received after the change supersedes the saved one
+            if pendingMonitoringUpdate is not None and not self.pendingMonitoringUpdates.has_key(instanceId):
+                self.pendingMonitoringUpdates[instanceId] = pendingMonitoringUpdate
+
+        self.pendingInstanceEvents[:0] = self.uncommittedInstanceEvents
+
+        self.logger.debug("The write-behind state of <%d> instance(s) and <%d> event(s) has been restored after a rollback" % (len(self.uncommittedInstanceStates), len(self.uncommittedInstanceEvents)))
+
+        self.uncommittedInstanceStates.clear()
+        del self.uncommittedInstanceEvents[:]
+
+
+    def getEffectiveJournalMode(self, journalMode):
+        if journalMode.lower() != 'auto':
+            return journalMode.upper()
+
+        if TriAnnotFileWatcher.isOnNetworkFileSystem(os.path.dirname(os.path.abspath(self.databaseFileFullPath))):
+            self.logger.debug("The following SQLite database is located on a network file system and will use the DELETE journal mode: %s" % self.databaseFileFullPath)
+            return 'DELETE'
+
+        return 'WAL'
+
+
+    def changeJournalMode(self, journalMode):
+        # Used to apply the journal mode of the current configuration to the database of an existing analysis (ex: resumed analysis created with the DELETE journal mode by an older version of TriAnnot)
+        # Note: the journal mode can't be changed while another process uses the database, the current journal mode is kept in this case
+        self.journalMode = self.getEffectiveJournalMode(journalMode)
+
+        try:
+            sqlDatabaseConnection = self.getConnection()
+            currentJournalMode = sqlDatabaseConnection.execute('PRAGMA journal_mode').fetchone()[0]
+
+            if currentJournalMode.upper() != self.journalMode:
+                self.logger.info("The journal mode of the following SQLite database will now be changed from <%s> to <%s>: %s" % (currentJournalMode.upper(), self.journalMode, self.databaseFileFullPath))
+                sqlDatabaseConnection.execute('PRAGMA journal_mode = %s' % self.journalMode)
+
+        except sqlite3.Error as sqlError:
+            self.logger.warning("The journal mode of the following SQLite database could not be changed: %s (%s)" % (self.databaseFileFullPath, sqlError))
+        finally:
+            self.releaseConnection()
+
+
+    def close(self):
+        self.flushMonitoringUpdates(force = True)
+
+        with self.connectionLock:
+            if self.sqlDatabaseConnection is not None:
+                self.sqlDatabaseConnection.commit()
+                self.sqlDatabaseConnection.close()
+                self.sqlDatabaseConnection = None
 
 
     ##################################################
@@ -41,7 +230,11 @@ class TriAnnotSqlite (object):
     ##################################################
     def createDefaultDatabase(self):
         try:
-            sqlDatabaseConnection = sqlite3.connect(self.databaseFileFullPath)
+            sqlDatabaseConnection = self.getConnection()
+
+            # The journal mode is stored in the database file (it is kept by the next connections)
+            sqlDatabaseConnection.execute('PRAGMA journal_mode = %s' % self.journalMode)
+
             dbCursor = sqlDatabaseConnection.cursor()
 
             # Creation of the table that will store the names and md5 hash of all global files
@@ -68,7 +261,10 @@ class TriAnnotSqlite (object):
                     cleanPattern TEXT NOT NULL,
                     emailTo TEXT,
                     shortIdentifier TEXT NO NULL,
-                    chunkOverlappingSize INTEGER NOT NULL
+                    chunkOverlappingSize INTEGER NOT NULL,
+                    schedulingPolicy TEXT,
+                    sequenceWeightsFileFullPath TEXT,
+                    runtimeModelsFileFullPath TEXT
                 )''' % self.parametersTableName)
 
             # Creation of the table that will store the data of each sequence
@@ -81,33 +277,7 @@ class TriAnnotSqlite (object):
                 )''' % self.sequencesTableName)
 
             # Creation of the table that will store the data of each analysis/instance
-            dbCursor.execute('''
-                CREATE TABLE %s (
-                    id INTEGER UNIQUE NOT NULL,
-                    sequenceName TEXT NOT NULL,
-                    sequenceType TEXT NOT NULL,
-                    sequenceStartOffset INTEGER NOT NULL,
-                    sequenceEndOffset INTEGER NOT NULL,
-                    sequenceSize INTERGER NOT NULL,
-                    chunkName TEXT NOT NULL,
-                    chunkNumber INTEGER NOT NULL,
-                    chunkStartOffset INTEGER NOT NULL,
-                    chunkEndOffset INTEGER NOT NULL,
-                    chunkSize INTEGER NOT NULL,
-                    instanceSubmissionDate DATETIME,
-                    instanceStartDate DATETIME,
-                    instanceEndDate DATETIME,
-                    instanceStatus INTEGER,
-                    instanceProgression INTEGER,
-                    instanceExecutionTime INTEGER,
-                    instanceFastaFileFullPath TEXT,
-                    instanceDirectoryFullPath TEXT,
-                    instanceDirectorySize INTEGER,
-                    instanceJobIdentifier INTEGER,
-                    instanceMonitoringCommand TEXT,
-                    instanceKillCommand TEXT,
-                    instanceBackupArchive TEXT
-                )''' % self.instancesTableName)
+            self.createInstancesTable(dbCursor, self.instancesTableName)
 
             # Creation of the table that will store the global statistics
             dbCursor.execute('''
@@ -117,18 +287,93 @@ class TriAnnotSqlite (object):
                     totalDiskUsage INTEGER
                 )''' % self.systemStatisticsTableName)
 
+            # Creation of the table that will store the sequences analyzed together in a multi-fasta instance (pack)
+            self.createPackedSequencesTable(dbCursor)
+
+            # Creation of the table that will store the history of the instances (used by the stats mode)
+            self.createInstanceEventsTable(dbCursor)
+
+            self.createIndexes(dbCursor)
+            dbCursor.execute('PRAGMA user_version = %d' % TriAnnotSqlite.schemaVersion)
+
         except Exception as sqlError:
             self.logger.error("An error occured during the creation of the SQLite database !")
             sqlDatabaseConnection.rollback()
             raise sqlError
         finally:
-            sqlDatabaseConnection.commit()
-            sqlDatabaseConnection.close()
+            self.releaseConnection()
+
+
+    def createInstancesTable(self, dbCursor, tableName):
+        # Note: the id column is an alias of the rowid of the table (the rows are stored and retrieved in the order of their id)
+        dbCursor.execute('''
+            CREATE TABLE %s (
+                id INTEGER PRIMARY KEY NOT NULL,
+                sequenceName TEXT NOT NULL,
+                sequenceType TEXT NOT NULL,
+                sequenceStartOffset INTEGER NOT NULL,
+                sequenceEndOffset INTEGER NOT NULL,
+                sequenceSize INTERGER NOT NULL,
+                chunkName TEXT NOT NULL,
+                chunkNumber INTEGER NOT NULL,
+                chunkStartOffset INTEGER NOT NULL,
+                chunkEndOffset INTEGER NOT NULL,
+                chunkSize INTEGER NOT NULL,
+                instanceSubmissionDate DATETIME,
+                instanceStartDate DATETIME,
+                instanceEndDate DATETIME,
+                instanceStatus INTEGER,
+                instanceProgression INTEGER,
+                instanceExecutionTime INTEGER,
+                instanceFastaFileFullPath TEXT,
+                instanceDirectoryFullPath TEXT,
+                instanceDirectorySize INTEGER,
+                instanceJobIdentifier INTEGER,
+                instanceArrayTaskIndex INTEGER,
+                instanceMonitoringCommand TEXT,
+                instanceKillCommand TEXT,
+                instanceBackupArchive TEXT
+            )''' % tableName)
+
+
+    def createPackedSequencesTable(self, dbCursor):
+        dbCursor.execute('''
+            CREATE TABLE IF NOT EXISTS %s (
+                packName TEXT NOT NULL,
+                memberNumber INTEGER NOT NULL,
+                sequenceName TEXT UNIQUE NOT NULL,
+                chunkName TEXT NOT NULL,
+                sequenceStartOffset INTEGER NOT NULL,
+                sequenceEndOffset INTEGER NOT NULL,
+                sequenceSize INTEGER NOT NULL
+            )''' % self.packedSequencesTableName)
+
+
+    def createInstanceEventsTable(self, dbCursor):
+        # Note: the rows of this table are never updated, possible event types are: submission, start, progress, completion, abort and retry
+        dbCursor.execute('''
+            CREATE TABLE IF NOT EXISTS %s (
+                eventId INTEGER PRIMARY KEY NOT NULL,
+                instanceId INTEGER NOT NULL,
+                eventType TEXT NOT NULL,
+                eventTime REAL NOT NULL,
+                instanceStatus INTEGER,
+                instanceProgression INTEGER,
+                runnerName TEXT,
+                jobIdentifier TEXT
+            )''' % self.instanceEventsTableName)
+
+
+    def createIndexes(self, dbCursor):
+        # Indexes used by the status counters, the scheduling requests and the chunk requests of the reconstruction
+        dbCursor.execute('CREATE INDEX IF NOT EXISTS %s_status_index ON %s(instanceStatus)' % (self.instancesTableName, self.instancesTableName))
+        dbCursor.execute('CREATE INDEX IF NOT EXISTS %s_sequence_index ON %s(sequenceName, chunkNumber)' % (self.instancesTableName, self.instancesTableName))
+        dbCursor.execute('CREATE INDEX IF NOT EXISTS %s_pack_index ON %s(packName, memberNumber)' % (self.packedSequencesTableName, self.packedSequencesTableName))
 
 
     def initializeSystemStatisticsTableRow(self):
         try:
-            sqlDatabaseConnection = sqlite3.connect(self.databaseFileFullPath)
+            sqlDatabaseConnection = self.getConnection()
             dbCursor = sqlDatabaseConnection.cursor()
 
             # Build SQL request (no placholders)
@@ -144,16 +389,88 @@ class TriAnnotSqlite (object):
             sqlDatabaseConnection.rollback()
             raise sqlError
         finally:
-            sqlDatabaseConnection.commit()
+            self.releaseConnection()
+
+
+    ################################
+    ##  Schema migration methods  ##
+    ################################
+    def getSchemaVersion(self, dbCursor):
+        return dbCursor.execute('PRAGMA user_version').fetchone()[0]
+
+
+    def upgradeSchema(self):
+        # Initializations
+        # Note: a dedicated connection in autocommit mode is used so that the statements that modify the schema are part of the transaction (all the migrations are applied - OR - none)
+        sqlDatabaseConnection = self.createConnection()
+        sqlDatabaseConnection.isolation_level = None
+        dbCursor = sqlDatabaseConnection.cursor()
+
+        try:
+            if self.getSchemaVersion(dbCursor) >= TriAnnotSqlite.schemaVersion:
+                return
+
+            # The version is read again once the database is locked (another process might have upgraded it in the meantime)
+            dbCursor.execute('BEGIN IMMEDIATE')
+            currentSchemaVersion = self.getSchemaVersion(dbCursor)
+
+            for targetSchemaVersion in range(currentSchemaVersion + 1, TriAnnotSqlite.schemaVersion + 1):
+                self.logger.info("The schema of the following SQLite database will now be upgraded to version <%d>: %s" % (targetSchemaVersion, self.databaseFileFullPath))
+                getattr(self, 'migrateToSchemaVersion%d' % targetSchemaVersion)(dbCursor)
+                dbCursor.execute('PRAGMA user_version = %d' % targetSchemaVersion)
+
+            dbCursor.execute('COMMIT')
+
+        except sqlite3.Error as sqlError:
+            # The database can still be used with its current schema (ex: read-only database of a past analysis)
+            self.logger.warning("The schema of the following SQLite database could not be upgraded: %s (%s)" % (self.databaseFileFullPath, sqlError))
+            try:
+                dbCursor.execute('ROLLBACK')
+            except sqlite3.Error:
+                pass
+        finally:
             sqlDatabaseConnection.close()
 
 
+    def getColumnNames(self, dbCursor, tableName):
+        return [columnDescription[1] for columnDescription in dbCursor.execute('PRAGMA table_info(%s)' % tableName).fetchall()]
+
+
+    def migrateToSchemaVersion1(self, dbCursor):
+        # Columns and tables added before the introduction of the schema versions
+        newColumns = [(self.parametersTableName, 'schedulingPolicy', 'TEXT'), (self.parametersTableName, 'sequenceWeightsFileFullPath', 'TEXT'), (self.parametersTableName, 'runtimeModelsFileFullPath', 'TEXT'), (self.instancesTableName, 'instanceArrayTaskIndex', 'INTEGER')]
+
+        for tableName, columnName, columnType in newColumns:
+            if columnName not in self.getColumnNames(dbCursor, tableName):
+                dbCursor.execute('ALTER TABLE %s ADD COLUMN %s %s' % (tableName, columnName, columnType))
+
+        self.createPackedSequencesTable(dbCursor)
+
+
+    def migrateToSchemaVersion2(self, dbCursor):
+        # The id column of the Instances table becomes its primary key: the table is rebuilt (SQLite can't modify the constraints of an existing table)
+        instancesColumns = ', '.join(self.getColumnNames(dbCursor, self.instancesTableName))
+        temporaryTableName = self.instancesTableName + '_migration'
+
+        self.createInstancesTable(dbCursor, temporaryTableName)
+        dbCursor.execute('INSERT INTO %s(%s) SELECT %s FROM %s ORDER BY id' % (temporaryTableName, instancesColumns, instancesColumns, self.instancesTableName))
+        dbCursor.execute('DROP TABLE %s' % self.instancesTableName)
+        dbCursor.execute('ALTER TABLE %s RENAME TO %s' % (temporaryTableName, self.instancesTableName))
+
+        self.createIndexes(dbCursor)
+
+
+    def migrateToSchemaVersion3(self, dbCursor):
+        # The events of the instances executed before the upgrade are not available
+        self.createInstanceEventsTable(dbCursor)
+
+
     ###############################
     ##  Table's filling methods  ##
     ###############################
     def genericInsertOrReplaceFromDict(self, tableName, contentDict):
         try:
-            sqlDatabaseConnection = sqlite3.connect(self.databaseFileFullPath)
+            sqlDatabaseConnection = self.getConnection()
             dbCursor = sqlDatabaseConnection.cursor()
 
             # Build SQL request (with placholders)
@@ -167,83 +484,159 @@ class TriAnnotSqlite (object):
             # Execute request
             dbCursor.execute(sqlInsertRequest, contentDict)
 
+            # A replaced instance must not be modified by a delayed monitoring update
+            if tableName == self.instancesTableName and contentDict.has_key('id'):
+                self.forgetInstanceState(contentDict['id'])
+
         except Exception as sqlError:
             self.logger.error("An error occured during the filling of table <%s> in the <genericInsertOrReplaceFromDict> method !" % tableName)
             sqlDatabaseConnection.rollback()
             raise sqlError
         finally:
-            sqlDatabaseConnection.commit()
-            sqlDatabaseConnection.close()
+            self.releaseConnection()
+
+
+    def startInstancesRegistration(self):
+        # The Sequences and Instances rows of a new analysis are inserted by batches (executemany) in a single transaction
+        # Note: nothing is written in the database until the finishInstancesRegistration method is called (cancelInstancesRegistration discards everything)
+        self.registrationConnection = self.createConnection()
+        self.pendingSequenceRows = list()
+        self.pendingInstanceRows = list()
+        self.pendingPackedSequenceRows = list()
+        self.nbRegisteredSequences = 0
+        self.nbRegisteredInstances = 0
+
+
+    def registerSequence(self, sequenceName, numberOfChunk):
+        self.pendingSequenceRows.append((sequenceName, numberOfChunk))
+        self.nbRegisteredSequences += 1
 
+        if len(self.pendingSequenceRows) >= self.registrationBatchSize:
+            self.flushRegistrationBuffers()
 
-    def registerAllInstances(self, instanceTableEntries):
+
+    def registerInstance(self, instanceTableEntry):
+        # Convert the object into a dict and give an id to the analysis
+        self.nbRegisteredInstances += 1
+        currentAnalysisAsDict = instanceTableEntry.convertToDict()
+        currentAnalysisAsDict['id'] = self.nbRegisteredInstances
+
+        self.pendingInstanceRows.append(currentAnalysisAsDict)
+
+        if len(self.pendingInstanceRows) >= self.registrationBatchSize:
+            self.flushRegistrationBuffers()
+
+
+    def registerPackedSequence(self, packName, memberNumber, instanceTableEntry):
+        self.pendingPackedSequenceRows.append((packName, memberNumber, instanceTableEntry.sequenceName, instanceTableEntry.chunkName, instanceTableEntry.sequenceStartOffset, instanceTableEntry.sequenceEndOffset, instanceTableEntry.sequenceSize))
+
+        if len(self.pendingPackedSequenceRows) >= self.registrationBatchSize:
+            self.flushRegistrationBuffers()
+
+
+    def recordInstanceEvent(self, instanceId, eventType, instanceStatus, instanceProgression = None, runnerName = None, jobIdentifier = None):
+        # The event is dated now but only written with the next update of the Instances table (submission, completion or flush of the monitoring updates)
+        self.pendingInstanceEvents.append((instanceId, eventType, time.time(), instanceStatus, instanceProgression, runnerName, jobIdentifier))
+
+
+    def writePendingInstanceEvents(self, dbCursor):
+        if len(self.pendingInstanceEvents) == 0:
+            return
+
+        dbCursor.executemany('INSERT INTO %s(instanceId, eventType, eventTime, instanceStatus, instanceProgression, runnerName, jobIdentifier) VALUES (?, ?, ?, ?, ?, ?, ?)' % self.instanceEventsTableName, self.pendingInstanceEvents)
+
+        if self.unitOfWorkDepth > 0:
+            self.uncommittedInstanceEvents.extend(self.pendingInstanceEvents)
+
+        del self.pendingInstanceEvents[:]
+
+
+    def flushRegistrationBuffers(self):
         try:
-            sqlDatabaseConnection = sqlite3.connect(self.databaseFileFullPath)
-            dbCursor = sqlDatabaseConnection.cursor()
+            dbCursor = self.registrationConnection.cursor()
 
-            analysisNumber = 0
-            for instanceTableEntry in instanceTableEntries:
-                # Convert the object into a dict and give an id to the analysis
-                analysisNumber += 1
-                currentAnalysisAsDict = instanceTableEntry.convertToDict()
-                currentAnalysisAsDict['id'] = analysisNumber
+            if len(self.pendingSequenceRows) > 0:
+                dbCursor.executemany('INSERT OR REPLACE INTO %s(sequenceName, numberOfChunk) VALUES (?, ?)' % self.sequencesTableName, self.pendingSequenceRows)
 
+            if len(self.pendingInstanceRows) > 0:
                 # Build SQL request (with placholders)
-                columns = ', '.join(currentAnalysisAsDict.keys())
-                placeholders = ':' + ', :'.join(currentAnalysisAsDict.keys())
+                columns = ', '.join(self.pendingInstanceRows[0].keys())
+                placeholders = ':' + ', :'.join(self.pendingInstanceRows[0].keys())
 
                 sqlInsertRequest = 'INSERT INTO %s(%s) VALUES (%s)' % (self.instancesTableName, columns, placeholders)
 
-                self.logger.debug("SQL insert command in the <registerAllInstances> method: %s" % sqlInsertRequest)
+                self.logger.debug("SQL insert command in the <flushRegistrationBuffers> method: %s" % sqlInsertRequest)
 
                 # Execute request
-                dbCursor.execute(sqlInsertRequest, currentAnalysisAsDict)
+                dbCursor.executemany(sqlInsertRequest, self.pendingInstanceRows)
+
+            if len(self.pendingPackedSequenceRows) > 0:
+                dbCursor.executemany('INSERT INTO %s(packName, memberNumber, sequenceName, chunkName, sequenceStartOffset, sequenceEndOffset, sequenceSize) VALUES (?, ?, ?, ?, ?, ?, ?)' % self.packedSequencesTableName, self.pendingPackedSequenceRows)
 
         except Exception as sqlError:
-            self.logger.error("An error occured during the registration of the TriAnnot analysis into the <%s> table !" % self.instancesTableName)
-            sqlDatabaseConnection.rollback()
+            self.logger.error("An error occured during the registration of the TriAnnot analysis into the <%s> and <%s> tables !" % (self.sequencesTableName, self.instancesTableName))
+            self.cancelInstancesRegistration()
             raise sqlError
-        finally:
-            sqlDatabaseConnection.commit()
-            sqlDatabaseConnection.close()
+
+        del self.pendingSequenceRows[:]
+        del self.pendingInstanceRows[:]
+        del self.pendingPackedSequenceRows[:]
+
+
+    def finishInstancesRegistration(self):
+        self.flushRegistrationBuffers()
+
+        self.registrationConnection.commit()
+        self.registrationConnection.close()
+        self.registrationConnection = None
+
+
+    def cancelInstancesRegistration(self):
+        if self.registrationConnection is None:
+            return
+
+        self.registrationConnection.rollback()
+        self.registrationConnection.close()
+        self.registrationConnection = None
 
 
     #####################################################
     ##  Table's consultation methods - Basic requests  ##
     #####################################################
-    def _getTableAsListOfDict(self, callingMethod, nbRows= None, columns= None, tableName= None, where= None, orderBy= None, orderWay= 'ASC'):
+    def _getTableAsListOfDict(self, callingMethod, nbRows= None, columns= None, tableName= None, where= None, groupBy= None, orderBy= None, orderWay= 'ASC'):
         # Initializations
         listOfRows = list()
         nbRows = nbRows if nbRows is not None else 'all'
         selectString = '*'
         whereString = ''
+        whereValues = list()
+        groupByString = ''
         orderByString = ''
 
         # Prepare request elements
         if columns is not None:
             selectString = ', '.join(columns)
         if where is not None and len(where) > 0:
-            whereString = 'WHERE '
-            for keyName, keyValue in where.items():
-                whereString += '%s = "%s"' % (keyName, keyValue)
+            whereString = 'WHERE ' + ' AND '.join(['%s = ?' % keyName for keyName in where.keys()])
+            whereValues = where.values()
+        if groupBy is not None:
+            groupByString = 'GROUP BY %s' % groupBy
         if orderBy is not None:
             orderByString = 'ORDER BY %s %s' % (orderBy, orderWay)
 
         # Get table content
         try:
-            sqlDatabaseConnection = sqlite3.connect(self.databaseFileFullPath)
-            sqlDatabaseConnection.row_factory = sqlite3.Row
-            sqlDatabaseConnection.text_factory = str
+            sqlDatabaseConnection = self.getConnection()
 
             dbCursor = sqlDatabaseConnection.cursor()
 
             # Build SQL request (with placholders)
-            sqlSelectRequest = 'SELECT %s FROM %s %s %s' % (selectString, tableName, whereString, orderByString)
+            sqlSelectRequest = 'SELECT %s FROM %s %s %s %s' % (selectString, tableName, whereString, groupByString, orderByString)
 
             self.logger.debug("SQL select command in the <%s> method: %s" % (callingMethod, sqlSelectRequest))
 
             # Execute request
-            dbCursor.execute(sqlSelectRequest)
+            dbCursor.execute(sqlSelectRequest, whereValues)
 
             if nbRows == 'all':
                 collectedRows = dbCursor.fetchall()
@@ -262,18 +655,25 @@ class TriAnnotSqlite (object):
             sqlDatabaseConnection.rollback()
             raise sqlError
         finally:
-            sqlDatabaseConnection.commit()
-            sqlDatabaseConnection.close()
+            self.releaseConnection()
 
         # Smart return
         return listOfRows
 
 
     def recoverInstancesFromDatabase(self, nbInstances = None, instanceStatus = None):
+        self.flushMonitoringUpdates(force = True)
+
         if instanceStatus is not None:
-            return self._getTableAsListOfDict('recoverInstancesFromDatabase', nbRows= nbInstances, tableName= self.instancesTableName, where= {'instanceStatus': instanceStatus}, orderBy= 'id')
+            recoveredInstances = self._getTableAsListOfDict('recoverInstancesFromDatabase', nbRows= nbInstances, tableName= self.instancesTableName, where= {'instanceStatus': instanceStatus}, orderBy= 'id')
         else:
-            return self._getTableAsListOfDict('recoverInstancesFromDatabase', nbRows= nbInstances, tableName= self.instancesTableName, orderBy= 'id')
+            recoveredInstances = self._getTableAsListOfDict('recoverInstancesFromDatabase', nbRows= nbInstances, tableName= self.instancesTableName, orderBy= 'id')
+
+        # Keep track of the persisted state of the instances to detect their real changes during the monitoring
+        for instanceDescriptionDict in recoveredInstances:
+            self.persistedInstanceStates[instanceDescriptionDict['id']] = (instanceDescriptionDict['instanceStatus'], instanceDescriptionDict['instanceProgression'])
+
+        return recoveredInstances
 
 
     def recoverParametersFromDatabase(self):
@@ -282,16 +682,22 @@ class TriAnnotSqlite (object):
 
     def recoverGlobalFileChecksum(self, globalFileFullPath):
         # Execute basic selection request
-        requestFirstResult = self._getTableAsListOfDict('recoverGlobalFileChecksum', tableName= self.globalFilesTableName, where= {'globalFileFullPath': globalFileFullPath})[0]
+        requestResults = self._getTableAsListOfDict('recoverGlobalFileChecksum', tableName= self.globalFilesTableName, where= {'globalFileFullPath': globalFileFullPath})
 
-        # Return the useful information
-        return requestFirstResult['globalFileSecureHash']
+        # Return the useful information (or None for the files that have not been registered, ex: the fasta file in the databases of older versions of TriAnnot)
+        if len(requestResults) == 0:
+            return None
+
+        return requestResults[0]['globalFileSecureHash']
 
 
     def getSequencesStatus(self, returnStatusAsString = False):
         # Initializations
         instancesStatus = OrderedDict()
 
+        # The status of every chunk is displayed so the delayed monitoring updates are written first
+        self.flushMonitoringUpdates(force = True)
+
         # Execute basic selection request
         requestRawResults =  self._getTableAsListOfDict('getSequencesStatus', columns = ['sequenceName', 'chunkName', 'instanceStatus', 'instanceProgression'], tableName= self.instancesTableName, orderBy= 'id')
 
@@ -310,19 +716,28 @@ class TriAnnotSqlite (object):
 
     def getStatusCounters(self, returnStatusAsString = False):
         # Initializations
-        allStatus = list()
+        statusCounters = Counter()
 
-        # Execute basic selection request
-        requestRawResults = self._getTableAsListOfDict('getStatusCounters', columns = ['instanceStatus'], tableName= self.instancesTableName)
+        # The instances are counted by the database (one row by status)
+        requestRawResults = self._getTableAsListOfDict('getStatusCounters', columns = ['instanceStatus', 'count(*) AS nbInstances'], tableName= self.instancesTableName, groupBy= 'instanceStatus')
 
-        # Counthe number of instance in each status
         for result in requestRawResults:
             if returnStatusAsString:
-                allStatus.append(TriAnnotStatus.getStatusName(result['instanceStatus']))
+                statusCounters[TriAnnotStatus.getStatusName(result['instanceStatus'])] += result['nbInstances']
             else:
-                allStatus.append(result['instanceStatus'])
+                statusCounters[result['instanceStatus']] += result['nbInstances']
 
-        return Counter(allStatus)
+        # The status transitions that have not been written yet are applied to the counters of the database
+        for instanceId, (instanceStatus, instanceProgression) in self.pendingMonitoringUpdates.items():
+            persistedStatus = self.persistedInstanceStates[instanceId][0]
+            if persistedStatus != instanceStatus:
+                if returnStatusAsString:
+                    persistedStatus = TriAnnotStatus.getStatusName(persistedStatus)
+                    instanceStatus = TriAnnotStatus.getStatusName(instanceStatus)
+                statusCounters[persistedStatus] -= 1
+                statusCounters[instanceStatus] += 1
+
+        return statusCounters
 
 
     def getSystemStatistics(self):
@@ -339,8 +754,50 @@ class TriAnnotSqlite (object):
             return False
 
 
+    def getInstancesSchedulingData(self, instanceStatus):
+        return self._getTableAsListOfDict('getInstancesSchedulingData', columns = ['id', 'sequenceName', 'chunkName', 'chunkNumber', 'chunkSize', 'instanceProgression'], tableName= self.instancesTableName, where= {'instanceStatus': instanceStatus}, orderBy= 'id')
+
+
+    def getCompletedInstancesCostData(self):
+        return self._getTableAsListOfDict('getCompletedInstancesCostData', columns = ['chunkSize', 'instanceExecutionTime', 'instanceDirectorySize'], tableName= self.instancesTableName, where= {'instanceStatus': TriAnnotStatus.COMPLETED})
+
+
+    def iterateChunkDefinitions(self, columns):
+        # Generator of the chunk related columns of all the instances (the rows are not all loaded in memory)
+        sqlDatabaseConnection = self.createConnection()
+
+        try:
+            for instanceRow in sqlDatabaseConnection.execute('SELECT %s FROM %s ORDER BY id' % (', '.join(columns), self.instancesTableName)):
+                yield instanceRow
+        finally:
+            sqlDatabaseConnection.close()
+
+
+    def getPackedSequences(self, packName):
+        return self._getTableAsListOfDict('getPackedSequences', tableName= self.packedSequencesTableName, where= {'packName': packName}, orderBy= 'memberNumber')
+
+
+    def iterateInstanceEvents(self, eventTypes):
+        # Generator of the events of the selected types in chronological order (the rows are not all loaded in memory)
+        sqlDatabaseConnection = self.createConnection()
+
+        try:
+            # The databases that could not be upgraded (ex: read-only database of an analysis made with an older version of TriAnnot) have no event
+            if self.getSchemaVersion(sqlDatabaseConnection.cursor()) < 3:
+                return
+
+            for eventRow in sqlDatabaseConnection.execute('SELECT * FROM %s WHERE eventType IN (%s) ORDER BY eventTime, eventId' % (self.instanceEventsTableName, ', '.join(['?'] * len(eventTypes))), eventTypes):
+                yield eventRow
+        finally:
+            sqlDatabaseConnection.close()
+
+
+    def getChunkSizes(self):
+        return dict((result['id'], result['chunkSize']) for result in self._getTableAsListOfDict('getChunkSizes', columns = ['id', 'chunkSize'], tableName= self.instancesTableName))
+
+
     def getChunkData(self, requiredSequenceName):
-        return self._getTableAsListOfDict('getChunkData', columns = ['chunkName', 'chunkNumber', 'chunkSize', 'instanceDirectoryFullPath'], tableName= self.instancesTableName, where= {'sequenceName': requiredSequenceName}, orderBy= 'chunkNumber')
+        return self._getTableAsListOfDict('getChunkData', columns = ['chunkName', 'chunkNumber', 'chunkStartOffset', 'chunkEndOffset', 'chunkSize', 'instanceDirectoryFullPath'], tableName= self.instancesTableName, where= {'sequenceName': requiredSequenceName}, orderBy= 'chunkNumber')
 
 
 
@@ -351,11 +808,11 @@ class TriAnnotSqlite (object):
         # Initializations
         sequencesStatus = dict()
 
+        self.flushMonitoringUpdates(force = True)
+
         # Get table content
         try:
-            sqlDatabaseConnection = sqlite3.connect(self.databaseFileFullPath)
-            sqlDatabaseConnection.row_factory = sqlite3.Row
-            sqlDatabaseConnection.text_factory = str
+            sqlDatabaseConnection = self.getConnection()
 
             dbCursor = sqlDatabaseConnection.cursor()
 
@@ -397,8 +854,7 @@ class TriAnnotSqlite (object):
             sqlDatabaseConnection.rollback()
             raise sqlError
         finally:
-            sqlDatabaseConnection.commit()
-            sqlDatabaseConnection.close()
+            self.releaseConnection()
 
         # Smart return
         return sequencesStatus
@@ -409,7 +865,7 @@ class TriAnnotSqlite (object):
     ##################################
     def updateSequenceTableDuringReconstruction(self, sequenceName, reconstructionStatus):
         try:
-            sqlDatabaseConnection = sqlite3.connect(self.databaseFileFullPath)
+            sqlDatabaseConnection = self.getConnection()
             dbCursor = sqlDatabaseConnection.cursor()
 
             sqlUpdateRequest = 'UPDATE %s set reconstructed= "%d", reconstructionStatus= "%s" WHERE sequenceName= "%s"' % (self.sequencesTableName, 1, reconstructionStatus, sequenceName)
@@ -423,53 +879,105 @@ class TriAnnotSqlite (object):
             sqlDatabaseConnection.rollback()
             raise sqlError
         finally:
-            sqlDatabaseConnection.commit()
-            sqlDatabaseConnection.close()
+            self.releaseConnection()
 
 
-    def updateInstanceTableAtSubmission(self, instanceId, instanceStatus, instanceSubmissionDate, instanceFastaFileFullPath, instanceDirectoryFullPath, instanceJobIdentifier, instanceMonitoringCommand, instanceKillCommand):
+    def updateInstanceTableAtSubmission(self, instanceId, instanceStatus, instanceSubmissionDate, instanceFastaFileFullPath, instanceDirectoryFullPath, instanceJobIdentifier, instanceMonitoringCommand, instanceKillCommand, instanceArrayTaskIndex = None):
         try:
-            sqlDatabaseConnection = sqlite3.connect(self.databaseFileFullPath)
+            sqlDatabaseConnection = self.getConnection()
             dbCursor = sqlDatabaseConnection.cursor()
 
-            sqlUpdateRequest = 'UPDATE %s set instanceStatus= "%d", instanceSubmissionDate= "%s", instanceFastaFileFullPath= "%s", instanceDirectoryFullPath= "%s", instanceJobIdentifier= "%d", instanceMonitoringCommand= "%s", instanceKillCommand= "%s" WHERE id= "%d"' % (self.instancesTableName, instanceStatus, instanceSubmissionDate, instanceFastaFileFullPath, instanceDirectoryFullPath, instanceJobIdentifier, instanceMonitoringCommand, instanceKillCommand, instanceId)
+            # Note: job identifiers are not always integers (Ex: Torque array jobs)
+            sqlUpdateRequest = 'UPDATE %s set instanceStatus= "%d", instanceSubmissionDate= "%s", instanceFastaFileFullPath= "%s", instanceDirectoryFullPath= "%s", instanceJobIdentifier= "%s", instanceMonitoringCommand= "%s", instanceKillCommand= "%s"' % (self.instancesTableName, instanceStatus, instanceSubmissionDate, instanceFastaFileFullPath, instanceDirectoryFullPath, instanceJobIdentifier, instanceMonitoringCommand, instanceKillCommand)
+
+            # The index of the array task is only defined for instances submitted as part of an array job (the index of a previous submission must not be kept)
+            if instanceArrayTaskIndex is not None:
+                sqlUpdateRequest += ', instanceArrayTaskIndex= "%d"' % instanceArrayTaskIndex
+            else:
+                sqlUpdateRequest += ', instanceArrayTaskIndex= NULL'
+
+            sqlUpdateRequest += ' WHERE id= "%d"' % instanceId
 
             self.logger.debug("SQL update command (at submission time) for table <%s>: %s" % (self.instancesTableName, sqlUpdateRequest))
 
             dbCursor.execute(sqlUpdateRequest)
+            self.writePendingInstanceEvents(dbCursor)
+
+            # The submission is written immediately and supersedes the delayed monitoring update of the instance (if any)
+            self.saveInstanceStateBeforeChange(instanceId)
+            self.pendingMonitoringUpdates.pop(instanceId, None)
+            self.persistedInstanceStates[instanceId] = (instanceStatus, self.persistedInstanceStates.get(instanceId, (None, None))[1])
 
         except Exception as sqlError:
             self.logger.error("An error occured during the update of instance <%d> in table <%s> (at submission)!" % (instanceId, self.instancesTableName))
             sqlDatabaseConnection.rollback()
             raise sqlError
         finally:
-            sqlDatabaseConnection.commit()
-            sqlDatabaseConnection.close()
+            self.releaseConnection()
 
 
     def updateInstanceTableDuringMonitoring(self, instanceId, instanceStatus, instanceProgression):
+        # The update is delayed until the next flush of the monitoring updates (and ignored if nothing has changed since the last write)
+        # Note: the instances whose persisted state is unknown are written immediately
+        lastKnownState = self.pendingMonitoringUpdates.get(instanceId, self.persistedInstanceStates.get(instanceId))
+
+        if lastKnownState != (instanceStatus, instanceProgression):
+            self.recordInstanceEvent(instanceId, 'start' if lastKnownState is None or lastKnownState[0] != instanceStatus else 'progress', instanceStatus, instanceProgression)
+
+        if not self.persistedInstanceStates.has_key(instanceId):
+            self.pendingMonitoringUpdates[instanceId] = (instanceStatus, instanceProgression)
+            self.flushMonitoringUpdates(force = True)
+
+        elif self.persistedInstanceStates[instanceId] == (instanceStatus, instanceProgression):
+            self.pendingMonitoringUpdates.pop(instanceId, None)
+
+        else:
+            self.pendingMonitoringUpdates[instanceId] = (instanceStatus, instanceProgression)
+
+
+    def flushMonitoringUpdates(self, force = False):
+        # The delayed monitoring updates are written in a single transaction when the flush interval has elapsed (or when the flush is forced)
+        if (len(self.pendingMonitoringUpdates) == 0 and len(self.pendingInstanceEvents) == 0) or (not force and time.time() - self.lastMonitoringUpdateFlushTime < self.monitoringUpdateFlushInterval):
+            return
+
         try:
-            sqlDatabaseConnection = sqlite3.connect(self.databaseFileFullPath)
+            sqlDatabaseConnection = self.getConnection()
             dbCursor = sqlDatabaseConnection.cursor()
 
-            sqlUpdateRequest = 'UPDATE %s set instanceStatus= "%d", instanceProgression= "%d" WHERE id= "%d"' % (self.instancesTableName, instanceStatus, instanceProgression, instanceId)
+            sqlUpdateRequest = 'UPDATE %s set instanceStatus= ?, instanceProgression= ? WHERE id= ?' % self.instancesTableName
 
-            self.logger.debug("SQL update command (during monitoring) for table <%s>: %s" % (self.instancesTableName, sqlUpdateRequest))
+            self.logger.debug("SQL update command (during monitoring) for table <%s>: %s (%d instances)" % (self.instancesTableName, sqlUpdateRequest, len(self.pendingMonitoringUpdates)))
 
-            dbCursor.execute(sqlUpdateRequest)
+            dbCursor.executemany(sqlUpdateRequest, [(instanceStatus, instanceProgression, instanceId) for instanceId, (instanceStatus, instanceProgression) in self.pendingMonitoringUpdates.items()])
+            self.writePendingInstanceEvents(dbCursor)
 
         except Exception as sqlError:
-            self.logger.error("An error occured during the update of instance <%d> in table <%s> (during monitoring) !" % (instanceId, self.instancesTableName))
+            self.logger.error("An error occured during the update of <%d> instance(s) in table <%s> (during monitoring) !" % (len(self.pendingMonitoringUpdates), self.instancesTableName))
             sqlDatabaseConnection.rollback()
             raise sqlError
         finally:
-            sqlDatabaseConnection.commit()
-            sqlDatabaseConnection.close()
+            self.releaseConnection()
+
+        for instanceId in self.pendingMonitoringUpdates.keys():
+            self.saveInstanceStateBeforeChange(instanceId)
+
+        self.persistedInstanceStates.update(self.pendingMonitoringUpdates)
+        self.pendingMonitoringUpdates.clear()
+        self.lastMonitoringUpdateFlushTime = time.time()
+
 
+    def forgetInstanceState(self, instanceId):
+        self.saveInstanceStateBeforeChange(instanceId)
+        self.pendingMonitoringUpdates.pop(instanceId, None)
+        self.persistedInstanceStates.pop(instanceId, None)
+
+
+    def updateInstanceTableAtCompletion(self, instanceId, instanceStartDate, instanceEndDate, instanceStatus, instanceProgression, instanceExecutionTime, instanceDirectorySize, instanceJobIdentifier = None):
+        # Note: the job identifier tells which execution of the instance is finished when the instance has been executed twice (speculative execution)
+        self.recordInstanceEvent(instanceId, 'abort' if instanceStatus == TriAnnotStatus.CANCELED else 'completion', instanceStatus, instanceProgression, jobIdentifier = instanceJobIdentifier)
 
-    def updateInstanceTableAtCompletion(self, instanceId, instanceStartDate, instanceEndDate, instanceStatus, instanceProgression, instanceExecutionTime, instanceDirectorySize):
         try:
-            sqlDatabaseConnection = sqlite3.connect(self.databaseFileFullPath)
+            sqlDatabaseConnection = self.getConnection()
             dbCursor = sqlDatabaseConnection.cursor()
 
             sqlUpdateRequest = 'UPDATE %s set instanceStartDate= "%s", instanceEndDate= "%s", instanceStatus= "%d", instanceProgression= "%d", instanceExecutionTime= "%s", instanceDirectorySize= "%d" WHERE id= "%d"' % (self.instancesTableName, instanceStartDate, instanceEndDate, instanceStatus, instanceProgression, instanceExecutionTime, instanceDirectorySize, instanceId)
@@ -477,19 +985,24 @@ class TriAnnotSqlite (object):
             self.logger.debug("SQL update command (at completion) for table <%s>: %s" % (self.instancesTableName, sqlUpdateRequest))
 
             dbCursor.execute(sqlUpdateRequest)
+            self.writePendingInstanceEvents(dbCursor)
+
+            # The completion is written immediately and supersedes the delayed monitoring update of the instance (if any)
+            self.saveInstanceStateBeforeChange(instanceId)
+            self.pendingMonitoringUpdates.pop(instanceId, None)
+            self.persistedInstanceStates[instanceId] = (instanceStatus, instanceProgression)
 
         except Exception as sqlError:
             self.logger.error("An error occured during the update of instance <%d> in table <%s> (at completion) !" % (instanceId, self.instancesTableName))
             sqlDatabaseConnection.rollback()
             raise sqlError
         finally:
-            sqlDatabaseConnection.commit()
-            sqlDatabaseConnection.close()
+            self.releaseConnection()
 
 
     def updateSystemStatisticsTableAtCompletion(self, totalCpuTime, totalRealTime, totalDiskUsage):
         try:
-            sqlDatabaseConnection = sqlite3.connect(self.databaseFileFullPath)
+            sqlDatabaseConnection = self.getConnection()
             dbCursor = sqlDatabaseConnection.cursor()
 
             sqlUpdateRequest = 'UPDATE %s set totalCpuTime= "%.3f", totalRealTime= "%.3f", totalDiskUsage= "%d"' % (self.systemStatisticsTableName, totalCpuTime, totalRealTime, totalDiskUsage)
@@ -503,5 +1016,4 @@ class TriAnnotSqlite (object):
             sqlDatabaseConnection.rollback()
             raise sqlError
         finally:
-            sqlDatabaseConnection.commit()
-            sqlDatabaseConnection.close()
+            self.releaseConnection()
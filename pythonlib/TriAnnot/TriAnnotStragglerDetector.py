@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+
+import logging
+
+from TriAnnot.TriAnnotConfig import *
+
+class TriAnnotStragglerDetector (object):
+
+    ###################
+    ##  Constructor  ##
+    ###################
+    def __init__(self):
+        # Logger
+        self.logger = logging.getLogger("TriAnnot.TriAnnotStragglerDetector")
+        self.logger.addHandler(logging.NullHandler())
+
+        # Attributes
+        self.speculativeExecution = True
+        self.stragglerDurationFactor = 2.0
+        self.similarChunkSizeRatio = 2.0
+        self.minimumNumberOfSimilarChunks = 3
+        self.minimumStragglerElapsedTime = 600.0
+        self.maximumSpeculativeInstances = 2
+
+        self.loadSettings()
+
+        # Size (in bp) and duration (in seconds) of the instances successfully completed since the beginning of the current execution
+        self.completedInstances = list()
+
+        # Statistics
+        self.nbLaunchedAttempts = 0
+        self.nbWinningAttempts = 0
+
+
+    def loadSettings(self):
+        if TriAnnotConfig.isConfigValueDefined('Global|speculativeExecution'):
+            self.speculativeExecution = TriAnnotConfig.getConfigValue('Global|speculativeExecution').lower() == 'yes'
+
+        if TriAnnotConfig.isConfigValueDefined('Global|stragglerDurationFactor'):
+            self.stragglerDurationFactor = max(float(TriAnnotConfig.getConfigValue('Global|stragglerDurationFactor')), 1.0)
+
+        if TriAnnotConfig.isConfigValueDefined('Global|similarChunkSizeRatio'):
+            self.similarChunkSizeRatio = max(float(TriAnnotConfig.getConfigValue('Global|similarChunkSizeRatio')), 1.0)
+
+        if TriAnnotConfig.isConfigValueDefined('Global|minimumNumberOfSimilarChunks'):
+            self.minimumNumberOfSimilarChunks = max(int(TriAnnotConfig.getConfigValue('Global|minimumNumberOfSimilarChunks')), 1)
+
+        if TriAnnotConfig.isConfigValueDefined('Global|minimumStragglerElapsedTime'):
+            self.minimumStragglerElapsedTime = float(TriAnnotConfig.getConfigValue('Global|minimumStragglerElapsedTime'))
+
+        if TriAnnotConfig.isConfigValueDefined('Global|maximumSpeculativeInstances'):
+            self.maximumSpeculativeInstances = int(TriAnnotConfig.getConfigValue('Global|maximumSpeculativeInstances'))
+
+
+    def getDetectorDescription(self):
+        if not self.speculativeExecution or self.maximumSpeculativeInstances <= 0:
+            return "disabled"
+
+        return "up to %d speculative attempt(s) for instances running %.1f times longer than similar chunks (and at least %d second(s))" % (self.maximumSpeculativeInstances, self.stragglerDurationFactor, self.minimumStragglerElapsedTime)
+
+
+    def isEnabled(self):
+        return self.speculativeExecution and self.maximumSpeculativeInstances > 0
+
+
+    ########################
+    ##  Learning methods  ##
+    ########################
+    def recordCompletedInstance(self, chunkSize, duration):
+        if duration is None or duration <= 0 or int(chunkSize) <= 0:
+            return
+
+        self.completedInstances.append((int(chunkSize), float(duration)))
+
+
+    #########################
+    ##  Detection methods  ##
+    #########################
+    def getExpectedDuration(self, chunkSize, runtimeModel = None):
+        # Initializations
+        chunkSize = int(chunkSize)
+        scaledDurations = list()
+
+        # Durations of the completed chunks of similar size (scaled to the size of the current chunk)
+        for completedChunkSize, completedDuration in self.completedInstances:
+            if max(chunkSize, completedChunkSize) <= self.similarChunkSizeRatio * min(chunkSize, completedChunkSize):
+                scaledDurations.append(completedDuration * chunkSize / completedChunkSize)
+
+        # The median is not affected by the other stragglers
+        if len(scaledDurations) >= self.minimumNumberOfSimilarChunks:
+            scaledDurations.sort()
+            middleIndex = len(scaledDurations) / 2
+            if len(scaledDurations) % 2 == 1:
+                return scaledDurations[middleIndex]
+            return (scaledDurations[middleIndex - 1] + scaledDurations[middleIndex]) / 2.0
+
+        # Not enough similar chunks in the current execution: use the runtime model learned from past analyses
+        if runtimeModel is not None and runtimeModel.isUsable():
+            return runtimeModel.predictDuration(chunkSize)
+
+        return None
+
+
+    def isStraggler(self, chunkSize, elapsedTime, instanceProgression, runtimeModel = None):
+        # Initializations
+        expectedDuration = self.getExpectedDuration(chunkSize, runtimeModel)
+
+        if expectedDuration is None:
+            return False
+
+        # The instance must be late compared to similar chunks
+        if elapsedTime < max(self.stragglerDurationFactor * expectedDuration, self.minimumStragglerElapsedTime):
+            return False
+
+        # A late instance whose progression shows that it will end soon is not worth a new attempt
+        instanceProgression = int(instanceProgression or 0)
+        if instanceProgression >= 100:
+            return False
+
+        if instanceProgression > 0 and elapsedTime * 100.0 / instanceProgression <= self.stragglerDurationFactor * expectedDuration:
+            return False
+
+        return True
+
+
+    ##########################
+    ##  Statistics methods  ##
+    ##########################
+    def getStatisticsAsString(self):
+        return "%d speculative attempt(s) launched - %d finished before the original instance" % (self.nbLaunchedAttempts, self.nbWinningAttempts)
@@ -105,8 +105,54 @@ def isEmptyDirectory(directoryFullPath):
 ###    File checksum    ###
 ###########################
 
-def getFileChecksum(fileFullPath):
-    return hashlib.sha256(open(fileFullPath,'rb').read()).hexdigest()
+# Number of bytes read at once when the checksum of a whole file is computed
+checksumBlockSize = 4 * 1024 * 1024
+
+# Size of each block of the file used to compute a fast checksum (the beginning, the middle and the end of the file)
+fastChecksumSampleSize = 1024 * 1024
+fastChecksumPrefix = 'sampled:'
+
+# The fast checksums of the previous versions also depended on the modification time of the file (they are still checked the same way)
+legacyFastChecksumPrefix = 'fast:'
+
+def getFileChecksum(fileFullPath, fastMode = False):
+    # The file is read block by block (the memory used does not depend on the size of the file)
+    # Note: in fast mode only the size and a few blocks of the file are hashed (for large files like the fasta input file)
+    # The modification time is not used: a copy of the file (ex: on a scratch file system) has the same checksum
+    if fastMode:
+        return getFastFileChecksum(fileFullPath)
+
+    fileChecksum = hashlib.sha256()
+    with open(fileFullPath, 'rb') as fileHandler:
+        for fileBlock in iter(lambda: fileHandler.read(checksumBlockSize), ''):
+            fileChecksum.update(fileBlock)
+
+    return fileChecksum.hexdigest()
+
+
+def getFastFileChecksum(fileFullPath, sampleSize = fastChecksumSampleSize, legacyMode = False):
+    # Initializations
+    fileStat = os.stat(fileFullPath)
+
+    if legacyMode:
+        fileChecksum = hashlib.sha256("%d:%d" % (fileStat.st_size, int(fileStat.st_mtime)))
+    else:
+        fileChecksum = hashlib.sha256("%d" % fileStat.st_size)
+
+    with open(fileFullPath, 'rb') as fileHandler:
+        for sampleOffset in sorted(set([0, max(fileStat.st_size / 2 - sampleSize / 2, 0), max(fileStat.st_size - sampleSize, 0)])):
+            fileHandler.seek(sampleOffset)
+            fileChecksum.update(fileHandler.read(sampleSize))
+
+    return (legacyFastChecksumPrefix if legacyMode else fastChecksumPrefix) + fileChecksum.hexdigest()
+
+
+def isMatchingFileChecksum(fileFullPath, expectedChecksum):
+    # The checksum is computed the same way as the expected one (fast, legacy fast or full checksum)
+    if expectedChecksum.startswith(legacyFastChecksumPrefix):
+        return getFastFileChecksum(fileFullPath, legacyMode = True) == expectedChecksum
+
+    return getFileChecksum(fileFullPath, expectedChecksum.startswith(fastChecksumPrefix)) == expectedChecksum
 
 
 ################################################